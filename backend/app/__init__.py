@@ -107,6 +107,24 @@ def create_app():
     db.init_app(app)
     mail.init_app(app)
     limiter.init_app(app)
+
+    from app.services import degradation, exam_simulator, item_stats, llm, llm_cache, llm_scheduler, llm_usage, mcq_writer, schema, singleflight, replenisher, state_cache, prefetch, generation_jobs, skill_taxonomy, generation_executor
+    llm.init_app(app)
+    llm_scheduler.init_app(app)
+    llm_usage.init_app(app)
+    llm_cache.init_app(app)
+    schema.init_app(app)
+    state_cache.init_app(app)
+    generation_executor.init_app(app)
+    degradation.init_app(app)
+    singleflight.init_app(app)
+    prefetch.init_app(app)
+    generation_jobs.init_app(app)
+    replenisher.init_app(app)
+    skill_taxonomy.init_app(app)
+    mcq_writer.init_app(app)
+    exam_simulator.init_app(app)
+    item_stats.init_app(app)
     
     # Initialize error handler
     error_handler = ErrorHandler(app)
@@ -148,6 +166,11 @@ def create_app():
     def test_api():
         return jsonify({"message": "Server is Working!", "status": "ok"}), 200
     
+    @app.route('/metrics', methods=['GET'])
+    def get_metrics():
+        from app.utils import metrics
+        return jsonify(metrics.snapshot()), 200
+
     @app.route('/degrees', methods=['GET'])
     def get_all_degrees():
         degrees = Degree.query.all()
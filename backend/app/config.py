@@ -35,3 +35,114 @@ class Config:
 
     RAZORPAY_KEY_ID = os.getenv('RAZORPAY_KEY_ID')
     RAZORPAY_KEY_SECRET = os.getenv('RAZORPAY_KEY_SECRET')
+
+    # Attempt-state cache: 'none' (write-through, safe with any number of
+    # workers), 'redis' (shared, needs REDIS_URL) or 'local' (per-process LRU,
+    # only for a single worker or sticky sessions)
+    ASSESSMENT_STATE_CACHE = os.getenv('ASSESSMENT_STATE_CACHE', 'none')
+    ASSESSMENT_STATE_CACHE_SIZE = int(os.getenv('ASSESSMENT_STATE_CACHE_SIZE', 5000))
+    ASSESSMENT_STATE_FLUSH_INTERVAL = float(os.getenv('ASSESSMENT_STATE_FLUSH_INTERVAL', 5))
+    REDIS_URL = os.getenv('REDIS_URL')
+
+    # Compiled per-job assessment plans (skills, priorities, question bank)
+    ASSESSMENT_PLAN_CACHE_SIZE = int(os.getenv('ASSESSMENT_PLAN_CACHE_SIZE', 256))
+    ASSESSMENT_PLAN_TTL = float(os.getenv('ASSESSMENT_PLAN_TTL', 300))
+
+    # Background generation of each attempt's likely next question
+    QUESTION_PREFETCH_ENABLED = os.getenv('QUESTION_PREFETCH_ENABLED', 'True') == 'True'
+
+    # Long-lived executor for real-time and prefetch generation; workers cap in-flight Gemini calls
+    GENERATION_EXECUTOR_WORKERS = int(os.getenv('GENERATION_EXECUTOR_WORKERS', 4))
+    GENERATION_EXECUTOR_QUEUE = int(os.getenv('GENERATION_EXECUTOR_QUEUE', 32))
+
+    # Concurrent real-time requests for one (job, skill, band) share a generation of this many questions
+    REALTIME_BURST_SIZE = int(os.getenv('REALTIME_BURST_SIZE', 5))
+    REALTIME_BUFFER_TTL = float(os.getenv('REALTIME_BUFFER_TTL', 300))
+
+    # Degradation: a breaker over real-time generation waits switches to stored questions
+    # when their p95 or failure rate crosses a threshold, then probes to recover
+    REALTIME_BREAKER_WINDOW = float(os.getenv('REALTIME_BREAKER_WINDOW', 60))
+    REALTIME_BREAKER_MIN_SAMPLES = int(os.getenv('REALTIME_BREAKER_MIN_SAMPLES', 20))
+    REALTIME_BREAKER_P95_SECONDS = float(os.getenv('REALTIME_BREAKER_P95_SECONDS', 3))
+    REALTIME_BREAKER_ERROR_RATE = float(os.getenv('REALTIME_BREAKER_ERROR_RATE', 0.5))
+    REALTIME_BREAKER_COOLDOWN = float(os.getenv('REALTIME_BREAKER_COOLDOWN', 30))
+    REALTIME_BANK_ONLY_DEPTH = int(os.getenv('REALTIME_BANK_ONLY_DEPTH', 10))
+    AI_FEEDBACK_SHED_QUEUE = int(os.getenv('AI_FEEDBACK_SHED_QUEUE', 20))
+
+    # Concurrent (skill, band) units in one question-bank generation run
+    QUESTION_BATCH_WORKERS = int(os.getenv('QUESTION_BATCH_WORKERS', 4))
+
+    # Background question-bank generation jobs (one runner thread per worker process)
+    GENERATION_JOB_RUNNER = os.getenv('GENERATION_JOB_RUNNER', 'True') == 'True'
+    GENERATION_JOB_POLL_INTERVAL = float(os.getenv('GENERATION_JOB_POLL_INTERVAL', 5))
+    GENERATION_JOB_STALE_SECONDS = float(os.getenv('GENERATION_JOB_STALE_SECONDS', 120))
+
+    # Subskill expansions (skill_subtopics table with a per-process LRU in front)
+    SUBSKILL_CACHE_TTL_DAYS = float(os.getenv('SUBSKILL_CACHE_TTL_DAYS', 30))
+    SUBSKILL_CACHE_SIZE = int(os.getenv('SUBSKILL_CACHE_SIZE', 1024))
+
+    # Process-wide skills name <-> id map, reloaded so skills added by other workers appear
+    SKILL_REGISTRY_TTL = float(os.getenv('SKILL_REGISTRY_TTL', 600))
+
+    # Shared cross-job question pool keyed by (skill, band); jobs add JD-specific overlays
+    QUESTION_POOL_ENABLED = os.getenv('QUESTION_POOL_ENABLED', 'True') == 'True'
+    QUESTION_POOL_TARGET_DEPTH = int(os.getenv('QUESTION_POOL_TARGET_DEPTH', 60))
+    QUESTION_POOL_OVERLAY_PER_BAND = int(os.getenv('QUESTION_POOL_OVERLAY_PER_BAND', 5))
+
+    # Job bank size per (skill, band) without the shared pool: 'simulated' (exam_simulator) or 'fixed' (20)
+    QUESTION_BANK_SIZING = os.getenv('QUESTION_BANK_SIZING', 'simulated')
+    QUESTION_BANK_SIZING_PERCENTILE = float(os.getenv('QUESTION_BANK_SIZING_PERCENTILE', 99))
+    QUESTION_BANK_SIZING_FACTOR = float(os.getenv('QUESTION_BANK_SIZING_FACTOR', 1.5))
+    QUESTION_BANK_SIZING_ATTEMPTS = int(os.getenv('QUESTION_BANK_SIZING_ATTEMPTS', 20000))
+
+    # Item statistics (flask refresh-item-stats): items with enough responses outside these bounds are retired
+    ITEM_STATS_RETIRE = os.getenv('ITEM_STATS_RETIRE', 'True') == 'True'
+    ITEM_STATS_MIN_RESPONSES = int(os.getenv('ITEM_STATS_MIN_RESPONSES', 30))
+    ITEM_STATS_MIN_P_VALUE = float(os.getenv('ITEM_STATS_MIN_P_VALUE', 0.1))
+    ITEM_STATS_MAX_P_VALUE = float(os.getenv('ITEM_STATS_MAX_P_VALUE', 0.95))
+    ITEM_STATS_MIN_DISCRIMINATION = float(os.getenv('ITEM_STATS_MIN_DISCRIMINATION', 0.05))
+
+    # LLM client: 'gemini', 'stub' (offline, deterministic), 'record' or 'replay' (JSONL cassette)
+    LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini')
+    LLM_MODEL = os.getenv('LLM_MODEL', 'gemini-1.5-flash')
+    GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
+    LLM_STUB_LATENCY = float(os.getenv('LLM_STUB_LATENCY', 0))
+    LLM_STUB_ERROR_RATE = float(os.getenv('LLM_STUB_ERROR_RATE', 0))
+    LLM_STUB_SEED = int(os.getenv('LLM_STUB_SEED', 0))
+    LLM_CASSETTE_PATH = os.getenv('LLM_CASSETTE_PATH', 'llm_cassette.jsonl')
+    LLM_CASSETTE_REALTIME = os.getenv('LLM_CASSETTE_REALTIME', 'False') == 'True'
+
+    # Per-call LLM telemetry: usage totals are appended to llm_usage every flush interval
+    LLM_USAGE_FLUSH_INTERVAL = float(os.getenv('LLM_USAGE_FLUSH_INTERVAL', 30))
+    LLM_COST_PER_1K_PROMPT_TOKENS = float(os.getenv('LLM_COST_PER_1K_PROMPT_TOKENS', 0.000075))
+    LLM_COST_PER_1K_RESPONSE_TOKENS = float(os.getenv('LLM_COST_PER_1K_RESPONSE_TOKENS', 0.0003))
+
+    # Prompt-keyed LLM response cache; only the listed call sites read and write it
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True') == 'True'
+    LLM_CACHE_SITES = os.getenv('LLM_CACHE_SITES', 'batch_generation,subskill_expansion,resume_parsing,ai_feedback')
+    LLM_CACHE_TTL_HOURS = float(os.getenv('LLM_CACHE_TTL_HOURS', 168))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 50000))
+
+    # Ask for MCQs as schema-constrained JSON; False uses the text format and regex parser
+    LLM_STRUCTURED_OUTPUT = os.getenv('LLM_STRUCTURED_OUTPUT', 'True') == 'True'
+    # Stream batch responses and commit questions as they arrive
+    LLM_STREAM_BATCHES = os.getenv('LLM_STREAM_BATCHES', 'True') == 'True'
+
+    # LLM admission: one rate ceiling for all call sites, shared by priority
+    # class (live exam > resume > batch > reports) and per recruiter within a
+    # class. The ceiling is for the deployment; each of the WEB_CONCURRENCY
+    # Gunicorn workers gets an equal share
+    WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+    GEMINI_REQUESTS_PER_MINUTE = float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', 60))
+    GEMINI_BURST = int(os.getenv('GEMINI_BURST', 5))
+    LLM_SCHEDULER_LIVE_RESERVE = int(os.getenv('LLM_SCHEDULER_LIVE_RESERVE', 1))
+    LLM_SCHEDULER_BATCH_RESERVE = int(os.getenv('LLM_SCHEDULER_BATCH_RESERVE', 2))
+    LLM_SCHEDULER_AGING_SECONDS = float(os.getenv('LLM_SCHEDULER_AGING_SECONDS', 30))
+
+    # Background replenisher keeping job banks above a watermark ahead of each job's window
+    REPLENISHER_ENABLED = os.getenv('REPLENISHER_ENABLED', 'True') == 'True'
+    REPLENISHER_INTERVAL = float(os.getenv('REPLENISHER_INTERVAL', 60))
+    REPLENISHER_HORIZON_HOURS = float(os.getenv('REPLENISHER_HORIZON_HOURS', 72))
+    REPLENISHER_UNITS_PER_TICK = int(os.getenv('REPLENISHER_UNITS_PER_TICK', 6))
+    REPLENISHER_LOW_RATIO = float(os.getenv('REPLENISHER_LOW_RATIO', 0.5))
+    REPLENISHER_MAX_DEPTH = int(os.getenv('REPLENISHER_MAX_DEPTH', 100))
@@ -0,0 +1,18 @@
+from app import db
+from datetime import datetime
+
+class ItemStat(db.Model):
+    """Response statistics for one MCQ, rebuilt from all attempts by `flask refresh-item-stats`."""
+    __tablename__ = 'item_stats'
+
+    mcq_id = db.Column(db.Integer, db.ForeignKey('mcqs.mcq_id', ondelete='CASCADE'), primary_key=True)
+    responses = db.Column(db.Integer, nullable=False, default=0)  # exposure: attempts that were asked this item
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    p_value = db.Column(db.Float)  # share answered correctly
+    discrimination = db.Column(db.Float)  # point-biserial against the rest of the attempt's score on the skill
+    status = db.Column(db.String(20), nullable=False, default='new')  # new, calibrated, too_easy, too_hard, weak
+    retired = db.Column(db.Boolean, nullable=False, default=False, index=True)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ItemStat mcq_id={self.mcq_id} p={self.p_value} status={self.status}>'
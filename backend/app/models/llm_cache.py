@@ -0,0 +1,20 @@
+from app import db
+from datetime import datetime
+
+class LLMCacheEntry(db.Model):
+    """A stored LLM response keyed by a hash of model, generation config, kind and prompt."""
+    __tablename__ = 'llm_cache'
+
+    key = db.Column(db.String(64), primary_key=True)  # sha256 hex, see llm_cache.cache_key
+    site = db.Column(db.String(50), nullable=False)
+    model = db.Column(db.String(100), nullable=False)
+    response_text = db.Column(db.Text, nullable=False)
+    prompt_tokens = db.Column(db.Integer)
+    response_tokens = db.Column(db.Integer)
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_hit_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<LLMCacheEntry key={self.key[:12]} site={self.site} hits={self.hits}>'
@@ -0,0 +1,23 @@
+from app import db
+from datetime import datetime
+
+class LLMUsage(db.Model):
+    """Append-only LLM usage totals, one row per (job, call site, model) per flush interval."""
+    __tablename__ = 'llm_usage'
+
+    usage_id = db.Column(db.BigInteger, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('job_descriptions.job_id', ondelete='CASCADE'), nullable=True, index=True)  # None for shared-pool and non-job calls
+    site = db.Column(db.String(50), nullable=False)  # batch_generation, realtime_generation, subskill_expansion, resume_parsing, ai_feedback
+    model = db.Column(db.String(100))  # None for caller-level outcomes (parse failures, fallbacks)
+    calls = db.Column(db.Integer, nullable=False, default=0)
+    failures = db.Column(db.Integer, nullable=False, default=0)  # quota, timeout and error outcomes
+    throttles = db.Column(db.Integer, nullable=False, default=0)  # calls the LLM scheduler refused; not counted in calls
+    parse_failures = db.Column(db.Integer, nullable=False, default=0)
+    fallbacks = db.Column(db.Integer, nullable=False, default=0)
+    prompt_tokens = db.Column(db.BigInteger, nullable=False, default=0)
+    response_tokens = db.Column(db.BigInteger, nullable=False, default=0)
+    seconds = db.Column(db.Float, nullable=False, default=0.0)
+    recorded_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<LLMUsage job_id={self.job_id} site={self.site} calls={self.calls}>'
@@ -4,7 +4,7 @@ class MCQ(db.Model):
     __tablename__ = 'mcqs'
     
     mcq_id = db.Column(db.Integer, primary_key=True)
-    job_id = db.Column(db.Integer, db.ForeignKey('job_descriptions.job_id'), nullable=False)
+    job_id = db.Column(db.Integer, db.ForeignKey('job_descriptions.job_id'), nullable=True)  # NULL for the shared (skill, band) pool
     skill_id = db.Column(db.Integer, db.ForeignKey('skills.skill_id'), nullable=False)
     question = db.Column(db.Text, nullable=False)
     option_a = db.Column(db.Text, nullable=False)
@@ -13,6 +13,14 @@ class MCQ(db.Model):
     option_d = db.Column(db.Text, nullable=False)
     correct_answer = db.Column(db.String(1), nullable=False)  # 'A', 'B', 'C', or 'D'
     difficulty_band = db.Column(db.String(20), nullable=False)  # 'good', 'better', 'perfect'
+    question_hash = db.Column(db.String(40))  # sha1 of the normalized question text, see services/dedup.py
+
+    __table_args__ = (
+        db.UniqueConstraint('job_id', 'skill_id', 'difficulty_band', 'question_hash', name='uq_mcqs_job_skill_band_hash'),
+        db.Index('uq_mcqs_pool_skill_band_hash', 'skill_id', 'difficulty_band', 'question_hash',
+                 unique=True, postgresql_where=db.text('job_id IS NULL')),
+        db.Index('ix_mcqs_job_skill_band_id', 'job_id', 'skill_id', 'difficulty_band', 'mcq_id'),
+    )
 
     # Relationships
     skill = db.relationship('Skill', backref='mcqs')
@@ -0,0 +1,25 @@
+from app import db
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import JSONB
+
+class QuestionGenerationJob(db.Model):
+    __tablename__ = 'question_generation_jobs'
+
+    generation_id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('job_descriptions.job_id', ondelete='CASCADE'), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    params = db.Column(JSONB, nullable=False)  # skills_with_priorities, jd_experience_range, job_description
+    progress = db.Column(JSONB, nullable=False, default=dict)  # "skill|band" -> saved, target, attempts, errors, status
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # times the job has been claimed by a worker
+    worker_id = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    # Relationships
+    job = db.relationship('JobDescription', backref=db.backref('generation_jobs', cascade='all, delete-orphan'))
+
+    def __repr__(self):
+        return f'<QuestionGenerationJob generation_id={self.generation_id} job_id={self.job_id} status={self.status}>'
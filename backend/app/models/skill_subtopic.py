@@ -0,0 +1,15 @@
+from app import db
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import JSONB
+
+class SkillSubtopic(db.Model):
+    __tablename__ = 'skill_subtopics'
+
+    skill_key = db.Column(db.String(255), primary_key=True)  # normalized skill name
+    skill_name = db.Column(db.String(255), nullable=False)
+    subtopics = db.Column(JSONB, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<SkillSubtopic skill_key={self.skill_key}>'
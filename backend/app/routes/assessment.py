@@ -10,13 +10,15 @@ from app.models.candidate import Candidate
 from app.models.job import JobDescription
 from app.models.assessment_attempt import AssessmentAttempt
 from app.models.required_skill import RequiredSkill
-from app.models.skill import Skill
 from app.models.candidate_skill import CandidateSkill
 from app.models.mcq import MCQ
 from app.models.assessment_registration import AssessmentRegistration
 from app.models.assessment_state import AssessmentState
 from app.models.proctoring_violation import ProctoringViolation
 from app.services.question_batches import generate_single_question
+from app.services import state_cache, prefetch, replenisher, skill_registry, degradation
+from app.services.question_bank import get_assessment_plan
+from app.services.exam_policy import allocate_questions, initial_band, next_band
 from google.cloud import storage
 from app.utils.gcs_upload import upload_to_gcs
 from app.utils.face import compare_faces_from_files
@@ -41,8 +43,6 @@ os.makedirs(WEBCAM_DIR, exist_ok=True)
 os.makedirs(SNAPSHOT_DIR, exist_ok=True)
 os.makedirs(VIOLATOIN_DIR, exist_ok=True)
 
-BAND_ORDER = ["good", "better", "perfect"]
-
 GREETING_MESSAGES = [
     "Alright, let's get started with your assessment! Here's your first question.",
     "Ready to show your skills? Here's the next question for you!",
@@ -63,35 +63,53 @@ INCORRECT_FEEDBACK = [
 ]
 
 def load_question_bank(job_id):
-    """Load and shuffle questions for a job, organized by skill and difficulty band."""
+    """Return the shared question bank for a job, organized by skill and difficulty band."""
     try:
-        bank = {band: {} for band in BAND_ORDER}
-        mcqs = MCQ.query.filter_by(job_id=job_id).join(Skill, Skill.skill_id == MCQ.skill_id).all()
-        
-        for mcq in mcqs:
-            skill_name = mcq.skill.name
-            band = mcq.difficulty_band
-            if skill_name not in bank[band]:
-                bank[band][skill_name] = []
-            if mcq.correct_answer not in ['A', 'B', 'C', 'D']:
-                logger.error(f"Invalid correct_answer '{mcq.correct_answer}' for MCQ mcq_id={mcq.mcq_id}")
-                continue
-            bank[band][skill_name].append({
-                "mcq_id": mcq.mcq_id,
-                "question": mcq.question,
-                "options": [mcq.option_a, mcq.option_b, mcq.option_c, mcq.option_d],
-                "answer": getattr(mcq, f"option_{mcq.correct_answer.lower()}")
-            })
-        
-        for band in bank:
-            for skill in bank[band]:
-                random.shuffle(bank[band][skill])
-        
-        return bank
+        return get_assessment_plan(job_id).bank
     except Exception as e:
         logger.error(f"Error in load_question_bank for job_id={job_id}: {str(e)}")
         raise
 
+def get_asked_mcq_ids(state):
+    """Return the mcq_ids already served in an attempt, in the order they were asked."""
+    if 'asked_mcq_ids' not in state:
+        # States written before attempts stored references only
+        state['asked_mcq_ids'] = [q['mcq_id'] for q in state.pop('asked_questions', [])]
+        state.pop('question_bank', None)
+    return state['asked_mcq_ids']
+
+def predict_next_skill(plan, state):
+    """Return the skill next-question will serve next, mirroring its priority walk."""
+    for skill in plan.skill_order:
+        if state['questions_per_skill'].get(skill, 0) > 0:
+            return skill
+    return None
+
+def schedule_prefetch(attempt_id, state, plan, asked_ids, skip_skill=None):
+    """Start generating the likely next question while the candidate is still answering.
+
+    asked_ids is the request's set of the attempt's asked mcq_ids. skip_skill
+    is the skill just served: its next band depends on the answer, so its
+    prefetch waits for submit-answer.
+    """
+    if state['question_count'] >= state['total_questions']:
+        return
+    skill = predict_next_skill(plan, state)
+    if not skill or skill == skip_skill:
+        return
+    band = state['current_band_per_skill'][skill]
+    # A bank kept deep by the replenisher already holds the next question
+    if replenisher.enabled() and plan.bank.pick(band, skill, state.get('shuffle_seed', attempt_id), asked_ids):
+        return
+    # So does any deep bank, and degraded generation is not worth a speculative call
+    if degradation.bank_first(plan.bank.depth(band, skill, asked_ids)):
+        return
+    used_questions = [q._asdict() for q in map(plan.bank.get_question, state['asked_mcq_ids']) if q]
+    prefetch.schedule(
+        attempt_id, skill, band,
+        state['job_id'], state.get('job_description', ""), used_questions
+    )
+
 def divide_experience_range(jd_range):
     """Divide job experience range into three bands."""
     try:
@@ -139,39 +157,21 @@ def compare_images(snapshot_url, profile_url):
     except Exception as e:
         return False, f"Face comparison failed: {str(e)}"
 
-def save_assessment_state(attempt_id, state):
-    """Save assessment state to database."""
+def save_assessment_state(attempt_id, state, durable=False):
+    """Save assessment state; writes are batched to the database unless durable is set."""
     try:
-        assessment_state = AssessmentState.query.get(attempt_id)
-        if assessment_state:
-            assessment_state.state = state
-        else:
-            assessment_state = AssessmentState(
-                attempt_id=attempt_id,
-                state=state,
-                skill_count=len(state.get('performance_log', {})),
-                expiry_date=datetime.utcnow() + timedelta(hours=24)  # Set expiry to 24 hours from now
-            )
-            db.session.add(assessment_state)
-        db.session.commit()
+        state_cache.put_state(attempt_id, state, durable=durable)
     except Exception as e:
         logger.error(f"Error saving assessment state for attempt_id={attempt_id}: {str(e)}")
-        db.session.rollback()
         raise
 
 def get_assessment_state(attempt_id):
-    """Retrieve assessment state from database."""
+    """Retrieve assessment state from the cache, falling back to the database."""
     try:
-        assessment_state = AssessmentState.query.get(attempt_id)
-        if not assessment_state:
+        state = state_cache.get_state(attempt_id)
+        if not state:
             logger.error(f"Assessment state not found for attempt_id={attempt_id}")
-            return None
-        if assessment_state.expiry_date and assessment_state.expiry_date < datetime.utcnow():
-            logger.warning(f"Assessment state expired for attempt_id={attempt_id}")
-            db.session.delete(assessment_state)
-            db.session.commit()
-            return None
-        return assessment_state.state
+        return state
     except Exception as e:
         logger.error(f"Error retrieving assessment state for attempt_id={attempt_id}: {str(e)}")
         raise
@@ -209,39 +209,33 @@ def start_assessment_session(attempt_id):
             logger.error(f"Invalid experience range for job_id={job.job_id}: min={job.experience_min}, max={job.experience_max}")
             return jsonify({'error': 'Invalid job experience range'}), 400
 
-        required_skills = RequiredSkill.query.filter_by(job_id=job.job_id).join(Skill, Skill.skill_id == RequiredSkill.skill_id).all()
-        jd_priorities = {rs.skill.name: rs.priority for rs in required_skills}
+        plan = get_assessment_plan(job.job_id)
+        jd_priorities = plan.priorities
         if not jd_priorities:
             logger.error(f"No required skills found for job_id={job.job_id}")
             return jsonify({'error': 'No required skills found for this job'}), 400
 
         proficiency_map = {4: "low", 6: "mid", 8: "high"}
-        candidate_skills = CandidateSkill.query.filter_by(candidate_id=candidate.candidate_id).join(Skill, Skill.skill_id == CandidateSkill.skill_id).all()
-        candidate_proficiency_per_skill = {
-            cs.skill.name: proficiency_map.get(cs.proficiency, "mid")
-            for cs in candidate_skills
-            if cs.skill.name in jd_priorities
-        }
-        proficiency_to_band = {"low": "good", "mid": "better", "high": "perfect"}
+        candidate_skills = CandidateSkill.query.filter_by(candidate_id=candidate.candidate_id).all()
+        candidate_proficiency_per_skill = {}
+        for cs in candidate_skills:
+            skill_name = skill_registry.skill_name(cs.skill_id)
+            if skill_name in jd_priorities:
+                candidate_proficiency_per_skill[skill_name] = proficiency_map.get(cs.proficiency, "mid")
 
         total_questions = job.num_questions
         test_duration = job.duration * 60
         candidate_experience = candidate.years_of_experience or 0
         jd_experience_range = f"{job.experience_min}-{job.experience_max}"
 
-        question_bank = load_question_bank(job.job_id)
-        if not any(bank for band in question_bank.values() for bank in band.values()):
+        if not plan.bank.has_questions():
             logger.error(f"No questions available for job_id={job.job_id}")
             return jsonify({'error': 'No questions available for this job'}), 400
 
         base_band = get_base_band(candidate_experience, jd_experience_range)
-        priority_sum = sum(jd_priorities.values()) or 1
-        questions_per_skill = {
-            skill: max(1, round((priority / priority_sum) * total_questions))
-            for skill, priority in jd_priorities.items()
-        }
+        questions_per_skill = allocate_questions(jd_priorities, total_questions)
         current_band_per_skill = {
-            skill: proficiency_to_band.get(candidate_proficiency_per_skill.get(skill, "mid"), base_band)
+            skill: initial_band(candidate_proficiency_per_skill.get(skill), base_band)
             for skill in jd_priorities
         }
         initial_band_per_skill = current_band_per_skill.copy()
@@ -257,7 +251,7 @@ def start_assessment_session(attempt_id):
 
         state = {
             'job_id': job.job_id,
-            'question_bank': question_bank,
+            'shuffle_seed': random.getrandbits(32),
             'questions_per_skill': questions_per_skill,
             'current_band_per_skill': current_band_per_skill,
             'initial_band_per_skill': initial_band_per_skill,
@@ -266,7 +260,7 @@ def start_assessment_session(attempt_id):
             'total_questions': total_questions,
             'test_duration': test_duration,
             'start_time': datetime.utcnow().timestamp(),
-            'asked_questions': [],
+            'asked_mcq_ids': [],
             'job_description': job.job_description or "",
             'custom_prompt': job.custom_prompt or "",
             'proctoring_data': {
@@ -278,7 +272,7 @@ def start_assessment_session(attempt_id):
                 "termination_reason": ""
             }
         }
-        save_assessment_state(attempt_id, state)
+        save_assessment_state(attempt_id, state, durable=True)
 
         return jsonify({
             'total_questions': total_questions,
@@ -414,10 +408,11 @@ def get_next_question(attempt_id):
         job_id = state['job_id']
         job_description = state.get('job_description', "")
         custom_prompt = state.get('custom_prompt', "")
-        asked_questions = state['asked_questions']
+        asked_mcq_ids = get_asked_mcq_ids(state)
 
         elapsed_time = datetime.utcnow().timestamp() - start_time
         if question_count >= total_questions or elapsed_time >= test_duration:
+            state_cache.flush_state(attempt_id)
             for skill in state['performance_log']:
                 state['performance_log'][skill]["final_band"] = state['current_band_per_skill'][skill]
                 correct = state['performance_log'][skill]["correct_answers"]
@@ -466,10 +461,8 @@ def get_next_question(attempt_id):
             attempt.status = 'completed'
             db.session.commit()
             # Delete state after completion
-            assessment_state = AssessmentState.query.get(attempt_id)
-            if assessment_state:
-                db.session.delete(assessment_state)
-                db.session.commit()
+            state_cache.discard_state(attempt_id)
+            prefetch.discard(attempt_id)
 
             return jsonify({
                 'message': 'Assessment completed',
@@ -477,57 +470,62 @@ def get_next_question(attempt_id):
                 'proctoring_data': proctoring_data
             }), 200
 
-        required_skills = RequiredSkill.query.filter_by(job_id=job_id).join(Skill, Skill.skill_id == RequiredSkill.skill_id).all()
-        jd_priorities = {rs.skill.name: rs.priority for rs in required_skills}
-        sorted_skills = sorted(questions_per_skill.items(), key=lambda x: -jd_priorities.get(x[0], 0))
-        for skill, remaining in sorted_skills:
-            if remaining <= 0:
+        plan = get_assessment_plan(job_id)
+        question_bank = plan.bank
+        asked_ids = set(asked_mcq_ids)
+        for skill in plan.skill_order:
+            if questions_per_skill.get(skill, 0) <= 0:
                 continue
 
             band = state['current_band_per_skill'][skill]
-            available = [
-                q for q in state['question_bank'].get(band, {}).get(skill, [])
-                if q['mcq_id'] not in [aq['mcq_id'] for aq in asked_questions]
-            ]
-
             question = None
+            pending = None
             if question_count > 0:
                 try:
-                    logger.debug(f"Generating question for skill={skill}, band={band}, attempt_id={attempt_id}")
-                    question_data = generate_single_question(skill, band, job_id, job_description, used_questions=asked_questions)
-                    if question_data:
-                        question = {
-                            "mcq_id": question_data["mcq_id"],
-                            "question": question_data["question"],
-                            "options": [
-                                question_data["option_a"],
-                                question_data["option_b"],
-                                question_data["option_c"],
-                                question_data["option_d"]
-                            ],
-                            "answer": question_data[f"option_{question_data['correct_answer'].lower()}"],
-                            "skill": skill,
-                            "difficulty_band": band
-                        }
-                        state['question_bank'].setdefault(band, {}).setdefault(skill, []).append(question)
+                    pending = prefetch.take(attempt_id, skill, band)
+                    if pending is None and (replenisher.enabled() or degradation.bank_first(question_bank.depth(band, skill, asked_ids))):
+                        # Banks kept ahead of demand, deep banks and degraded generation all serve stored
+                        # questions first; generate only once this band runs dry
+                        question = question_bank.pick(band, skill, state.get('shuffle_seed', attempt_id), asked_ids)
+                    if pending is None and not question:
+                        logger.debug(f"Generating question for skill={skill}, band={band}, attempt_id={attempt_id}")
+                        used_questions = [q._asdict() for q in map(question_bank.get_question, asked_mcq_ids) if q]
+                        question_data = generate_single_question(skill, band, job_id, job_description, used_questions=used_questions)
+                    elif pending is not None and pending.done() and not pending.cancelled():
+                        question_data = pending.result()
+                    else:
+                        question_data = None
+                    if question_data and question_data["mcq_id"] not in asked_ids:
+                        question = question_bank.add_generated(question_data)
                 except (timeout_decorator.TimeoutError, google.api_core.exceptions.GoogleAPIError) as e:
                     logger.warning(f"Real-time question generation failed for {skill} ({band}): {str(e)}. Falling back to database.")
 
-            if not question and available:
-                question = available.pop(0)
+            if not question:
+                question = question_bank.pick(band, skill, state.get('shuffle_seed', attempt_id), asked_ids)
+
+            if not question and pending is not None and not pending.done():
+                # The bank is dry for this band, so the in-flight prefetch is the only source left
+                try:
+                    question_data = pending.result(timeout=5)
+                    if question_data and question_data["mcq_id"] not in asked_ids:
+                        question = question_bank.add_generated(question_data)
+                except Exception as e:
+                    logger.warning(f"Prefetched question for {skill} ({band}) not ready: {str(e)}")
 
             if question:
                 state['questions_per_skill'][skill] -= 1
                 state['question_count'] += 1
-                state['asked_questions'].append(question)
+                asked_mcq_ids.append(question.mcq_id)
+                asked_ids.add(question.mcq_id)
                 save_assessment_state(attempt_id, state)
+                schedule_prefetch(attempt_id, state, plan, asked_ids, skip_skill=skill)
 
                 return jsonify({
                     'greeting': random.choice(GREETING_MESSAGES),
                     'question': {
-                        'mcq_id': question['mcq_id'],
-                        'question': question['question'],
-                        'options': question['options']
+                        'mcq_id': question.mcq_id,
+                        'question': question.question,
+                        'options': list(question.options)
                     },
                     'skill': skill,
                     'question_number': state['question_count']
@@ -563,43 +561,46 @@ def submit_answer(attempt_id):
             logger.error(f"Invalid answer '{user_input}' for attempt_id={attempt_id}")
             return jsonify({'error': 'Invalid answer provided'}), 400
 
-        if not mcq_id or mcq_id not in [q['mcq_id'] for q in state['asked_questions']]:
+        # One set per request, shared with the prefetch below
+        asked_ids = set(get_asked_mcq_ids(state))
+        if not mcq_id or mcq_id not in asked_ids:
             logger.error(f"Invalid mcq_id '{mcq_id}' for attempt_id={attempt_id}")
             return jsonify({'error': 'Invalid mcq_id provided'}), 400
 
-        question = next(q for q in state['asked_questions'] if q['mcq_id'] == mcq_id)
+        question = load_question_bank(state['job_id']).get_question(mcq_id)
+        if not question:
+            logger.error(f"Question mcq_id={mcq_id} no longer exists for attempt_id={attempt_id}")
+            return jsonify({'error': 'Invalid mcq_id provided'}), 400
         band = state['current_band_per_skill'][skill]
         
         input_map = {1: 'A', 2: 'B', 3: 'C', 4: 'D'}
         user_letter = input_map.get(int(user_input), '')
-        user_option = question['options'][int(user_input) - 1]
-        correct_letter = next(letter for letter, opt in zip(['A', 'B', 'C', 'D'], question['options']) if opt == question['answer'])
+        user_option = question.options[int(user_input) - 1]
+        correct_letter = question.correct_answer
         correct = user_letter == correct_letter
 
         state['performance_log'][skill]["questions_attempted"] += 1
         state['performance_log'][skill]["time_spent"] += time_taken
         state['performance_log'][skill]["responses"].append({
-            "mcq_id": question['mcq_id'],
-            "question": question['question'],
+            "mcq_id": question.mcq_id,
+            "question": question.question,
             "chosen": user_option,
-            "correct": question['answer'],
+            "correct": question.answer,
             "is_correct": correct,
             "band": band,
             "time_taken": time_taken
         })
 
+        state['current_band_per_skill'][skill] = next_band(band, correct)
         if correct:
             state['performance_log'][skill]["correct_answers"] += 1
-            if BAND_ORDER.index(band) < 2:
-                state['current_band_per_skill'][skill] = BAND_ORDER[BAND_ORDER.index(band) + 1]
             feedback = random.choice(CORRECT_FEEDBACK)
         else:
             state['performance_log'][skill]["incorrect_answers"] += 1
-            if BAND_ORDER.index(band) > 0:
-                state['current_band_per_skill'][skill] = BAND_ORDER[BAND_ORDER.index(band) - 1]
-            feedback = random.choice(INCORRECT_FEEDBACK).format(answer=question['answer'])
+            feedback = random.choice(INCORRECT_FEEDBACK).format(answer=question.answer)
 
         save_assessment_state(attempt_id, state)
+        schedule_prefetch(attempt_id, state, get_assessment_plan(state['job_id']), asked_ids)
         return jsonify({'feedback': feedback}), 200
     except Exception as e:
         logger.error(f"Error in submit_answer for attempt_id={attempt_id}: {str(e)}")
@@ -613,6 +614,8 @@ def end_assessment(attempt_id):
         if not state:
             logger.error(f"Assessment session not found for attempt_id={attempt_id}")
             return jsonify({'error': 'Assessment session not found'}), 404
+        # Persist buffered answers before the slow finalization so a crash here loses nothing
+        state_cache.flush_state(attempt_id)
 
         data = request.get_json()
         proctoring_data_in = data.get('proctoring_data', {})
@@ -663,10 +666,8 @@ def end_assessment(attempt_id):
         attempt.status = 'completed'
         db.session.commit()
         # Delete state after completion
-        assessment_state = AssessmentState.query.get(attempt_id)
-        if assessment_state:
-            db.session.delete(assessment_state)
-            db.session.commit()
+        state_cache.discard_state(attempt_id)
+        prefetch.discard(attempt_id)
 
         return jsonify({
             'message': 'Assessment completed',
@@ -5,7 +5,6 @@ from app.models.job import JobDescription
 from app.models.required_skill import RequiredSkill
 from app.models.assessment_attempt import AssessmentAttempt
 from app.models.assessment_registration import AssessmentRegistration
-from app.models.skill import Skill
 from app.models.candidate_skill import CandidateSkill
 from app.models.assessment_state import AssessmentState
 from app.models.degree import Degree
@@ -15,13 +14,13 @@ from app.models.recruiter import Recruiter
 from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timezone, timedelta
 from app.utils.gcs_upload import upload_to_gcs
+from app.services import llm, llm_usage, skill_registry
 from flask_mail import Message
 from google.cloud import storage
 import os
 import re
 import difflib
 import pytz
-import google.generativeai as genai
 import logging
 from io import BytesIO
 from pdfminer.high_level import extract_text
@@ -39,9 +38,6 @@ candidate_api_bp = Blueprint('candidate_api', __name__, url_prefix='/api/candida
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Configure Gemini API
-genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-
 def send_otp_email(email, otp):
     """Send OTP to the candidate's email using flask_mail."""
     try:
@@ -89,7 +85,6 @@ def extract_text_from_pdf(pdf_file):
 
 def analyze_resume(resume_text):
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
         prompt = f"""
 You are a JSON assistant. Extract and return ONLY valid JSON in the following format (no comments or explanations):
 
@@ -144,9 +139,14 @@ Extract information from the resume as follows:
 Resume:
 {resume_text}
         """
-        response = model.generate_content(prompt)
+        response = llm.generate(prompt, kind="resume", generation_config=None, site="resume_parsing")
+        if parse_json_output(response.text) is None:
+            # Keep an unparseable answer out of the response cache so a retry asks again
+            llm_usage.record_outcome("resume_parsing", "parse_fail")
+            llm.forget(response)
         return response.text
-    except Exception:
+    except Exception as e:
+        logger.error(f"Resume analysis failed: {str(e)}")
         return None
 
 def parse_json_output(json_string):
@@ -643,33 +643,33 @@ def update_profile(user_id):
                 skills_data.get("Tools", [])
             )
 
+            skill_ids = skill_registry.get_or_create(all_skills)
+            existing_skills = {
+                cs.skill_id: cs for cs in CandidateSkill.query.filter_by(candidate_id=candidate.candidate_id).all()
+            }
             for skill_name in all_skills:
                 skill_name = skill_name.strip()
                 if not skill_name:
                     continue
 
-                skill = Skill.query.filter_by(name=skill_name).first()
-                if not skill:
-                    skill = Skill(name=skill_name, category='technical')
-                    db.session.add(skill)
-                    db.session.flush()
-
+                skill_id = skill_ids.get(skill_name)
+                if skill_id is None:
+                    # Another request is inserting the same skill and has not committed yet
+                    db.session.rollback()
+                    return jsonify({'error': f"Skill '{skill_name}' is being added by another request. Please try again."}), 409
                 proficiency = infer_proficiency(skill_name, work_experience, education, projects)
 
-                existing_skill = CandidateSkill.query.filter_by(
-                    candidate_id=candidate.candidate_id,
-                    skill_id=skill.skill_id
-                ).first()
-
+                existing_skill = existing_skills.get(skill_id)
                 if existing_skill:
                     existing_skill.proficiency = proficiency
                 else:
                     candidate_skill = CandidateSkill(
                         candidate_id=candidate.candidate_id,
-                        skill_id=skill.skill_id,
+                        skill_id=skill_id,
                         proficiency=proficiency
                     )
                     db.session.add(candidate_skill)
+                    existing_skills[skill_id] = candidate_skill
 
         if profile_pic_file:
             profile_pic_filename = f"uploads/profile_pics/{candidate.candidate_id}_{profile_pic_file.filename}"
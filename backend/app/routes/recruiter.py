@@ -6,7 +6,6 @@ from app import db, mail
 from app.models.user import User, PasswordResetToken
 from app.models.login_log import LoginLog
 from app.models.job import JobDescription
-from app.models.skill import Skill
 from app.models.recruiter import Recruiter
 from app.models.required_skill import RequiredSkill
 from app.models.candidate import Candidate
@@ -18,13 +17,12 @@ from app.models.assessment_proctoring_data import AssessmentProctoringData
 from app.models.subscription_plan import SubscriptionPlan
 from app.models.proctoring_violation import ProctoringViolation
 from app.models.degree_branch import DegreeBranch
-from app.services import question_batches
+from app.services import degradation, generation_jobs, llm, llm_usage, skill_registry
 from sqlalchemy import and_
 from sqlalchemy.orm import joinedload
 from datetime import datetime, timezone, timedelta
 import logging
 import os
-import google.generativeai as genai
 import importlib
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
@@ -43,19 +41,6 @@ recruiter_api_bp = Blueprint('recruiter_api', __name__, url_prefix='/api/recruit
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Configure Gemini AI API
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    raise ValueError("GOOGLE_API_KEY environment variable not set")
-genai.configure(api_key=api_key)
-generation_config = {
-    "temperature": 0.2,
-    "max_output_tokens": 2048
-}
-model_gemini = genai.GenerativeModel(
-    model_name="gemini-1.5-flash", generation_config=generation_config
-)
-
 
 def generate_ai_feedback(candidate_data, proctoring_data, violations):
     """
@@ -99,13 +84,20 @@ def generate_ai_feedback(candidate_data, proctoring_data, violations):
             f"Violations: {[{'type': v.violation_type, 'timestamp': v.timestamp.isoformat()} for v in violations]}"
         )
 
-        # Call Gemini AI
-        response = model_gemini.generate_content(prompt)
+        # Call Gemini AI; under load only a cached report is served
+        if degradation.shed_feedback():
+            response = llm.lookup(prompt, kind="feedback", site="ai_feedback")
+            if response is None:
+                llm_usage.record_outcome("ai_feedback", "shed", job_id)
+                return {"summary": "AI feedback is temporarily unavailable due to high load. Please try again shortly."}
+        else:
+            response = llm.generate(prompt, kind="feedback", site="ai_feedback", job_id=job_id)
         feedback = response.text.strip() if response.text else "No feedback generated."
 
         return {"summary": feedback}
     except Exception as e:
-        print(f"Error generating AI feedback with Gemini: {str(e)}")
+        logger.error(f"Error generating AI feedback with Gemini: {str(e)}")
+        llm_usage.record_outcome("ai_feedback", "fallback", candidate_data.get('job_id'))
         return {"summary": "AI feedback unavailable due to an error."}
 
 # Helper function to check if recruiter has AI reports enabled
@@ -379,6 +371,8 @@ def create_assessment():
         return jsonify({'error': 'Missing required fields'}), 400
     if not isinstance(data['skills'], list) or not all('name' in skill and 'priority' in skill for skill in data['skills']):
         return jsonify({'error': 'Skills must be a list of objects with "name" and "priority"'}), 400
+    if not all(isinstance(skill['name'], str) and skill['name'].strip() for skill in data['skills']):
+        return jsonify({'error': 'Skill names must not be blank'}), 400
 
     try:
         experience_min = float(data['experience_min'])
@@ -426,35 +420,35 @@ def create_assessment():
         db.session.flush()
         priority_map = {'low': 2, 'medium': 3, 'high': 5}
         for skill_data in data['skills']:
-            priority = priority_map.get(skill_data['priority'].lower())
-            if not priority:
+            if skill_data['priority'].lower() not in priority_map:
                 db.session.rollback()
                 return jsonify({'error': f"Invalid priority: {skill_data['priority']}. Must be 'low', 'medium', or 'high'."}), 400
-            skill = Skill.query.filter_by(name=skill_data['name']).first()
-            if not skill:
-                skill = Skill(name=skill_data['name'], category='technical')
-                db.session.add(skill)
-                db.session.flush()
-            required_skill = RequiredSkill(
-                job_id=assessment.job_id,
-                skill_id=skill.skill_id,
-                priority=priority
-            )
-            db.session.add(required_skill)
+        skill_ids = skill_registry.get_or_create([skill_data['name'] for skill_data in data['skills']])
+        # Case and spacing variants resolve to one skill; keep its highest priority
+        required = {}
+        for skill_data in data['skills']:
+            name = skill_data['name'].strip()
+            priority = priority_map[skill_data['priority'].lower()]
+            skill_id = skill_ids.get(name)
+            if skill_id is None:
+                # Another request is inserting the same skill and has not committed yet
+                db.session.rollback()
+                return jsonify({'error': f"Skill '{name}' is being added by another request. Please try again."}), 409
+            if skill_id not in required or priority > required[skill_id][1]:
+                required[skill_id] = (required.get(skill_id, (name,))[0], priority)
+        for skill_id, (_, priority) in required.items():
+            db.session.add(RequiredSkill(job_id=assessment.job_id, skill_id=skill_id, priority=priority))
         db.session.commit()
-        try:
-            skills_with_priorities = [
-                {'name': skill_data['name'], 'priority': priority_map[skill_data['priority'].lower()]}
-                for skill_data in data['skills']
-            ]
-            jd_experience_range = f"{experience_min}-{experience_max}"
-            question_batches.prepare_question_batches(
-                skills_with_priorities, jd_experience_range, assessment.job_id, assessment.custom_prompt
-            )
-        except Exception as e:
-            logger.warning(f"Failed to generate question batches for job_id={assessment.job_id}: {str(e)}")
-            pass
-        return jsonify({'message': 'Assessment created successfully', 'job_id': assessment.job_id}), 201
+        skills_with_priorities = [{'name': name, 'priority': priority} for name, priority in required.values()]
+        jd_experience_range = f"{experience_min}-{experience_max}"
+        generation = generation_jobs.enqueue(
+            assessment.job_id, skills_with_priorities, jd_experience_range, assessment.custom_prompt
+        )
+        return jsonify({
+            'message': 'Assessment created successfully',
+            'job_id': assessment.job_id,
+            'generation_id': generation.generation_id
+        }), 201
     except ValueError as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
@@ -462,6 +456,40 @@ def create_assessment():
         db.session.rollback()
         return jsonify({'error': f'Failed to create assessment: {str(e)}'}), 500
 
+@recruiter_api_bp.route('/assessments/<int:job_id>/generation', methods=['GET', 'POST'])
+def question_generation_status(job_id):
+    """Report question-bank generation progress for a job; POST re-queues a finished or failed run."""
+    if 'user_id' not in session or session.get('role') != 'recruiter':
+        return jsonify({'error': 'Unauthorized'}), 401
+    recruiter = Recruiter.query.filter_by(user_id=session['user_id']).first()
+    if not recruiter:
+        return jsonify({'error': 'Recruiter not found'}), 404
+    job = JobDescription.query.get(job_id)
+    if not job or job.recruiter_id != recruiter.recruiter_id:
+        return jsonify({'error': 'Assessment not found'}), 404
+    generation = generation_jobs.latest_for_job(job_id)
+    if not generation:
+        return jsonify({'error': 'No question generation found for this assessment'}), 404
+    if request.method == 'POST':
+        if generation.status in ('queued', 'running'):
+            return jsonify({'error': f'Question generation is already {generation.status}'}), 409
+        generation_jobs.requeue(generation)
+        return jsonify(generation_jobs.to_dict(generation)), 202
+    return jsonify(generation_jobs.to_dict(generation)), 200
+
+@recruiter_api_bp.route('/assessments/<int:job_id>/llm-usage', methods=['GET'])
+def llm_usage_summary(job_id):
+    """Report LLM calls, tokens, latency and estimated cost spent on a job, by call site."""
+    if 'user_id' not in session or session.get('role') != 'recruiter':
+        return jsonify({'error': 'Unauthorized'}), 401
+    recruiter = Recruiter.query.filter_by(user_id=session['user_id']).first()
+    if not recruiter:
+        return jsonify({'error': 'Recruiter not found'}), 404
+    job = JobDescription.query.get(job_id)
+    if not job or job.recruiter_id != recruiter.recruiter_id:
+        return jsonify({'error': 'Assessment not found'}), 404
+    return jsonify(llm_usage.job_summary(job_id)), 200
+
 @recruiter_api_bp.route('/assessments/<int:user_id>', methods=['GET'])
 def get_assessments_by_id(user_id):
     if 'user_id' not in session or session['role'] != 'recruiter':
@@ -536,7 +564,7 @@ def get_ranked_candidates(job_id):
         for skill_id, priority in required_skill_dict.items():
             proficiency = candidate_skill_map.get(candidate.candidate_id, {}).get(skill_id, 0)
             if proficiency > 0:
-                skill_name = Skill.query.get(skill_id).name
+                skill_name = skill_registry.skill_name(skill_id)
                 matched_skills.append(f"{skill_name} (Proficiency: {proficiency})")
                 skill_score += priority * proficiency
 
@@ -763,7 +791,7 @@ def get_combined_report(job_id):
         for skill_id, priority in required_skill_dict.items():
             proficiency = candidate_skill_map.get(candidate.candidate_id, {}).get(skill_id, 0)
             if proficiency > 0:
-                skill_name = Skill.query.get(skill_id).name
+                skill_name = skill_registry.skill_name(skill_id)
                 matched_skills.append(f"{skill_name} (Proficiency: {proficiency})")
                 skill_score += priority * proficiency
 
@@ -6,6 +6,7 @@ from app.models.candidate import Candidate
 from app.models.assessment_registration import AssessmentRegistration
 from app.models.assessment_attempt import AssessmentAttempt
 from app.models.proctoring_violation import ProctoringViolation
+from app.services.question_bank import invalidate_assessment_plan
 from flask_mail import Message
 
 recruiter_analytics_api_bp = Blueprint('recruiter_analytics_api', __name__, url_prefix='/api/recruiter/analytics')
@@ -202,6 +203,7 @@ def suspend_job(job_id):
     job.status = 'suspended'
     job.suspension_reason = reason
     db.session.commit()
+    invalidate_assessment_plan(job_id)
 
     registrations = AssessmentRegistration.query.filter_by(job_id=job_id).all()
     for reg in registrations:
@@ -247,6 +249,7 @@ def delete_job(job_id):
 
     db.session.delete(job)
     db.session.commit()
+    invalidate_assessment_plan(job_id)
     return jsonify({'message': 'Job deleted successfully'}), 200
 
 @recruiter_analytics_api_bp.route('/shortlist/notify', methods=['POST'])
@@ -0,0 +1,197 @@
+import hashlib
+import logging
+import re
+import threading
+from array import array
+from collections import OrderedDict, deque
+from flask import current_app
+from sqlalchemy import text
+from app import db
+from app.models.mcq import MCQ
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# MinHash over word 3-gram shingles, bucketed by LSH into 16 bands of 4 rows.
+# With b=16, r=4 a pair becomes a candidate around Jaccard 0.5; candidates are
+# then confirmed against NEAR_DUPLICATE_THRESHOLD on the full signature.
+NUM_PERM = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+NEAR_DUPLICATE_THRESHOLD = 0.7
+# One SHAKE-128 digest per shingle yields NUM_PERM independent 32-bit hashes,
+# so the signature is a C-level elementwise min instead of NUM_PERM Python loops
+_DIGEST_BYTES = NUM_PERM * 4
+
+# A band's pool is saturated when most of the recent candidates were duplicates
+SATURATION_WINDOW = 40
+SATURATION_MIN_SAMPLES = 20
+SATURATION_RATIO = 0.8
+
+MAX_INDEXES = 2048
+
+_WORD_RE = re.compile(r"[a-z0-9_]+")
+
+
+def normalize_question(question):
+    return " ".join(_WORD_RE.findall(question.lower()))
+
+
+def question_hash(question):
+    """Stable hash of the normalized question text, stored in mcqs.question_hash."""
+    return hashlib.sha1(normalize_question(question).encode("utf-8")).hexdigest()
+
+
+def minhash(normalized):
+    words = normalized.split()
+    if len(words) < 3:
+        shingles = {normalized}
+    else:
+        shingles = {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+    return tuple(map(min, zip(*(array("I", hashlib.shake_128(shingle.encode("utf-8")).digest(_DIGEST_BYTES)) for shingle in shingles))))
+
+
+def similarity(signature, other):
+    return sum(x == y for x, y in zip(signature, other)) / NUM_PERM
+
+
+class DedupIndex:
+    """Exact-hash set plus MinHash LSH buckets for one (job, skill, band) pool."""
+
+    def __init__(self):
+        self.hashes = set()
+        self.signatures = {}  # question_hash -> signature
+        self.buckets = {}  # (band index, band values) -> {question_hash, ...}
+        self.recent = deque(maxlen=SATURATION_WINDOW)  # True for rejected candidates
+        self.rejected = {"exact": 0, "near": 0}
+        self._lock = threading.Lock()
+
+    def _bucket_keys(self, signature):
+        return [(i, signature[i * LSH_ROWS:(i + 1) * LSH_ROWS]) for i in range(LSH_BANDS)]
+
+    def _insert(self, digest, signature):
+        self.hashes.add(digest)
+        self.signatures[digest] = signature
+        for key in self._bucket_keys(signature):
+            self.buckets.setdefault(key, set()).add(digest)
+
+    def _find(self, digest, signature):
+        if digest in self.hashes:
+            return "exact"
+        seen = set()
+        for key in self._bucket_keys(signature):
+            for candidate in self.buckets.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                if similarity(signature, self.signatures[candidate]) >= NEAR_DUPLICATE_THRESHOLD:
+                    return "near"
+        return None
+
+    def load(self, questions):
+        for question in questions:
+            normalized = normalize_question(question)
+            self._insert(hashlib.sha1(normalized.encode("utf-8")).hexdigest(), minhash(normalized))
+        return self
+
+    def admit(self, question):
+        """Check a candidate and reserve it if new; returns None when admitted, else 'exact' or 'near'."""
+        normalized = normalize_question(question)
+        digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+        signature = minhash(normalized)
+        with self._lock:
+            reason = self._find(digest, signature)
+            self.recent.append(reason is not None)
+            if reason:
+                self.rejected[reason] += 1
+            else:
+                self._insert(digest, signature)
+        metrics.incr("mcq_dedup", outcome=reason or "admitted")
+        return reason
+
+    def find(self, question):
+        """Check a candidate without reserving or counting it."""
+        normalized = normalize_question(question)
+        with self._lock:
+            return self._find(hashlib.sha1(normalized.encode("utf-8")).hexdigest(), minhash(normalized))
+
+    def release(self, question):
+        """Drop a reservation whose insert failed."""
+        digest = question_hash(question)
+        with self._lock:
+            signature = self.signatures.pop(digest, None)
+            self.hashes.discard(digest)
+            if signature is not None:
+                for key in self._bucket_keys(signature):
+                    self.buckets.get(key, set()).discard(digest)
+
+    @property
+    def saturated(self):
+        with self._lock:
+            samples = len(self.recent)
+            return samples >= SATURATION_MIN_SAMPLES and sum(self.recent) / samples >= SATURATION_RATIO
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_index(job_id, skill_id, band):
+    """Return the dedup index for a pool, loading existing question texts on first use."""
+    key = (job_id, skill_id, band)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+
+    rows = db.session.query(MCQ.question).filter_by(job_id=job_id, skill_id=skill_id, difficulty_band=band).all()
+    loaded = DedupIndex().load(question for (question,) in rows)
+    with _indexes_lock:
+        # Another thread may have loaded it meanwhile; keep the first so reservations are shared
+        index = _indexes.setdefault(key, loaded)
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def screen(job_id, skill_id, band, question):
+    """Admit a candidate into a job's pool, also rejecting repeats of the shared pool it overlays.
+
+    Returns None when admitted, else 'exact' or 'near'.
+    """
+    if job_id is not None and current_app.config.get('QUESTION_POOL_ENABLED', True):
+        reason = get_index(None, skill_id, band).find(question)
+        if reason:
+            metrics.incr("mcq_dedup", outcome=reason)
+            return reason
+    return get_index(job_id, skill_id, band).admit(question)
+
+
+def backfill_question_hashes(batch_size=1000):
+    """Hash rows saved before question_hash existed; run by `flask upgrade-schema`.
+
+    Exact repeats already in a pool cannot share a hash under the unique
+    index, so every copy after the first gets a per-row legacy marker.
+    """
+    while True:
+        rows = db.session.query(MCQ.mcq_id, MCQ.job_id, MCQ.skill_id, MCQ.difficulty_band, MCQ.question).filter(
+            MCQ.question_hash.is_(None)
+        ).order_by(MCQ.mcq_id).limit(batch_size).all()
+        if not rows:
+            return
+        taken = {
+            (job_id, skill_id, band, digest)
+            for job_id, skill_id, band, digest in db.session.query(
+                MCQ.job_id, MCQ.skill_id, MCQ.difficulty_band, MCQ.question_hash
+            ).filter(MCQ.job_id.in_({row.job_id for row in rows}), MCQ.question_hash.isnot(None))
+        }
+        updates = []
+        for row in rows:
+            key = (row.job_id, row.skill_id, row.difficulty_band, question_hash(row.question))
+            updates.append({"mcq_id": row.mcq_id, "question_hash": f"legacy-{row.mcq_id}" if key in taken else key[3]})
+            taken.add(key)
+        db.session.execute(text("UPDATE mcqs SET question_hash = :question_hash WHERE mcq_id = :mcq_id"), updates)
+        db.session.commit()
+        logger.info(f"Backfilled question_hash for {len(updates)} MCQs")
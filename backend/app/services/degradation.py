@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+from collections import deque
+from flask import current_app, has_app_context
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Latency-aware degradation for real-time question generation. Every wait a
+# candidate spends on live generation (join to question or timeout) is fed to
+# a circuit breaker with a rolling window. When the window's p95 passes
+# REALTIME_BREAKER_P95_SECONDS, or too many waits fail, the breaker opens and
+# next-question requests are served from the bank and the MCQ table without
+# calling the LLM. After a cooldown one request probes live generation; a
+# fast success closes the breaker, anything else reopens it for twice as long.
+# Jobs whose bank is deep for a band serve it first regardless, and AI
+# feedback is shed while the breaker is not closed or the LLM scheduler is
+# backed up.
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+MAX_SAMPLES = 512
+MAX_COOLDOWN = 600
+
+
+class RealtimeUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Rolling-window breaker over (seconds, ok) observations of one operation."""
+
+    def __init__(self, window=60.0, min_samples=20, p95_threshold=3.0, error_threshold=0.5, cooldown=30.0):
+        self.window = window
+        self.min_samples = min_samples
+        self.p95_threshold = p95_threshold
+        self.error_threshold = error_threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self._samples = deque(maxlen=MAX_SAMPLES)  # (monotonic time, seconds, ok)
+        self._opened_at = 0.0
+        self._probe_started = None
+        self._lock = threading.Lock()
+
+    def _trim(self, now):
+        while self._samples and self._samples[0][0] < now - self.window:
+            self._samples.popleft()
+
+    def _stats(self):
+        if not self._samples:
+            return None, None
+        latencies = sorted(seconds for _, seconds, _ in self._samples)
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        error_rate = sum(1 for _, _, ok in self._samples if not ok) / len(self._samples)
+        return p95, error_rate
+
+    def stats(self):
+        """Return (samples, p95 seconds, error rate) over the current window."""
+        with self._lock:
+            self._trim(time.monotonic())
+            return (len(self._samples), *self._stats())
+
+    def _transition(self, state, now):
+        self.state = state
+        metrics.incr("realtime_breaker_transitions", state=state)
+        if state == OPEN:
+            self._opened_at = now
+            logger.warning(f"Real-time generation breaker opened for {self.cooldown:.0f}s; serving stored questions")
+        elif state == CLOSED:
+            self.cooldown = self.base_cooldown
+            self._samples.clear()
+            logger.info("Real-time generation breaker closed")
+
+    def allow(self):
+        """Whether a caller may try live generation now; in half-open state only one probe at a time may."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self._opened_at < self.cooldown:
+                    return False
+                self._transition(HALF_OPEN, now)
+                self._probe_started = None
+            # A probe that never reported back is given up after one cooldown
+            if self._probe_started is not None and now - self._probe_started < self.cooldown:
+                return False
+            self._probe_started = now
+            return True
+
+    def record(self, seconds, ok):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                self._probe_started = None
+                if ok and seconds <= self.p95_threshold:
+                    self._transition(CLOSED, now)
+                else:
+                    self.cooldown = min(MAX_COOLDOWN, self.cooldown * 2)
+                    self._transition(OPEN, now)
+                return
+            if self.state == OPEN:
+                return  # late results from calls started before the breaker opened
+            self._samples.append((now, seconds, ok))
+            self._trim(now)
+            if len(self._samples) < self.min_samples:
+                return
+            p95, error_rate = self._stats()
+            if p95 > self.p95_threshold or error_rate >= self.error_threshold:
+                self._transition(OPEN, now)
+
+
+_breaker = CircuitBreaker()
+
+
+def init_app(app):
+    global _breaker
+    _breaker = CircuitBreaker(
+        window=app.config.get('REALTIME_BREAKER_WINDOW', 60),
+        min_samples=app.config.get('REALTIME_BREAKER_MIN_SAMPLES', 20),
+        p95_threshold=app.config.get('REALTIME_BREAKER_P95_SECONDS', 3.0),
+        error_threshold=app.config.get('REALTIME_BREAKER_ERROR_RATE', 0.5),
+        cooldown=app.config.get('REALTIME_BREAKER_COOLDOWN', 30)
+    )
+    metrics.register_gauge("realtime_breaker_state", lambda: _breaker.state)
+    metrics.register_gauge("realtime_generation_p95_seconds", lambda: _breaker.stats()[1])
+
+
+def healthy():
+    return _breaker.state == CLOSED
+
+
+def allow_realtime():
+    """Whether a next-question request may wait on live generation; counts the requests turned away."""
+    allowed = _breaker.allow()
+    if not allowed:
+        metrics.incr("realtime_generation_degraded", reason="breaker")
+    return allowed
+
+
+def record_realtime(seconds, ok):
+    _breaker.record(seconds, ok)
+
+
+def bank_first(depth):
+    """Whether to serve a (skill, band) from the job's bank before generating, given its unasked depth."""
+    if not healthy():
+        return True
+    threshold = current_app.config.get('REALTIME_BANK_ONLY_DEPTH', 10) if has_app_context() else 0
+    return bool(threshold) and depth >= threshold
+
+
+def shed_feedback():
+    """Whether to skip an uncached AI feedback call: live generation is degraded or the LLM queue is long."""
+    from app.services import llm_scheduler
+
+    if not healthy():
+        reason = "breaker"
+    else:
+        limit = current_app.config.get('AI_FEEDBACK_SHED_QUEUE', 20) if has_app_context() else 0
+        if not limit or sum(llm_scheduler.get_scheduler().queued().values()) < limit:
+            return False
+        reason = "queue"
+    metrics.incr("ai_feedback_shed", reason=reason)
+    return True
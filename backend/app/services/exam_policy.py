@@ -0,0 +1,29 @@
+# Adaptive exam rules shared by the assessment routes and the exam simulator:
+# how a job's questions are split across skills, which band each skill
+# starts in, and how an answer moves the skill between bands.
+
+BAND_ORDER = ["good", "better", "perfect"]
+PROFICIENCY_TO_BAND = {"low": "good", "mid": "better", "high": "perfect"}
+
+# TRANSITIONS[band index][answered correctly] -> next band index: one band up
+# after a correct answer, one down after a wrong one, clamped at both ends.
+# Kept as a table so the simulator can apply it to whole arrays of attempts.
+TRANSITIONS = tuple((max(i - 1, 0), min(i + 1, len(BAND_ORDER) - 1)) for i in range(len(BAND_ORDER)))
+
+
+def next_band(band, correct):
+    return BAND_ORDER[TRANSITIONS[BAND_ORDER.index(band)][bool(correct)]]
+
+
+def allocate_questions(priorities, total_questions):
+    """Split total_questions across skills by priority; every skill gets at least one."""
+    priority_sum = sum(priorities.values()) or 1
+    return {
+        skill: max(1, round((priority / priority_sum) * total_questions))
+        for skill, priority in priorities.items()
+    }
+
+
+def initial_band(proficiency, base_band):
+    """Starting band for a skill from the candidate's stated proficiency (mid when not stated)."""
+    return PROFICIENCY_TO_BAND.get(proficiency or "mid", base_band)
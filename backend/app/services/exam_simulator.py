@@ -0,0 +1,177 @@
+import math
+import time
+import click
+import numpy as np
+from flask import current_app
+from flask.cli import with_appcontext
+from app.models.job import JobDescription
+from app.models.required_skill import RequiredSkill
+from app.services import skill_registry
+from app.services.exam_policy import BAND_ORDER, PROFICIENCY_TO_BAND, TRANSITIONS, allocate_questions
+
+# Headless Monte Carlo model of the adaptive exam, used to size job question
+# banks. Each simulated attempt walks the job's skills in priority order the
+# way next-question does, answers with a probability that depends on a latent
+# ability and the band's difficulty, and moves between bands with the shared
+# exam_policy transition table. All attempts advance together as NumPy
+# arrays, so a hundred thousand attempts take a fraction of a second.
+#
+# An attempt never repeats a question, so a (skill, band) pool needs at least
+# as many questions as one attempt draws from it. The draw at a high
+# percentile, times a factor so candidates do not all see the same items, is
+# what prepare_question_batches generates per band instead of a fixed 20.
+#
+# Candidate model: each skill's proficiency is drawn from a mix (it sets the
+# starting band and the mean ability, like a stated proficiency does for a
+# real candidate), ability varies around that mean per skill, and years of
+# experience spread over the JD range shift it up or down a little.
+
+GUESS_RATE = 0.25  # four options
+BAND_DIFFICULTY = np.array([-1.0, 0.0, 1.0])  # ability at which a band's items are answered 62.5% of the time
+PROFICIENCY_ABILITY = {"low": -1.0, "mid": 0.0, "high": 1.0}
+DEFAULT_PROFICIENCY_MIX = {"low": 0.2, "mid": 0.6, "high": 0.2}
+ABILITY_SPREAD = 0.75
+EXPERIENCE_SHIFT = 0.5  # ability added at the top of the JD range, subtracted at the bottom
+PERCENTILES = (50, 90, 95, 99)
+
+_TRANSITIONS = np.array(TRANSITIONS, dtype=np.intp)
+
+
+def init_app(app):
+    app.cli.add_command(simulate_exam_command)
+
+
+def skill_walk(priorities, num_questions):
+    """Questions each skill gets in one attempt, in serving order; later skills lose out when rounding overshoots."""
+    allocation = allocate_questions(priorities, num_questions)
+    remaining = num_questions
+    walk = []
+    for skill in sorted(priorities, key=lambda name: -priorities[name]):
+        count = min(allocation[skill], remaining)
+        walk.append((skill, count))
+        remaining -= count
+    return walk
+
+
+def _experience_position(experience_range, attempts, rng):
+    """Where each simulated candidate's experience falls, from -1 (bottom of the JD range) to 1 (top)."""
+    start, end = map(float, experience_range.split("-")) if experience_range else (0.0, 0.0)
+    if end <= start:
+        return np.zeros(attempts)
+    years = rng.uniform(start, end, attempts)
+    return 2 * (years - start) / (end - start) - 1
+
+
+def simulate(priorities, num_questions, experience_range=None, attempts=10000, proficiency_mix=None, seed=0):
+    """Run attempts simulated exams; returns {skill: int array (attempts, bands)} of questions served per band."""
+    rng = np.random.default_rng(seed)
+    mix = proficiency_mix or DEFAULT_PROFICIENCY_MIX
+    levels = list(mix)
+    weights = np.array([mix[level] for level in levels], dtype=float)
+    start_band = np.array([BAND_ORDER.index(PROFICIENCY_TO_BAND[level]) for level in levels], dtype=np.intp)
+    mean_ability = np.array([PROFICIENCY_ABILITY[level] for level in levels])
+    shift = EXPERIENCE_SHIFT * _experience_position(experience_range, attempts, rng)
+
+    rows = np.arange(attempts)
+    served = {}
+    for skill, count in skill_walk(priorities, num_questions):
+        level = rng.choice(len(levels), size=attempts, p=weights / weights.sum())
+        ability = mean_ability[level] + shift + rng.normal(0.0, ABILITY_SPREAD, attempts)
+        band = start_band[level]
+        counts = np.zeros((attempts, len(BAND_ORDER)), dtype=np.int32)
+        for _ in range(count):
+            counts[rows, band] += 1
+            p_correct = GUESS_RATE + (1 - GUESS_RATE) / (1 + np.exp(BAND_DIFFICULTY[band] - ability))
+            correct = rng.random(attempts) < p_correct
+            band = _TRANSITIONS[band, correct.astype(np.intp)]
+        served[skill] = counts
+    return served
+
+
+def summarize(served, percentiles=PERCENTILES):
+    """Per (skill, band): mean questions served per attempt, share of attempts reaching the band, and percentiles."""
+    summary = {}
+    for skill, counts in served.items():
+        quantiles = np.percentile(counts, percentiles, axis=0)
+        summary[skill] = {
+            band: dict(
+                mean=round(float(counts[:, i].mean()), 2),
+                reached=round(float((counts[:, i] > 0).mean()), 4),
+                **{f"p{q}": float(quantiles[k, i]) for k, q in enumerate(percentiles)}
+            )
+            for i, band in enumerate(BAND_ORDER)
+        }
+    return summary
+
+
+def band_targets(served, percentile=99, factor=1.0):
+    """Questions to pre-generate per (skill, band): the per-attempt draw at percentile, times factor."""
+    return {
+        skill: {
+            band: math.ceil(float(value) * factor)
+            for band, value in zip(BAND_ORDER, np.percentile(counts, percentile, axis=0))
+        }
+        for skill, counts in served.items()
+    }
+
+
+def job_band_targets(job_id, priorities, experience_range):
+    """Simulated bank size per (skill, band) for a job, or {} when it has no question count."""
+    job = JobDescription.query.get(job_id) if job_id is not None else None
+    if not job or not job.num_questions or not priorities:
+        return {}
+    served = simulate(
+        priorities, job.num_questions, experience_range,
+        attempts=current_app.config.get('QUESTION_BANK_SIZING_ATTEMPTS', 20000), seed=job_id
+    )
+    return band_targets(
+        served,
+        percentile=current_app.config.get('QUESTION_BANK_SIZING_PERCENTILE', 99),
+        factor=current_app.config.get('QUESTION_BANK_SIZING_FACTOR', 1.5)
+    )
+
+
+@click.command('simulate-exam')
+@with_appcontext
+@click.option('--job-id', type=int, help='Take skills, priorities, question count and experience range from this job.')
+@click.option('--skill', 'skills', multiple=True, metavar='NAME=PRIORITY', help='A skill and its priority (repeatable).')
+@click.option('--questions', type=int, help='Questions per exam.')
+@click.option('--experience', help='JD experience range, e.g. 3-6.')
+@click.option('--attempts', type=int, default=100000, show_default=True)
+@click.option('--mix', default='low=0.2,mid=0.6,high=0.2', show_default=True, help='Share of candidates at each stated proficiency.')
+@click.option('--percentile', type=float, help='Percentile that sizes the bank (default QUESTION_BANK_SIZING_PERCENTILE).')
+@click.option('--seed', type=int, default=0)
+def simulate_exam_command(job_id, skills, questions, experience, attempts, mix, percentile, seed):
+    """Simulate adaptive exams and report questions served per skill and band."""
+    priorities = {}
+    if job_id is not None:
+        job = JobDescription.query.get(job_id)
+        if not job:
+            raise click.BadParameter(f"Job {job_id} not found", param_hint='--job-id')
+        for required in RequiredSkill.query.filter_by(job_id=job_id).all():
+            priorities[skill_registry.skill_name(required.skill_id)] = required.priority
+        questions = questions or job.num_questions
+        experience = experience or f"{job.experience_min}-{job.experience_max}"
+    for spec in skills:
+        name, _, priority = spec.rpartition('=')
+        priorities[name] = int(priority)
+    if not priorities or not questions:
+        raise click.UsageError("Give --job-id, or --skill and --questions")
+    proficiency_mix = {level: float(share) for level, share in (item.split('=') for item in mix.split(','))}
+    percentile = percentile or current_app.config.get('QUESTION_BANK_SIZING_PERCENTILE', 99)
+    factor = current_app.config.get('QUESTION_BANK_SIZING_FACTOR', 1.5)
+
+    started = time.perf_counter()
+    served = simulate(priorities, questions, experience, attempts=attempts, proficiency_mix=proficiency_mix, seed=seed)
+    elapsed = time.perf_counter() - started
+    targets = band_targets(served, percentile, factor)
+
+    click.echo(f"{attempts} attempts of {questions} questions in {elapsed:.2f}s ({attempts / elapsed:,.0f} attempts/s)")
+    click.echo(f"{'skill':<24}{'band':<9}{'reached':>8}{'mean':>7}" + "".join(f"{f'p{q}':>6}" for q in PERCENTILES) + f"{'generate':>10}")
+    for skill, bands in summarize(served).items():
+        for band, stats in bands.items():
+            click.echo(
+                f"{skill[:23]:<24}{band:<9}{stats['reached']:>8.1%}{stats['mean']:>7.2f}"
+                + "".join(f"{stats[f'p{q}']:>6.0f}" for q in PERCENTILES)
+                + f"{targets[skill][band]:>10}"
+            )
@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# One long-lived, bounded executor per worker process for real-time and
+# prefetch question generation. Its thread count caps in-flight Gemini calls,
+# the queue is bounded, and work that outlives its requester is kept: the
+# generated question is adopted into the job's bank instead of being lost.
+
+
+class QueueFull(Exception):
+    pass
+
+
+class GenerationTask:
+    """Handle for a queued generation; mirrors the Future API used by callers."""
+
+    __slots__ = ("deadline", "future", "abandoned", "_stop")
+
+    def __init__(self, deadline=None):
+        self.deadline = deadline  # monotonic time after which the task is not worth starting
+        self.future = None
+        self.abandoned = False
+        self._stop = threading.Event()
+
+    def cancel(self):
+        """Drop the task if it has not started; otherwise ask it to stop before its next LLM call."""
+        self._stop.set()
+        return self.future.cancel()
+
+    def stop_requested(self):
+        return self._stop.is_set()
+
+    def abandon(self):
+        """Mark that the requester stopped waiting; the result will only be adopted."""
+        self.abandoned = True
+
+    def done(self):
+        return self.future.done()
+
+    def cancelled(self):
+        return self.future.cancelled()
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+
+class GenerationExecutor:
+    def __init__(self, app, workers, max_queued):
+        self.app = app
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="question-generation")
+        self._capacity = threading.BoundedSemaphore(workers + max_queued)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+
+    def submit(self, fn, *args, deadline=None, adopt_into=None, **kwargs):
+        """Queue fn(*args, should_stop=..., **kwargs); raises QueueFull when the queue is at capacity.
+
+        adopt_into is a job_id whose question bank receives the result (a
+        question dict or a list of them).
+        """
+        if not self._capacity.acquire(blocking=False):
+            metrics.incr("question_generation_tasks", outcome="rejected")
+            raise QueueFull("Question generation queue is full")
+        task = GenerationTask(deadline)
+        with self._lock:
+            self.queued += 1
+        task.future = self._pool.submit(self._run, task, fn, args, kwargs, adopt_into)
+        task.future.add_done_callback(self._release)
+        return task
+
+    def _release(self, future):
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+            metrics.incr("question_generation_tasks", outcome="cancelled")
+        self._capacity.release()
+
+    def _run(self, task, fn, args, kwargs, adopt_into):
+        with self._lock:
+            self.queued -= 1
+        if task.stop_requested():
+            metrics.incr("question_generation_tasks", outcome="cancelled")
+            return None
+        if task.deadline is not None and time.monotonic() > task.deadline:
+            metrics.incr("question_generation_tasks", outcome="expired")
+            return None
+
+        with self._lock:
+            self.in_flight += 1
+        started = time.monotonic()
+        try:
+            with self.app.app_context():
+                result = fn(*args, should_stop=task.stop_requested, **kwargs)
+                if result and adopt_into is not None:
+                    self._adopt(adopt_into, result, task)
+                return result
+        except Exception as e:
+            metrics.incr("question_generation_tasks", outcome="failed")
+            logger.warning(f"Question generation task failed: {str(e)}")
+            return None
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            metrics.observe("question_generation_seconds", time.monotonic() - started)
+
+    def _adopt(self, job_id, result, task):
+        from app.services.question_bank import get_assessment_plan
+
+        bank = get_assessment_plan(job_id).bank
+        for question_data in (result if isinstance(result, list) else [result]):
+            bank.add_generated(question_data)
+        metrics.incr("question_generation_tasks", outcome="adopted_late" if task.abandoned else "completed")
+
+
+_executor = None
+
+
+def init_app(app):
+    global _executor
+    if _executor is not None:
+        return
+    _executor = GenerationExecutor(
+        app,
+        workers=app.config.get('GENERATION_EXECUTOR_WORKERS', 4),
+        max_queued=app.config.get('GENERATION_EXECUTOR_QUEUE', 32)
+    )
+    metrics.register_gauge("question_generation_in_flight", lambda: _executor.in_flight)
+    metrics.register_gauge("question_generation_queued", lambda: _executor.queued)
+
+
+def submit(fn, *args, deadline=None, adopt_into=None, **kwargs):
+    if _executor is None:
+        raise QueueFull("Question generation executor is not initialized")
+    return _executor.submit(fn, *args, deadline=deadline, adopt_into=adopt_into, **kwargs)
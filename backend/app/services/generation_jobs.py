@@ -0,0 +1,222 @@
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from app import db
+from app.models.question_generation_job import QuestionGenerationJob
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+MAX_CLAIMS = 3  # a job that keeps killing its worker is failed after this many claims
+
+_wakeup = threading.Event()
+_runner_started = False
+
+
+def init_app(app):
+    """Start this process's background runner."""
+    global _runner_started
+    if not app.config.get('GENERATION_JOB_RUNNER', True) or _runner_started:
+        return
+    threading.Thread(target=_run_forever, args=(app,), name="question-generation-runner", daemon=True).start()
+    _runner_started = True
+
+
+def enqueue(job_id, skills_with_priorities, jd_experience_range, job_description=""):
+    """Queue question-bank generation for a job and wake the runner; returns the new row."""
+    generation = QuestionGenerationJob(
+        job_id=job_id,
+        status='queued',
+        params={
+            'skills_with_priorities': skills_with_priorities,
+            'jd_experience_range': jd_experience_range,
+            'job_description': job_description or ""
+        },
+        progress={}
+    )
+    db.session.add(generation)
+    db.session.commit()
+    _wakeup.set()
+    logger.info(f"Queued question generation generation_id={generation.generation_id} for job_id={job_id}")
+    return generation
+
+
+def requeue(generation):
+    """Put a failed or completed job back in the queue; generation resumes from saved questions."""
+    generation.status = 'queued'
+    generation.error = None
+    generation.finished_at = None
+    generation.attempts = 0
+    db.session.commit()
+    _wakeup.set()
+    return generation
+
+
+def latest_for_job(job_id):
+    return QuestionGenerationJob.query.filter_by(job_id=job_id).order_by(QuestionGenerationJob.generation_id.desc()).first()
+
+
+def _claim(stale_after):
+    """Claim one queued job, or a running job whose worker stopped heartbeating."""
+    now = datetime.utcnow()
+    generation = QuestionGenerationJob.query.filter(
+        or_(
+            QuestionGenerationJob.status == 'queued',
+            (QuestionGenerationJob.status == 'running') & (QuestionGenerationJob.heartbeat_at < now - stale_after)
+        )
+    ).order_by(QuestionGenerationJob.generation_id).with_for_update(skip_locked=True).first()
+    if generation is None:
+        db.session.rollback()
+        return None
+
+    if generation.status == 'running':
+        logger.warning(f"Reclaiming generation_id={generation.generation_id} from stale worker {generation.worker_id}")
+    generation.attempts += 1
+    if generation.attempts > MAX_CLAIMS:
+        generation.status = 'failed'
+        generation.error = f"Abandoned after {MAX_CLAIMS} interrupted runs"
+        generation.finished_at = now
+        db.session.commit()
+        return None
+    generation.status = 'running'
+    generation.worker_id = WORKER_ID
+    generation.started_at = generation.started_at or now
+    generation.heartbeat_at = now
+    db.session.commit()
+    return generation
+
+
+class _ProgressRecorder:
+    """Collects per-unit progress from pool threads and persists it with the heartbeat."""
+
+    def __init__(self, generation_id, progress):
+        self.generation_id = generation_id
+        self.progress = dict(progress or {})
+        # Attempts and errors from interrupted runs carry over into the resumed units
+        self._carry = {key: (unit.get('attempts', 0), unit.get('errors', 0)) for key, unit in self.progress.items()}
+        self._lock = threading.Lock()
+        self._changed = True
+
+    def __call__(self, skill_name, band, saved, target, status, attempts=0, errors=0, scope="job"):
+        key = f"{skill_name}|{band}" if scope == "job" else f"{scope}|{skill_name}|{band}"
+        carried_attempts, carried_errors = self._carry.get(key, (0, 0))
+        with self._lock:
+            self.progress[key] = {
+                'skill': skill_name,
+                'band': band,
+                'scope': scope,
+                'saved': saved,
+                'target': target,
+                'attempts': carried_attempts + attempts,
+                'errors': carried_errors + errors,
+                'status': status,
+                'updated_at': datetime.utcnow().isoformat()
+            }
+            self._changed = True
+
+    def flush(self):
+        """Write progress and bump the heartbeat; needs an app context."""
+        with self._lock:
+            values = {'heartbeat_at': datetime.utcnow()}
+            if self._changed:
+                values['progress'] = dict(self.progress)
+                self._changed = False
+        QuestionGenerationJob.query.filter_by(generation_id=self.generation_id, worker_id=WORKER_ID).update(
+            values, synchronize_session=False
+        )
+        db.session.commit()
+
+
+def _heartbeat_loop(app, recorder, stop, interval):
+    with app.app_context():
+        while not stop.wait(interval):
+            try:
+                recorder.flush()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Heartbeat failed for generation_id={recorder.generation_id}: {str(e)}")
+
+
+def _run(app, generation):
+    from app.services.question_batches import prepare_question_batches
+
+    params = generation.params
+    recorder = _ProgressRecorder(generation.generation_id, generation.progress)
+    stop = threading.Event()
+    interval = max(1.0, app.config.get('GENERATION_JOB_STALE_SECONDS', 120) / 4)
+    heartbeat = threading.Thread(target=_heartbeat_loop, args=(app, recorder, stop, interval), daemon=True)
+    heartbeat.start()
+    status, error = 'completed', None
+    try:
+        prepare_question_batches(
+            params['skills_with_priorities'], params['jd_experience_range'], generation.job_id,
+            params.get('job_description', ""), progress=recorder, resume=True
+        )
+    except Exception as e:
+        db.session.rollback()
+        status, error = 'failed', str(e)
+        logger.error(f"Question generation failed for generation_id={generation.generation_id}: {error}")
+    finally:
+        stop.set()
+        heartbeat.join()
+
+    recorder.flush()
+    QuestionGenerationJob.query.filter_by(generation_id=generation.generation_id, worker_id=WORKER_ID).update({
+        'status': status,
+        'error': error,
+        'finished_at': datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+    logger.info(f"Question generation {status} for generation_id={generation.generation_id}, job_id={generation.job_id}")
+
+
+def _run_forever(app):
+    poll_interval = app.config.get('GENERATION_JOB_POLL_INTERVAL', 5)
+    stale_after = timedelta(seconds=app.config.get('GENERATION_JOB_STALE_SECONDS', 120))
+    while True:
+        try:
+            with app.app_context():
+                generation = _claim(stale_after)
+                if generation is not None:
+                    _run(app, generation)
+                    continue
+        except Exception as e:
+            logger.error(f"Question generation runner error: {str(e)}")
+        _wakeup.wait(poll_interval)
+        _wakeup.clear()
+
+
+def eta_seconds(generation):
+    """Estimate seconds left from the share of target questions saved since the job started."""
+    if generation.status != 'running' or not generation.started_at:
+        return None
+    units = (generation.progress or {}).values()
+    target = sum(unit['target'] for unit in units)
+    saved = sum(min(unit['saved'], unit['target']) for unit in units)
+    if not target or not saved:
+        return None
+    elapsed = (datetime.utcnow() - generation.started_at).total_seconds()
+    return round(elapsed * (target - saved) / saved)
+
+
+def to_dict(generation):
+    units = sorted((generation.progress or {}).values(), key=lambda unit: (unit['skill'], unit['band'], unit.get('scope', 'job')))
+    return {
+        'generation_id': generation.generation_id,
+        'job_id': generation.job_id,
+        'status': generation.status,
+        'error': generation.error,
+        'created_at': generation.created_at.isoformat() if generation.created_at else None,
+        'started_at': generation.started_at.isoformat() if generation.started_at else None,
+        'finished_at': generation.finished_at.isoformat() if generation.finished_at else None,
+        'questions_saved': sum(unit['saved'] for unit in units),
+        'questions_target': sum(unit['target'] for unit in units),
+        'eta_seconds': eta_seconds(generation),
+        'units': [
+            dict({key: unit[key] for key in ('skill', 'band', 'saved', 'target', 'attempts', 'errors', 'status')}, scope=unit.get('scope', 'job'))
+            for unit in units
+        ]
+    }
@@ -0,0 +1,180 @@
+import csv
+import io
+import logging
+import time
+from datetime import datetime
+import click
+import numpy as np
+from flask import current_app, has_app_context
+from flask.cli import with_appcontext
+from sqlalchemy import select, text, true
+from app import db
+from app.models.item_stats import ItemStat
+from app.models.mcq import MCQ
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Item analysis over every recorded answer. Responses live inside each
+# attempt's performance_log JSON; PostgreSQL unnests them and streams
+# (attempt, skill, mcq, correct) rows out with COPY, and all statistics are
+# grouped sums over flat NumPy arrays, so millions of responses take seconds.
+#
+# Per item: exposure (responses), p-value (share correct) and discrimination,
+# the point-biserial correlation between answering it correctly and the
+# candidate's share correct on the other questions of the same skill in that
+# attempt. Items with at least ITEM_STATS_MIN_RESPONSES responses that nearly
+# everyone gets right or wrong, or that strong candidates do no better on
+# (often a wrong answer key), are retired: question banks and the pre-stored
+# fallback stop serving them.
+
+STATUSES = ("new", "calibrated", "too_easy", "too_hard", "weak")
+RETIRED = ("too_easy", "too_hard", "weak")
+COLUMNS = ("mcq_id", "responses", "correct", "p_value", "discrimination", "status", "retired", "computed_at")
+
+_RESPONSES_SQL = """
+    COPY (
+        SELECT a.attempt_id, k.skill_id, (r->>'mcq_id')::int, COALESCE((r->>'is_correct')::boolean, false)::int
+        FROM assessment_attempts a
+        CROSS JOIN LATERAL jsonb_each(
+            CASE WHEN jsonb_typeof(a.performance_log) = 'object' THEN a.performance_log ELSE '{}'::jsonb END
+        ) s
+        JOIN skills k ON k.name = s.key
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(s.value->'responses') = 'array' THEN s.value->'responses' ELSE '[]'::jsonb END
+        ) r
+        WHERE r->>'mcq_id' IS NOT NULL
+    ) TO STDOUT
+"""
+
+
+def init_app(app):
+    app.cli.add_command(refresh_item_stats_command)
+
+
+def not_retired():
+    """Criterion excluding retired MCQs from selection (true when ITEM_STATS_RETIRE is off)."""
+    if has_app_context() and not current_app.config.get('ITEM_STATS_RETIRE', True):
+        return true()
+    return MCQ.mcq_id.notin_(select(ItemStat.mcq_id).where(ItemStat.retired))
+
+
+def load_responses():
+    """Return (attempt_ids, skill_ids, mcq_ids, correct) arrays for every recorded answer."""
+    buffer = io.StringIO()
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(_RESPONSES_SQL, buffer)
+    # COPY text output is tab- and newline-separated integers
+    values = np.fromstring(buffer.getvalue(), dtype=np.int64, sep=' ').reshape(-1, 4)
+    return values[:, 0], values[:, 1], values[:, 2], values[:, 3].astype(bool)
+
+
+def compute(attempt_ids, skill_ids, mcq_ids, correct):
+    """Per-item statistics from parallel response arrays.
+
+    Returns (mcq_ids, responses, correct counts, p-values, discrimination),
+    one entry per distinct item; discrimination is NaN where it is undefined
+    (every response alike, or no other answers on the skill to compare with).
+    """
+    items, item = np.unique(mcq_ids, return_inverse=True)
+    count = len(items)
+    # One group per (attempt, skill): the candidate's answers the item is compared with
+    _, group = np.unique(attempt_ids * (int(skill_ids.max(initial=0)) + 1) + skill_ids, return_inverse=True)
+    c = correct.astype(np.float64)
+    others = np.bincount(group)[group] - 1
+    scored = others > 0
+    rest = np.divide(np.bincount(group, weights=c)[group] - c, others, out=np.zeros_like(c), where=scored)
+
+    responses = np.bincount(item, minlength=count)
+    hits = np.bincount(item, weights=c, minlength=count)
+    w = scored.astype(np.float64)
+    n = np.bincount(item, weights=w, minlength=count)
+    sum_c = np.bincount(item, weights=c * w, minlength=count)
+    sum_x = np.bincount(item, weights=rest * w, minlength=count)
+    sum_xx = np.bincount(item, weights=rest * rest * w, minlength=count)
+    sum_cx = np.bincount(item, weights=c * rest * w, minlength=count)
+    # c is 0/1, so sum of c squared is sum_c
+    variance = (n * sum_c - sum_c ** 2) * (n * sum_xx - sum_x ** 2)
+    defined = variance > 1e-12
+    discrimination = np.full(count, np.nan)
+    discrimination[defined] = (n * sum_cx - sum_c * sum_x)[defined] / np.sqrt(variance[defined])
+    p_values = np.divide(hits, responses, out=np.zeros(count), where=responses > 0)
+    return items, responses, hits.astype(np.int64), p_values, discrimination
+
+
+def classify(responses, p_values, discrimination, config):
+    """Status per item; only items with enough responses are judged."""
+    status = np.full(len(responses), "calibrated", dtype=object)
+    status[discrimination < config.get('ITEM_STATS_MIN_DISCRIMINATION', 0.05)] = "weak"
+    status[p_values > config.get('ITEM_STATS_MAX_P_VALUE', 0.95)] = "too_easy"
+    status[p_values < config.get('ITEM_STATS_MIN_P_VALUE', 0.1)] = "too_hard"
+    status[responses < config.get('ITEM_STATS_MIN_RESPONSES', 30)] = "new"
+    return status
+
+
+def store(items, responses, hits, p_values, discrimination, status):
+    """Upsert the statistics through a COPY staging table and commit; returns rows written."""
+    now = datetime.utcnow().isoformat(sep=' ')
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in zip(items.tolist(), responses.tolist(), hits.tolist(), p_values.tolist(), discrimination.tolist(), status.tolist()):
+        mcq_id, count, correct, p_value, disc, state = row
+        writer.writerow([mcq_id, count, correct, round(p_value, 6), "" if disc != disc else round(disc, 6), state, state in RETIRED, now])
+    buffer.seek(0)
+    columns = ", ".join(COLUMNS)
+    try:
+        db.session.execute(text("CREATE TEMP TABLE item_stats_import ON COMMIT DROP AS SELECT * FROM item_stats WITH NO DATA"))
+        cursor = db.session.connection().connection.cursor()
+        cursor.copy_expert(f"COPY item_stats_import ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        # Items deleted since they were answered have nothing to attach to
+        result = db.session.execute(text(f"""
+            INSERT INTO item_stats ({columns})
+            SELECT {", ".join(f"i.{column}" for column in COLUMNS)} FROM item_stats_import i JOIN mcqs m ON m.mcq_id = i.mcq_id
+            ON CONFLICT (mcq_id) DO UPDATE SET {", ".join(f"{column} = excluded.{column}" for column in COLUMNS[1:])}
+        """))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return result.rowcount
+
+
+def refresh():
+    """Recompute item statistics from all attempts; returns a summary with per-phase timings."""
+    timings = {}
+    started = time.perf_counter()
+    attempt_ids, skill_ids, mcq_ids, correct = load_responses()
+    timings["load"] = time.perf_counter() - started
+    summary = {"responses": len(mcq_ids), "items": 0, "statuses": {}, "timings": timings}
+    if not len(mcq_ids):
+        return summary
+
+    started = time.perf_counter()
+    items, responses, hits, p_values, discrimination = compute(attempt_ids, skill_ids, mcq_ids, correct)
+    status = classify(responses, p_values, discrimination, current_app.config)
+    timings["compute"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    summary["items"] = store(items, responses, hits, p_values, discrimination, status)
+    timings["store"] = time.perf_counter() - started
+
+    labels, counts = np.unique(status.astype(str), return_counts=True)
+    summary["statuses"] = dict(zip(labels.tolist(), counts.tolist()))
+    for label, value in summary["statuses"].items():
+        metrics.incr("item_stats_items", value, status=label)
+    metrics.observe("item_stats_refresh_seconds", sum(timings.values()))
+    logger.info(f"Item statistics refreshed: {summary['responses']} responses, {summary['items']} items, {summary['statuses']}")
+    return summary
+
+
+@click.command('refresh-item-stats')
+@with_appcontext
+def refresh_item_stats_command():
+    """Recompute p-value, discrimination and exposure for every answered MCQ."""
+    summary = refresh()
+    timings = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in summary["timings"].items())
+    click.echo(f"{summary['responses']} responses, {summary['items']} items ({timings})")
+    for status in STATUSES:
+        if status in summary["statuses"]:
+            retired = " (retired)" if status in RETIRED else ""
+            click.echo(f"  {status}: {summary['statuses'][status]}{retired}")
@@ -0,0 +1,580 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# Single client layer for every LLM call (question generation, subskill
+# expansion, resume parsing, AI reports). LLM_BACKEND picks the backend:
+#   gemini  - Google Gemini (needs GOOGLE_API_KEY when the first call is made)
+#   stub    - deterministic offline responses with configurable latency/errors
+#   record  - Gemini, appending every exchange to the LLM_CASSETTE_PATH cassette
+#   replay  - answers served from the cassette; no network access at all
+# Callers pass the kind of response they expect so the stub can produce it.
+# Responses for call sites in LLM_CACHE_SITES are served from and stored in
+# the llm_cache table (see app.services.llm_cache); a call that reaches the
+# backend first waits for admission by the process-wide scheduler
+# (see app.services.llm_scheduler).
+
+try:
+    from google.api_core.exceptions import TooManyRequests
+except ImportError:  # stub/replay deployments do not need the Google SDK
+    class TooManyRequests(Exception):
+        pass
+
+KINDS = ("mcq", "subtopics", "resume", "feedback", "text")
+
+DEFAULT_GENERATION_CONFIG = {
+    "temperature": 0.2,
+    "max_output_tokens": 2048
+}
+
+
+STREAM_CHUNK_CHARS = 200  # piece size when a backend without native streaming is streamed
+
+
+def json_generation_config(schema, max_output_tokens=4096):
+    """Generation config asking for JSON matching schema; JSON keys cost extra output tokens."""
+    return dict(
+        DEFAULT_GENERATION_CONFIG, max_output_tokens=max_output_tokens,
+        response_mime_type="application/json", response_schema=schema
+    )
+
+
+class LLMResponse(NamedTuple):
+    text: str
+    prompt_tokens: int = None  # as reported by the backend; None when it does not say
+    response_tokens: int = None
+    cache_key: str = None  # set when the response came from or went to llm_cache
+    cached: bool = False
+
+
+class CassetteMiss(LookupError):
+    pass
+
+
+def prompt_key(kind, prompt):
+    return hashlib.sha1(f"{kind}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def _pieces(response):
+    """Split a whole response into stream chunks; token counts ride on the last one."""
+    text = response.text or ""
+    starts = range(0, len(text), STREAM_CHUNK_CHARS) or [0]
+    for start in starts:
+        last = start + STREAM_CHUNK_CHARS >= len(text)
+        yield response._replace(
+            text=text[start:start + STREAM_CHUNK_CHARS],
+            prompt_tokens=response.prompt_tokens if last else None,
+            response_tokens=response.response_tokens if last else None
+        )
+
+
+class GeminiBackend:
+    name = "gemini"
+
+    def __init__(self, model_name="gemini-1.5-flash", api_key=None):
+        self.model_name = model_name
+        self.api_key = api_key
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _model(self, generation_config):
+        key = json.dumps(generation_config, sort_keys=True)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                import google.generativeai as genai
+
+                if not self._models:
+                    if not self.api_key:
+                        raise ValueError("GOOGLE_API_KEY environment variable not set")
+                    genai.configure(api_key=self.api_key)
+                model = self._models[key] = genai.GenerativeModel(
+                    model_name=self.model_name, generation_config=generation_config
+                )
+            return model
+
+    def generate(self, prompt, kind="text", timeout=None, generation_config=DEFAULT_GENERATION_CONFIG):
+        request_options = {"timeout": timeout} if timeout else None
+        response = self._model(generation_config).generate_content(prompt, request_options=request_options)
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(
+            response.text,
+            getattr(usage, "prompt_token_count", None),
+            getattr(usage, "candidates_token_count", None)
+        )
+
+    def stream(self, prompt, kind="text", timeout=None, generation_config=DEFAULT_GENERATION_CONFIG):
+        request_options = {"timeout": timeout} if timeout else None
+        for chunk in self._model(generation_config).generate_content(prompt, stream=True, request_options=request_options):
+            usage = getattr(chunk, "usage_metadata", None)
+            try:
+                text = chunk.text
+            except ValueError:  # a chunk carrying only a finish reason or usage
+                text = ""
+            # Intermediate chunks report zero usage; only the final counts are meaningful
+            yield LLMResponse(
+                text,
+                getattr(usage, "prompt_token_count", None) or None,
+                getattr(usage, "candidates_token_count", None) or None
+            )
+
+
+_SKILL_RE = re.compile(r"on the skill '(?P<skill>.+?)' and its subskills: (?P<subskills>.*?)\.\n")
+_COUNT_RE = re.compile(r"Generate exactly (\d+)")
+_SUBTOPIC_RE = re.compile(r"subtopics under (.+?) that")
+_RESUME_RE = re.compile(r"\nResume:\n(.*)", re.DOTALL)
+_FEEDBACK_FIELD_RE = re.compile(r"^(Name|Tab Switches|Fullscreen Warnings): (.*)$", re.MULTILINE)
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z+#.]{2,}")
+
+_STUB_WORDS = (
+    "buffer cache index thread lock queue stack heap tree graph hash map list tuple set key value "
+    "schema query join view cursor trigger module package class object method closure iterator "
+    "generator decorator context handler request response session token header route socket stream "
+    "pipeline batch shard replica leader follower partition offset commit rollback snapshot checkpoint "
+    "template render state reducer hook effect promise callback event loop worker process signal pool"
+).split()
+_STUB_SKILLS = (
+    "Python", "Java", "JavaScript", "React", "Flask", "SQL", "PostgreSQL", "Docker", "Kubernetes",
+    "AWS", "Git", "GitHub", "Excel", "Machine Learning", "TypeScript", "Node.js", "C++", "Linux"
+)
+
+
+class StubBackend:
+    """Offline backend returning well-formed, deterministic responses.
+
+    Output depends only on the prompt and how many times this process has seen
+    it, so repeated generation for one pool keeps producing new questions while
+    two runs with the same call order produce the same text.
+    """
+
+    name = "stub"
+    model_name = "stub"
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+        self._seen = Counter()
+        self._errors = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _prepare(self, prompt, kind, timeout, generation_config):
+        """Return (text, delay, fail) for one call; a delay past timeout raises after waiting timeout."""
+        key = prompt_key(kind, prompt)
+        with self._lock:
+            self._seen[key] += 1
+            call = self._seen[key]
+            fail = self._errors.random() < self.error_rate
+        rng = random.Random(f"{self.seed}:{key}:{call}")
+        delay = 0.0
+        if self.latency:
+            # +/-50% jitter around the configured mean; a timeout cuts the wait short like a real deadline
+            delay = self.latency * rng.uniform(0.5, 1.5)
+            if timeout is not None and delay > timeout:
+                time.sleep(timeout)
+                raise TimeoutError(f"Stub LLM call exceeded {timeout}s")
+        render = getattr(self, f"_{kind}", self._text)
+        if kind == "mcq" and (generation_config or {}).get("response_mime_type") == "application/json":
+            render = self._mcq_json
+        return render(prompt, rng), delay, fail
+
+    def generate(self, prompt, kind="text", timeout=None, generation_config=None):
+        text, delay, fail = self._prepare(prompt, kind, timeout, generation_config)
+        time.sleep(delay)
+        if fail:
+            raise TooManyRequests("Stub LLM injected quota error")
+        return LLMResponse(text)
+
+    def stream(self, prompt, kind="text", timeout=None, generation_config=None):
+        """Yield the response in pieces with the call's latency spread evenly across them."""
+        text, delay, fail = self._prepare(prompt, kind, timeout, generation_config)
+        if fail:
+            time.sleep(delay)
+            raise TooManyRequests("Stub LLM injected quota error")
+        pieces = list(_pieces(LLMResponse(text)))
+        for piece in pieces:
+            time.sleep(delay / len(pieces))
+            yield piece
+
+    def _phrase(self, rng, words=3):
+        return " ".join(rng.choice(_STUB_WORDS) for _ in range(words))
+
+    def _mcq_items(self, prompt, rng):
+        match = _SKILL_RE.search(prompt)
+        skill = match.group("skill") if match else "the skill"
+        subskills = [s.strip() for s in match.group("subskills").split(",")] if match else [skill]
+        count = int(_COUNT_RE.search(prompt).group(1)) if _COUNT_RE.search(prompt) else 1
+        for _ in range(count):
+            topic = rng.choice(subskills) or skill
+            question = (
+                f"In {skill} ({topic}), what happens to the {self._phrase(rng)} "
+                f"when the {self._phrase(rng)} is {self._phrase(rng, 2)}?"
+            )
+            options = []
+            while len(options) < 4:
+                option = self._phrase(rng, 4).capitalize()
+                if option not in options:
+                    options.append(option)
+            yield question, options, rng.choice("ABCD")
+
+    def _mcq(self, prompt, rng):
+        lines = []
+        for question, options, answer in self._mcq_items(prompt, rng):
+            rendered = " ".join(f"({letter}) {option}" for letter, option in zip("ABCD", options))
+            lines.append(f"{question} {rendered} Correct Answer: ({answer})")
+        return "\n".join(lines)
+
+    def _mcq_json(self, prompt, rng):
+        return json.dumps([
+            {"question": question, "options": options, "correct_answer": answer}
+            for question, options, answer in self._mcq_items(prompt, rng)
+        ])
+
+    def _subtopics(self, prompt, rng):
+        match = _SUBTOPIC_RE.search(prompt)
+        skill = match.group(1) if match else "Skill"
+        return "\n".join(f"- {skill} {self._phrase(rng, 2)}" for _ in range(5))
+
+    def _resume(self, prompt, rng):
+        match = _RESUME_RE.search(prompt)
+        resume = match.group(1) if match else ""
+        lines = [line.strip() for line in resume.splitlines() if line.strip()]
+        phone = re.search(r"\+?\d[\d\s-]{8,}\d", resume)
+        found = [skill for skill in _STUB_SKILLS if re.search(rf"(?<![\w+]){re.escape(skill)}(?![\w+])", resume, re.IGNORECASE)]
+        technical = found or rng.sample(_STUB_SKILLS, 3)
+        data = {
+            "name": lines[0] if lines else "Stub Candidate",
+            "phone": phone.group(0) if phone else "",
+            "Skills": {
+                "Technical Skills": technical,
+                "Soft Skills": ["Communication", "Teamwork"],
+                "Tools": [tool for tool in ("Git", "Docker", "Excel") if tool in technical]
+            },
+            "Work Experience": [{
+                "Company": f"{self._phrase(rng, 1).title()} Labs",
+                "Title": "Software Engineer",
+                "Start Date": f"{rng.randint(2015, 2021)}-{rng.randint(1, 12):02d}",
+                "End Date": "Present",
+                "Description": f"Worked on {self._phrase(rng)}.",
+                "Technologies": ", ".join(technical)
+            }],
+            "Projects": [{
+                "Title": f"{self._phrase(rng, 2).title()}",
+                "Description": f"Built a {self._phrase(rng)} service.",
+                "Technologies": ", ".join(technical[:2])
+            }],
+            "Education": [{
+                "Degree": "B.Tech",
+                "Institution": "Stub Institute of Technology",
+                "Graduation Year": rng.randint(2014, 2022),
+                "Certification": False
+            }]
+        }
+        return f"```json\n{json.dumps(data, indent=2)}\n```"
+
+    def _feedback(self, prompt, rng):
+        fields = dict(_FEEDBACK_FIELD_RE.findall(prompt))
+        name = fields.get("Name") or "The candidate"
+        concerns = [
+            f"{fields[field]} {label}" for field, label in (("Tab Switches", "tab switches"), ("Fullscreen Warnings", "fullscreen warnings"))
+            if fields.get(field, "0") not in ("0", "None")
+        ]
+        return (
+            f"{name} showed solid understanding of {self._phrase(rng, 2)} and answered the core questions consistently. "
+            f"Weaker areas include {self._phrase(rng, 2)}. "
+            + (f"Proctoring recorded {' and '.join(concerns)}, which should be reviewed." if concerns else "No proctoring concerns were recorded.")
+        )
+
+    def _text(self, prompt, rng):
+        return f"Stub response about {self._phrase(rng)}."
+
+
+class CassetteBackend:
+    """Record Gemini exchanges to a JSONL cassette, or replay them offline.
+
+    Replay serves a prompt's recordings in the order they were made and cycles
+    once they run out; with realtime set it also sleeps for the recorded latency.
+    """
+
+    def __init__(self, path, mode, inner=None, realtime=False):
+        self.path = path
+        self.mode = mode
+        self.name = mode
+        self.inner = inner
+        self.model_name = inner.model_name if inner else "replay"
+        self.realtime = realtime
+        self._lock = threading.Lock()
+        self._recordings = {}
+        self._served = Counter()
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            logger.warning(f"LLM cassette {self.path} does not exist; every replayed call will miss")
+            return
+        with open(self.path) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._recordings.setdefault(entry["key"], []).append(entry)
+
+    def generate(self, prompt, kind="text", timeout=None, **kwargs):
+        key = prompt_key(kind, prompt)
+        if self.mode == "replay":
+            with self._lock:
+                entries = self._recordings.get(key)
+                if not entries:
+                    raise CassetteMiss(f"No recording for {kind} prompt {key[:12]}")
+                entry = entries[self._served[key] % len(entries)]
+                self._served[key] += 1
+            if self.realtime:
+                time.sleep(entry.get("seconds", 0))
+            if entry.get("error") == "TooManyRequests":
+                raise TooManyRequests("Replayed quota error")
+            return LLMResponse(entry["text"], entry.get("prompt_tokens"), entry.get("response_tokens"))
+
+        started = time.monotonic()
+        entry = {"key": key, "kind": kind, "prompt": prompt}
+        try:
+            response = self.inner.generate(prompt, kind=kind, timeout=timeout, **kwargs)
+            entry["text"] = response.text
+            entry["prompt_tokens"] = response.prompt_tokens
+            entry["response_tokens"] = response.response_tokens
+            return response
+        except TooManyRequests:
+            entry["error"] = "TooManyRequests"
+            raise
+        finally:
+            self._record(entry, started)
+
+    def stream(self, prompt, kind="text", timeout=None, **kwargs):
+        """Stream a recorded exchange, or record a streamed one once it completes."""
+        if self.mode == "replay":
+            yield from _pieces(self.generate(prompt, kind=kind, timeout=timeout, **kwargs))
+            return
+
+        started = time.monotonic()
+        entry = {"key": prompt_key(kind, prompt), "kind": kind, "prompt": prompt}
+        parts = []
+        try:
+            for chunk in self.inner.stream(prompt, kind=kind, timeout=timeout, **kwargs):
+                parts.append(chunk.text)
+                if chunk.prompt_tokens is not None:
+                    entry["prompt_tokens"] = chunk.prompt_tokens
+                if chunk.response_tokens is not None:
+                    entry["response_tokens"] = chunk.response_tokens
+                yield chunk
+            entry["text"] = "".join(parts)
+        except TooManyRequests:
+            entry["error"] = "TooManyRequests"
+            raise
+        finally:
+            # A stream the caller abandoned is incomplete and not recorded
+            self._record(entry, started)
+
+    def _record(self, entry, started):
+        # Other failures (timeouts, network errors) are not recorded
+        if "text" in entry or "error" in entry:
+            entry["seconds"] = round(time.monotonic() - started, 3)
+            with self._lock, open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+
+def build_backend(config):
+    name = config.get("LLM_BACKEND", "gemini")
+    gemini = lambda: GeminiBackend(config.get("LLM_MODEL", "gemini-1.5-flash"), config.get("GOOGLE_API_KEY"))
+    if name == "gemini":
+        return gemini()
+    if name == "stub":
+        return StubBackend(
+            latency=float(config.get("LLM_STUB_LATENCY", 0)),
+            error_rate=float(config.get("LLM_STUB_ERROR_RATE", 0)),
+            seed=int(config.get("LLM_STUB_SEED", 0))
+        )
+    if name in ("record", "replay"):
+        return CassetteBackend(
+            config.get("LLM_CASSETTE_PATH", "llm_cassette.jsonl"),
+            name,
+            inner=gemini() if name == "record" else None,
+            realtime=str(config.get("LLM_CASSETTE_REALTIME", False)).lower() in ("1", "true", "yes")
+        )
+    raise ValueError(f"Unknown LLM_BACKEND {name!r}; expected gemini, stub, record or replay")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def init_app(app):
+    global _backend
+    with _backend_lock:
+        _backend = build_backend(app.config)
+    logger.info(f"LLM backend: {_backend.name}")
+
+
+def get_backend():
+    """Return the configured backend, building it from the environment outside the app factory."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = build_backend(os.environ)
+    return _backend
+
+
+def _outcome(error):
+    if isinstance(error, TooManyRequests):
+        return "quota"
+    if isinstance(error, TimeoutError) or type(error).__name__ in ("DeadlineExceeded", "ReadTimeout", "Timeout"):
+        return "timeout"
+    return "error"
+
+
+def _admit(site, job_id, timeout, backend):
+    """Wait for the scheduler to admit a backend call; raises TooManyRequests if timeout passes first."""
+    from app.services import llm_scheduler, llm_usage
+
+    if not llm_scheduler.admit(site, job_id, timeout):
+        llm_usage.record_throttle(site, backend.model_name, job_id=job_id)
+        raise TooManyRequests("Local LLM rate limit reached")
+
+
+def _settle(error):
+    """Feed a call's result back to the scheduler's rate: quota errors back off, successes recover."""
+    from app.services import llm_scheduler
+
+    if error is None:
+        llm_scheduler.success()
+    elif isinstance(error, TooManyRequests):
+        pause = llm_scheduler.backoff()
+        logger.warning(f"LLM quota exceeded. Pausing LLM calls for {pause:.1f} seconds")
+
+
+def lookup(prompt, kind="text", generation_config=DEFAULT_GENERATION_CONFIG, site=None):
+    """Return the cached response for this call, or None on a miss or when site does not cache."""
+    from app.services import llm_cache
+
+    site = site or kind
+    if not llm_cache.enabled_for(site):
+        return None
+    key = llm_cache.cache_key(get_backend().model_name, generation_config, kind, prompt)
+    hit = llm_cache.get(key, site)
+    if hit is None:
+        return None
+    return LLMResponse(*hit, cache_key=key, cached=True)
+
+
+def forget(response):
+    """Drop a cached response the caller could not use, so the next identical call regenerates."""
+    from app.services import llm_cache
+
+    if response is not None and response.cache_key:
+        llm_cache.discard(response.cache_key)
+
+
+def generate(prompt, kind="text", timeout=None, generation_config=DEFAULT_GENERATION_CONFIG, site=None, job_id=None,
+             cache=True, refresh=False):
+    """Send a prompt to the configured backend and return an LLMResponse.
+
+    A backend call first waits for admission by llm_scheduler; timeout bounds
+    the wait as well as the call, and TooManyRequests is raised if it passes.
+    Every backend call is reported to llm_usage under site (default: kind)
+    and job_id; token counts are estimated from text length when the backend
+    has none. If site caches responses, a cached one is returned without a
+    call unless cache is False (no lookup, nothing stored) or refresh is set
+    (a new response replaces the cached one).
+    """
+    from app.services import llm_cache, llm_usage
+
+    backend = get_backend()
+    site = site or kind
+    key = None
+    if cache and llm_cache.enabled_for(site):
+        if not refresh:
+            hit = lookup(prompt, kind, generation_config, site)
+            if hit is not None:
+                return hit
+        key = llm_cache.cache_key(backend.model_name, generation_config, kind, prompt)
+    _admit(site, job_id, timeout, backend)
+    started = time.monotonic()
+    try:
+        response = backend.generate(prompt, kind=kind, timeout=timeout, generation_config=generation_config)
+    except Exception as e:
+        _settle(e)
+        llm_usage.record_call(
+            site, backend.model_name, _outcome(e), time.monotonic() - started,
+            prompt_tokens=llm_usage.estimate_tokens(prompt), job_id=job_id
+        )
+        raise
+    _settle(None)
+    llm_usage.record_call(
+        site, backend.model_name, "success", time.monotonic() - started,
+        prompt_tokens=response.prompt_tokens if response.prompt_tokens is not None else llm_usage.estimate_tokens(prompt),
+        response_tokens=response.response_tokens if response.response_tokens is not None else llm_usage.estimate_tokens(response.text),
+        job_id=job_id
+    )
+    if key and response.text:
+        llm_cache.put(key, site, backend.model_name, response.text, response.prompt_tokens, response.response_tokens)
+        response = response._replace(cache_key=key)
+    return response
+
+
+def stream(prompt, kind="text", timeout=None, generation_config=DEFAULT_GENERATION_CONFIG, site=None, job_id=None,
+           cache=True, refresh=False):
+    """Yield LLMResponse chunks as the backend produces them; like generate otherwise.
+
+    A cached response arrives as a single chunk. The call is reported to
+    llm_usage when the stream ends ("abandoned" if the caller stops reading
+    early), and the full text is cached only if the stream completed.
+    """
+    from app.services import llm_cache, llm_usage
+
+    backend = get_backend()
+    site = site or kind
+    key = None
+    if cache and llm_cache.enabled_for(site):
+        if not refresh:
+            hit = lookup(prompt, kind, generation_config, site)
+            if hit is not None:
+                yield hit
+                return
+        key = llm_cache.cache_key(backend.model_name, generation_config, kind, prompt)
+    _admit(site, job_id, timeout, backend)
+    started = time.monotonic()
+    parts = []
+    prompt_tokens = response_tokens = None
+    outcome = "abandoned"
+    try:
+        for chunk in backend.stream(prompt, kind=kind, timeout=timeout, generation_config=generation_config):
+            parts.append(chunk.text)
+            if chunk.prompt_tokens is not None:
+                prompt_tokens = chunk.prompt_tokens
+            if chunk.response_tokens is not None:
+                response_tokens = chunk.response_tokens
+            yield chunk._replace(cache_key=key)
+        outcome = "success"
+        _settle(None)
+    except Exception as e:
+        outcome = _outcome(e)
+        _settle(e)
+        raise
+    finally:
+        text = "".join(parts)
+        llm_usage.record_call(
+            site, backend.model_name, outcome, time.monotonic() - started,
+            prompt_tokens=prompt_tokens if prompt_tokens is not None else llm_usage.estimate_tokens(prompt),
+            response_tokens=response_tokens if response_tokens is not None else llm_usage.estimate_tokens(text),
+            job_id=job_id
+        )
+    if key and text:
+        llm_cache.put(key, site, backend.model_name, text, prompt_tokens, response_tokens)
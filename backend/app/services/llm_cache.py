@@ -0,0 +1,132 @@
+import hashlib
+import itertools
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+import click
+from flask import current_app, has_app_context
+from flask.cli import with_appcontext
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from app import db
+from app.models.llm_cache import LLMCacheEntry
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Content-addressed store of LLM responses. The key hashes the model,
+# generation config, response kind and prompt, so any change to what would be
+# sent is a miss. Only call sites listed in LLM_CACHE_SITES use it; a caller
+# can still skip it per call (real-time generation always does, since it
+# wants a new question each time). Lookups and writes use their own
+# connection so they never commit or roll back the caller's session, and any
+# database error just counts as a miss. Entries expire after
+# LLM_CACHE_TTL_HOURS; beyond LLM_CACHE_MAX_ENTRIES the least recently hit
+# are evicted every EVICT_EVERY writes and by `flask prune-llm-cache`.
+
+EVICT_EVERY = 500
+
+_writes = itertools.count(1)
+_writes_lock = threading.Lock()
+
+_HIT_SQL = text("""
+    UPDATE llm_cache SET hits = hits + 1, last_hit_at = :now
+    WHERE key = :key AND expires_at > :now
+    RETURNING response_text, prompt_tokens, response_tokens
+""")
+
+
+def init_app(app):
+    app.cli.add_command(prune_llm_cache_command)
+
+
+def enabled_for(site):
+    if not has_app_context() or not current_app.config.get('LLM_CACHE_ENABLED', True):
+        return False
+    sites = current_app.config.get('LLM_CACHE_SITES', '')
+    return site in {name.strip() for name in sites.split(',')}
+
+
+def cache_key(model, generation_config, kind, prompt):
+    payload = json.dumps([model, generation_config, kind, prompt], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get(key, site):
+    """Return (text, prompt_tokens, response_tokens) for a live entry, or None."""
+    try:
+        with db.engine.begin() as connection:
+            row = connection.execute(_HIT_SQL, {"key": key, "now": datetime.utcnow()}).first()
+    except Exception as e:
+        logger.error(f"LLM cache lookup failed: {str(e)}")
+        row = None
+    metrics.incr("llm_cache", site=site, outcome="hit" if row else "miss")
+    return tuple(row) if row else None
+
+
+def put(key, site, model, response_text, prompt_tokens=None, response_tokens=None):
+    now = datetime.utcnow()
+    values = {
+        "key": key, "site": site, "model": model, "response_text": response_text,
+        "prompt_tokens": prompt_tokens, "response_tokens": response_tokens, "hits": 0,
+        "created_at": now, "last_hit_at": now,
+        "expires_at": now + timedelta(hours=current_app.config.get('LLM_CACHE_TTL_HOURS', 168))
+    }
+    statement = insert(LLMCacheEntry.__table__).values(values)
+    statement = statement.on_conflict_do_update(
+        index_elements=["key"],
+        set_={name: statement.excluded[name] for name in ("response_text", "prompt_tokens", "response_tokens", "created_at", "expires_at")}
+    )
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(statement)
+    except Exception as e:
+        logger.error(f"LLM cache write failed: {str(e)}")
+        return
+    with _writes_lock:
+        evict_now = next(_writes) % EVICT_EVERY == 0
+    if evict_now:
+        evict()
+
+
+def discard(key):
+    """Drop an entry whose response turned out to be unusable so the next call regenerates it."""
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(text("DELETE FROM llm_cache WHERE key = :key"), {"key": key})
+    except Exception as e:
+        logger.error(f"LLM cache discard failed: {str(e)}")
+
+
+def evict():
+    """Delete expired entries, then the least recently hit beyond LLM_CACHE_MAX_ENTRIES; returns rows deleted."""
+    max_entries = current_app.config.get('LLM_CACHE_MAX_ENTRIES', 50000)
+    try:
+        with db.engine.begin() as connection:
+            expired = connection.execute(
+                text("DELETE FROM llm_cache WHERE expires_at <= :now"), {"now": datetime.utcnow()}
+            ).rowcount
+            overflow = connection.execute(text("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_hit_at DESC OFFSET :max_entries
+                )
+            """), {"max_entries": max_entries}).rowcount
+    except Exception as e:
+        logger.error(f"LLM cache eviction failed: {str(e)}")
+        return 0
+    metrics.incr("llm_cache_evicted", expired + overflow)
+    return expired + overflow
+
+
+@click.command('prune-llm-cache')
+@with_appcontext
+@click.option('--all', 'everything', is_flag=True, help='Empty the cache instead of evicting expired and excess entries.')
+def prune_llm_cache_command(everything):
+    """Evict expired and least recently used LLM cache entries."""
+    if everything:
+        with db.engine.begin() as connection:
+            deleted = connection.execute(text("DELETE FROM llm_cache")).rowcount
+    else:
+        deleted = evict()
+    click.echo(f"Deleted {deleted} LLM cache entries")
@@ -0,0 +1,124 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from flask import has_app_context
+from app import db
+from app.utils import metrics
+from app.utils.rate_limit import FairScheduler, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Process-wide admission control for every LLM backend call. All call sites
+# share one quota (GEMINI_REQUESTS_PER_MINUTE, bursts of GEMINI_BURST), so a
+# call waits here until the scheduler admits it. Priority classes, highest
+# first: live exam generation, resume parsing, batch generation (bank jobs,
+# the replenisher, subskill expansion), then AI reports. Lower classes leave
+# LLM_SCHEDULER_*_RESERVE tokens of the burst for the classes above them and
+# take whatever is left; within a class, recruiters are served in turn so one
+# large job cannot hold the queue. A 429 from the backend halves the rate for
+# everyone (see TokenBucket.backoff).
+#
+# The quota is for the whole deployment, but each process keeps its own
+# bucket, so every process gets 1/WEB_CONCURRENCY of the rate and burst.
+
+PRIORITIES = ("live", "resume", "batch", "reports")
+SITE_PRIORITY = {
+    "realtime_generation": "live",
+    "resume_parsing": "resume",
+    "batch_generation": "batch",
+    "subskill_expansion": "batch",
+    "ai_feedback": "reports"
+}
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+TENANT_CACHE_SIZE = 1024
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+_tenants = OrderedDict()  # job_id -> tenant
+_tenants_lock = threading.Lock()
+
+
+def build_scheduler(config):
+    live_reserve = int(config.get('LLM_SCHEDULER_LIVE_RESERVE', 1))
+    batch_reserve = int(config.get('LLM_SCHEDULER_BATCH_RESERVE', 2))
+    workers = max(1, int(config.get('WEB_CONCURRENCY', 1)))
+    bucket = TokenBucket(
+        rate=float(config.get('GEMINI_REQUESTS_PER_MINUTE', 60)) / 60 / workers,
+        capacity=max(1, int(config.get('GEMINI_BURST', 5)) // workers)
+    )
+    return FairScheduler(
+        bucket, PRIORITIES,
+        reserves={"resume": live_reserve, "batch": batch_reserve, "reports": batch_reserve},
+        aging=float(config.get('LLM_SCHEDULER_AGING_SECONDS', 30))
+    )
+
+
+def init_app(app):
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = build_scheduler(app.config)
+    metrics.register_gauge("llm_scheduler_queued", lambda: get_scheduler().queued())
+    metrics.register_gauge("llm_scheduler_tenants", lambda: get_scheduler().tenants())
+    metrics.register_gauge("llm_scheduler_rate_per_minute", lambda: round(get_scheduler().bucket.rate * 60, 2))
+
+
+def get_scheduler():
+    """Return the process scheduler, building it from the environment outside the app factory."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = build_scheduler(os.environ)
+    return _scheduler
+
+
+def priority_for(site):
+    return SITE_PRIORITY.get(site, "batch")
+
+
+def tenant_for(job_id):
+    """Fair-share key for a call: the job's recruiter, or a shared key for calls without a job."""
+    if job_id is None:
+        return "shared"
+    with _tenants_lock:
+        tenant = _tenants.get(job_id)
+        if tenant is not None:
+            _tenants.move_to_end(job_id)
+            return tenant
+    tenant = f"job:{job_id}"
+    if has_app_context():
+        from app.models.job import JobDescription
+
+        try:
+            recruiter_id = db.session.query(JobDescription.recruiter_id).filter_by(job_id=job_id).scalar()
+        except Exception as e:
+            logger.error(f"Could not resolve recruiter for job {job_id}: {str(e)}")
+            return tenant
+        if recruiter_id is not None:
+            tenant = f"recruiter:{recruiter_id}"
+    with _tenants_lock:
+        _tenants[job_id] = tenant
+        while len(_tenants) > TENANT_CACHE_SIZE:
+            _tenants.popitem(last=False)
+    return tenant
+
+
+def admit(site, job_id=None, timeout=None):
+    """Wait until a call from site may go to the backend; returns False if timeout passed first."""
+    priority = priority_for(site)
+    waited = get_scheduler().acquire(priority, tenant_for(job_id), timeout)
+    metrics.incr("llm_admissions", priority=priority, outcome="admitted" if waited is not None else "timeout")
+    metrics.observe(
+        "llm_admission_wait_seconds", waited if waited is not None else timeout, buckets=WAIT_BUCKETS, priority=priority
+    )
+    return waited is not None
+
+
+def backoff():
+    """Record a quota error from the backend; returns the pause applied to all callers."""
+    return get_scheduler().bucket.backoff()
+
+
+def success():
+    get_scheduler().bucket.success()
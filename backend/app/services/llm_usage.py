@@ -0,0 +1,206 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from flask import current_app
+from sqlalchemy import func, insert
+from app import db
+from app.models.job import JobDescription
+from app.models.llm_usage import LLMUsage
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Per-call LLM telemetry. llm.generate reports every backend call here with
+# its call site, model, latency, token counts and outcome; callers add the
+# outcomes only they can see (unparseable responses, fallbacks to stored
+# questions) and how many attempts an operation took. Everything goes to the
+# metrics registry right away and is summed per (job, site, model) in memory,
+# then appended to llm_usage by a periodic flusher so per-job cost survives
+# restarts and is shared across workers.
+#
+# Outcomes: success, quota, timeout, error, parse_fail, fallback_db,
+# fallback (canned text), shed (skipped under load, see degradation). Calls
+# the LLM scheduler refused never reached the backend, so they are counted
+# as throttles rather than calls and stay out of call latency.
+
+FAILURES = ("quota", "timeout", "error")
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000)
+ATTEMPT_BUCKETS = (1, 2, 3, 4, 5, 10)
+FIELDS = ("calls", "failures", "throttles", "parse_failures", "fallbacks", "prompt_tokens", "response_tokens", "seconds")
+
+_pending = {}  # (job_id, site, model) -> Counter of FIELDS
+_parsed = {}  # "backend:mode" -> [accepted, rejected] MCQ items
+_lock = threading.Lock()
+_flusher_started = False
+
+
+def init_app(app):
+    """Start the periodic flusher."""
+    global _flusher_started
+    metrics.register_gauge("mcq_parse_success_rate", parse_success_rates)
+    if _flusher_started:
+        return
+
+    interval = app.config.get('LLM_USAGE_FLUSH_INTERVAL', 30)
+
+    def flush_loop():
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    flush()
+            except Exception as e:
+                logger.error(f"Periodic LLM usage flush failed: {str(e)}")
+
+    def flush_on_exit():
+        with app.app_context():
+            flush()
+
+    threading.Thread(target=flush_loop, name="llm-usage-flusher", daemon=True).start()
+    atexit.register(flush_on_exit)
+    _flusher_started = True
+
+
+def estimate_tokens(text):
+    """Rough token count for backends that do not report usage (about 4 characters per token)."""
+    return (len(text) + 3) // 4 if text else 0
+
+
+def _accumulate(job_id, site, model, **amounts):
+    with _lock:
+        totals = _pending.get((job_id, site, model))
+        if totals is None:
+            totals = _pending[(job_id, site, model)] = Counter()
+        totals.update(amounts)
+
+
+def record_call(site, model, outcome, seconds, prompt_tokens=0, response_tokens=0, job_id=None):
+    """Record one backend call."""
+    metrics.incr("llm_calls", site=site, model=model, outcome=outcome)
+    metrics.observe("llm_call_seconds", seconds, site=site, model=model, outcome=outcome)
+    if prompt_tokens:
+        metrics.incr("llm_tokens", prompt_tokens, site=site, model=model, direction="prompt")
+        metrics.observe("llm_prompt_tokens", prompt_tokens, buckets=TOKEN_BUCKETS, site=site)
+    if response_tokens:
+        metrics.incr("llm_tokens", response_tokens, site=site, model=model, direction="response")
+        metrics.observe("llm_response_tokens", response_tokens, buckets=TOKEN_BUCKETS, site=site)
+    _accumulate(
+        job_id, site, model, calls=1, failures=int(outcome in FAILURES),
+        prompt_tokens=prompt_tokens, response_tokens=response_tokens, seconds=seconds
+    )
+
+
+def record_throttle(site, model, job_id=None):
+    """Record a call the LLM scheduler refused before it reached the backend."""
+    metrics.incr("llm_throttled", site=site, model=model)
+    _accumulate(job_id, site, model, throttles=1)
+
+
+def record_outcome(site, outcome, job_id=None):
+    """Record a caller-level outcome: parse_fail, fallback_db or fallback."""
+    metrics.incr("llm_outcomes", site=site, outcome=outcome)
+    if outcome == "parse_fail":
+        _accumulate(job_id, site, None, parse_failures=1)
+    elif outcome.startswith("fallback"):
+        _accumulate(job_id, site, None, fallbacks=1)
+
+
+def record_attempts(site, attempts):
+    """Record how many LLM calls one operation (a unit, a real-time request) needed."""
+    if attempts:
+        metrics.observe("llm_attempts", attempts, buckets=ATTEMPT_BUCKETS, site=site)
+
+
+def record_parse(backend, mode, accepted, rejected):
+    """Count MCQ items parsed from one response, by backend and requested output mode (structured or text)."""
+    with _lock:
+        totals = _parsed.setdefault(f"{backend}:{mode}", [0, 0])
+        totals[0] += accepted
+        totals[1] += rejected
+
+
+def parse_success_rates():
+    with _lock:
+        return {key: round(accepted / (accepted + rejected), 4) for key, (accepted, rejected) in _parsed.items() if accepted + rejected}
+
+
+def _take_pending():
+    global _pending
+    with _lock:
+        pending, _pending = _pending, {}
+    return pending
+
+
+def flush():
+    """Append pending totals to llm_usage; they are merged back if the write fails.
+
+    Totals for jobs deleted since their calls were made are stored without a
+    job, so a deleted job cannot fail the insert on this or any later flush.
+    """
+    pending = _take_pending()
+    if not pending:
+        return 0
+    job_ids = {job_id for job_id, _, _ in pending if job_id is not None}
+    try:
+        existing = set()
+        if job_ids:
+            existing = {job_id for (job_id,) in db.session.query(JobDescription.job_id).filter(JobDescription.job_id.in_(job_ids))}
+        rows = [
+            dict({field: totals.get(field, 0) for field in FIELDS}, job_id=job_id if job_id in existing else None, site=site, model=model)
+            for (job_id, site, model), totals in pending.items()
+        ]
+        db.session.execute(insert(LLMUsage.__table__), rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        # A job deleted after the check is caught by the next flush's check
+        for (job_id, site, model), totals in pending.items():
+            _accumulate(job_id, site, model, **totals)
+        raise
+    return len(rows)
+
+
+def job_summary(job_id):
+    """Return LLM usage and estimated cost for a job, by call site, including unflushed calls."""
+    by_site = {}
+    rows = db.session.query(
+        LLMUsage.site, *(func.coalesce(func.sum(getattr(LLMUsage, field)), 0) for field in FIELDS)
+    ).filter(LLMUsage.job_id == job_id).group_by(LLMUsage.site).all()
+    for site, *values in rows:
+        # SUM over bigint comes back as Decimal
+        by_site[site] = Counter({field: float(value) if field == "seconds" else int(value) for field, value in zip(FIELDS, values)})
+    with _lock:
+        for (pending_job, site, _), totals in _pending.items():
+            if pending_job == job_id:
+                by_site.setdefault(site, Counter()).update(totals)
+
+    prompt_rate = current_app.config.get('LLM_COST_PER_1K_PROMPT_TOKENS', 0.0)
+    response_rate = current_app.config.get('LLM_COST_PER_1K_RESPONSE_TOKENS', 0.0)
+
+    def describe(totals):
+        calls = totals.get("calls", 0)
+        return {
+            "calls": int(calls),
+            "failures": int(totals.get("failures", 0)),
+            "throttles": int(totals.get("throttles", 0)),
+            "parse_failures": int(totals.get("parse_failures", 0)),
+            "fallbacks": int(totals.get("fallbacks", 0)),
+            "prompt_tokens": int(totals.get("prompt_tokens", 0)),
+            "response_tokens": int(totals.get("response_tokens", 0)),
+            "seconds": round(float(totals.get("seconds", 0)), 3),
+            "mean_seconds": round(float(totals.get("seconds", 0)) / calls, 3) if calls else None,
+            "estimated_cost": round(
+                totals.get("prompt_tokens", 0) / 1000 * prompt_rate + totals.get("response_tokens", 0) / 1000 * response_rate, 6
+            )
+        }
+
+    total = Counter()
+    for totals in by_site.values():
+        total.update(totals)
+    return {
+        "job_id": job_id,
+        "sites": {site: describe(totals) for site, totals in sorted(by_site.items())},
+        "total": describe(total)
+    }
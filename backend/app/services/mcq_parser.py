@@ -0,0 +1,252 @@
+import json
+import re
+from typing import NamedTuple
+
+# Single parser for Gemini MCQ responses. Handles the one-question-per-line
+# format the prompts ask for, the multi-line variant, markdown/numbering noise,
+# Python/JSON lists of question strings and JSON objects. Kept free of Flask and
+# Gemini imports so fix_question_structure and the benchmarks can use it directly.
+# With structured output the response is a JSON array matching MCQ_SCHEMA and
+# goes through the same per-item checks; the text path stays as the fallback
+# for backends or responses that ignore the schema. StreamParser applies the
+# same rules to a streamed response, block by block.
+
+LETTERS = "ABCD"
+
+# Response schema for structured generation (OpenAPI subset understood by
+# Gemini's response_schema). Item-level rules the schema cannot express,
+# such as exactly four distinct non-empty options, are enforced by _check.
+MCQ_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "question": {"type": "string"},
+            "options": {"type": "array", "items": {"type": "string"}},
+            "correct_answer": {"type": "string", "enum": list(LETTERS)}
+        },
+        "required": ["question", "options", "correct_answer"]
+    }
+}
+
+_FENCE_RE = re.compile(r'```[A-Za-z]*')
+_WS_RE = re.compile(r'\s+')
+_ANSWER_RE = re.compile(r'\**\s*Correct\s+Answer\s*\**\s*[:\-]\s*\**\s*\(?([A-Da-d])\b\)?\**', re.IGNORECASE)
+_BLOCK_RE = re.compile(
+    r'^(?P<question>.*?)\s*'
+    r'\(A\)\s*(?P<a>.*?)\s*'
+    r'\(B\)\s*(?P<b>.*?)\s*'
+    r'\(C\)\s*(?P<c>.*?)\s*'
+    r'\(D\)\s*(?P<d>.*?)\s*$',
+    re.DOTALL
+)
+_BARE_OPTION_RE = re.compile(r'(?:^|(?<=\s))([A-D])[).]\s')
+_PREFIX_RE = re.compile(r'^(?:[\s"\',\[\]*#-]|Q(?:uestion)?\s*\d+\s*[:.)]?(?=[\s*])|\d+\s*[:.)](?=[\s*]))*', re.IGNORECASE)
+_TRAILER_RE = re.compile(r'[\s"\',\]*]+$')
+
+
+class ParseFailure(NamedTuple):
+    reason: str  # missing_options, missing_answer, empty_field, duplicate_options, invalid_json_item
+    block: str
+
+
+class ParseResult(NamedTuple):
+    questions: list
+    failures: list
+    format: str = "text"  # "json" when the response parsed as a JSON document
+
+    @property
+    def reject_rate(self):
+        total = len(self.questions) + len(self.failures)
+        return len(self.failures) / total if total else 0.0
+
+
+def _question_dict(question, options, correct_answer):
+    return {
+        "question": question,
+        "option_a": options[0],
+        "option_b": options[1],
+        "option_c": options[2],
+        "option_d": options[3],
+        "correct_answer": correct_answer,
+        "answer": options[LETTERS.index(correct_answer)],
+        "options": list(options)
+    }
+
+
+def _check(question, options, correct_answer, block):
+    if not question or not all(options):
+        return None, ParseFailure("empty_field", block)
+    if len(set(option.lower() for option in options)) < 4:
+        return None, ParseFailure("duplicate_options", block)
+    return _question_dict(question, options, correct_answer), None
+
+
+def _clean(text):
+    text = text.replace('\\n', ' ').replace('\\"', '"')
+    return _WS_RE.sub(' ', text).strip()
+
+
+def parse_block(body, correct_answer):
+    """Parse one question body (everything before its Correct Answer marker).
+
+    Returns (question_dict, None) or (None, ParseFailure).
+    """
+    text = _clean(_FENCE_RE.sub(' ', body))
+    text = _PREFIX_RE.sub('', text, count=1)
+    text = _TRAILER_RE.sub('', text)
+    if '(A)' not in text and _BARE_OPTION_RE.search(text):
+        # "A) option" / "A. option" variant
+        text = _BARE_OPTION_RE.sub(lambda m: f" ({m.group(1)}) ", text)
+    match = _BLOCK_RE.match(text)
+    if not match:
+        return None, ParseFailure("missing_options", text)
+    options = [_TRAILER_RE.sub('', match.group(key)).strip(' "\'') for key in "abcd"]
+    return _check(match.group("question").strip(' "\''), options, correct_answer.upper(), text)
+
+
+def _parse_text(text, result):
+    start = 0
+    for match in _ANSWER_RE.finditer(text):
+        question, failure = parse_block(text[start:match.start()], match.group(1))
+        if question:
+            result.questions.append(question)
+        else:
+            result.failures.append(failure)
+        start = match.end()
+    tail = _TRAILER_RE.sub('', _clean(_FENCE_RE.sub(' ', text[start:])))
+    if '(A)' in tail or '(a)' in tail:
+        result.failures.append(ParseFailure("missing_answer", tail))
+
+
+def _parse_json_item(item, result):
+    if isinstance(item, str):
+        _parse_text(item, result)
+        return
+    if not isinstance(item, dict):
+        result.failures.append(ParseFailure("invalid_json_item", str(item)[:200]))
+        return
+    options = item.get("options") or [item.get(f"option_{letter}") for letter in "abcd"]
+    if not isinstance(options, list) or len(options) != 4:
+        result.failures.append(ParseFailure("missing_options", json.dumps(item)[:200]))
+        return
+    options = [_clean(str(option or "")) for option in options]
+    correct_answer = str(item.get("correct_answer") or "").strip("() ").upper()
+    if correct_answer not in ("A", "B", "C", "D"):
+        answer = _clean(str(item.get("answer") or ""))
+        correct_answer = LETTERS[options.index(answer)] if answer in options else ""
+    if not correct_answer:
+        result.failures.append(ParseFailure("missing_answer", json.dumps(item)[:200]))
+        return
+    question, failure = _check(_clean(_FENCE_RE.sub(' ', str(item.get("question") or ""))).strip(' "\'[`'), options, correct_answer, json.dumps(item)[:200])
+    if question:
+        result.questions.append(question)
+    else:
+        result.failures.append(failure)
+
+
+def parse_mcqs(raw_text):
+    """Parse a raw Gemini response into questions and structured failures in one pass."""
+    result = ParseResult([], [])
+    stripped = raw_text.strip()
+    if stripped.startswith("```"):
+        stripped = _FENCE_RE.sub('', stripped, count=1).rstrip('`').strip()
+    if stripped[:1] in "[{":
+        try:
+            data = json.loads(stripped)
+        except ValueError:
+            data = None
+        if data is not None:
+            for item in (data if isinstance(data, list) else [data]):
+                _parse_json_item(item, result)
+            return result._replace(format="json")
+    _parse_text(raw_text, result)
+    return result
+
+
+class StreamParser:
+    """Incremental parse_mcqs for a response that arrives in chunks.
+
+    feed() returns the questions and failures completed by the new text: a
+    text block once its Correct Answer marker is followed by more output, a
+    JSON item once its closing brace arrives. close() parses whatever is left.
+    """
+
+    def __init__(self):
+        self.format = None  # decided by the first non-blank output: "json" or "text"
+        self._buffer = ""
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        result = ParseResult([], [], self.format or "text")
+        if self.format is None and not self._detect():
+            return result
+        if self.format == "json":
+            self._feed_json(result)
+        else:
+            self._feed_text(result)
+        return result._replace(format=self.format)
+
+    def close(self):
+        result = ParseResult([], [], self.format or "text")
+        if self.format is None and not self._detect():
+            return result
+        if self.format == "json":
+            self._feed_json(result)
+            tail = self._buffer.strip(" \t\r\n,]`")
+            if tail:
+                # Not valid JSON after all; recover what the text parser can
+                found = len(result.questions) + len(result.failures)
+                _parse_text(tail, result)
+                if len(result.questions) + len(result.failures) == found:
+                    result.failures.append(ParseFailure("invalid_json_item", tail[:200]))
+        else:
+            _parse_text(self._buffer, result)
+        self._buffer = ""
+        return result._replace(format=self.format)
+
+    def _detect(self):
+        head = self._buffer.lstrip()
+        if "```".startswith(head):
+            return False
+        if head.startswith("```"):
+            if "\n" not in head:
+                return False  # the fence's language tag may still be arriving
+            head = _FENCE_RE.sub('', head, count=1).lstrip()
+        if not head:
+            return False
+        if head[0] in "[{":
+            self.format = "json"
+            self._buffer = head
+        else:
+            self.format = "text"
+        return True
+
+    def _feed_json(self, result):
+        buffer = self._buffer
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,[]`":
+                position += 1
+            if position >= len(buffer):
+                break
+            try:
+                item, position = self._decoder.raw_decode(buffer, position)
+            except ValueError:
+                break  # incomplete item; wait for more
+            _parse_json_item(item, result)
+        self._buffer = buffer[position:]
+
+    def _feed_text(self, result):
+        start = 0
+        for match in _ANSWER_RE.finditer(self._buffer):
+            if match.end() >= len(self._buffer):
+                break  # the marker's closing ")" or "**" may still be arriving
+            question, failure = parse_block(self._buffer[start:match.start()], match.group(1))
+            if question:
+                result.questions.append(question)
+            else:
+                result.failures.append(failure)
+            start = match.end()
+        self._buffer = self._buffer[start:]
@@ -0,0 +1,164 @@
+import csv
+import glob
+import io
+import json
+import logging
+import os
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
+from app import db
+from app.models.mcq import MCQ
+from app.models.skill import Skill
+from app.services import dedup
+from app.services.mcq_parser import parse_mcqs
+from app.services.skill_taxonomy import normalize_skill
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Bulk persistence for generated MCQs. Batch generation buffers each unit's
+# parsed questions and writes them with one multi-row INSERT ... ON CONFLICT
+# DO NOTHING RETURNING, so a response costs a single round-trip and rows that
+# lost a unique-hash race are skipped instead of failing the batch. Offline
+# imports go through COPY into a staging table.
+
+COLUMNS = (
+    "job_id", "skill_id", "question", "option_a", "option_b", "option_c", "option_d",
+    "correct_answer", "difficulty_band", "question_hash"
+)
+
+
+def mcq_row(parsed, job_id, skill_id, difficulty_band):
+    return {
+        "job_id": job_id,
+        "skill_id": skill_id,
+        "question": parsed["question"],
+        "option_a": parsed["option_a"],
+        "option_b": parsed["option_b"],
+        "option_c": parsed["option_c"],
+        "option_d": parsed["option_d"],
+        "correct_answer": parsed["correct_answer"],
+        "difficulty_band": difficulty_band,
+        "question_hash": dedup.question_hash(parsed["question"])
+    }
+
+
+def insert_mcqs(rows):
+    """Insert rows in one statement without committing; returns {question_hash: mcq_id} for rows written."""
+    if not rows:
+        return {}
+    statement = insert(MCQ.__table__).values(rows).on_conflict_do_nothing().returning(
+        MCQ.__table__.c.mcq_id, MCQ.__table__.c.question_hash
+    )
+    return {digest: mcq_id for mcq_id, digest in db.session.execute(statement)}
+
+
+class UnitWriter:
+    """Buffers parsed questions for one (job, skill, band) unit and persists them per flush.
+
+    Every flush commits, so a unit that fails later keeps what it already saved.
+    """
+
+    def __init__(self, job_id, skill_id, difficulty_band):
+        self.job_id = job_id
+        self.skill_id = skill_id
+        self.difficulty_band = difficulty_band
+        self.pending = []  # (row, parsed)
+        self.saved = 0
+        self.conflicts = 0
+
+    def add(self, parsed):
+        self.pending.append((mcq_row(parsed, self.job_id, self.skill_id, self.difficulty_band), parsed))
+
+    def __len__(self):
+        return len(self.pending)
+
+    def flush(self):
+        """Write and commit the buffer; returns [(mcq_id, parsed)] for the rows saved.
+
+        On a database error the dedup reservations of the buffered questions
+        are released and the error is re-raised.
+        """
+        pending, self.pending = self.pending, []
+        if not pending:
+            return []
+        try:
+            ids = insert_mcqs([row for row, _ in pending])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            index = dedup.get_index(self.job_id, self.skill_id, self.difficulty_band)
+            for _, parsed in pending:
+                index.release(parsed["question"])
+            raise
+        saved = [(ids[row["question_hash"]], parsed) for row, parsed in pending if row["question_hash"] in ids]
+        self.saved += len(saved)
+        self.conflicts += len(pending) - len(saved)
+        metrics.incr("mcq_rows_inserted", len(saved))
+        if len(saved) < len(pending):
+            metrics.incr("mcq_rows_conflicted", len(pending) - len(saved))
+        return saved
+
+
+def copy_mcqs(rows):
+    """Bulk-load rows with COPY through a staging table and commit; returns how many were new.
+
+    Rows whose hash already exists in their pool are dropped by the final
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+    """
+    if not rows:
+        return 0
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if row[column] is None else row[column] for column in COLUMNS])
+    buffer.seek(0)
+
+    columns = ", ".join(COLUMNS)
+    try:
+        db.session.execute(text(f"CREATE TEMP TABLE mcq_import ON COMMIT DROP AS SELECT {columns} FROM mcqs WITH NO DATA"))
+        cursor = db.session.connection().connection.cursor()
+        cursor.copy_expert(f"COPY mcq_import ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        result = db.session.execute(text(
+            f"INSERT INTO mcqs ({columns}) SELECT {columns} FROM mcq_import ON CONFLICT DO NOTHING"
+        ))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    metrics.incr("mcq_rows_inserted", result.rowcount)
+    return result.rowcount
+
+
+@click.command('import-questions')
+@with_appcontext
+@click.argument('directory', default=os.path.join('..', 'question_batches'))
+@click.option('--job-id', type=int, default=None, help='Import into this job instead of the shared pool.')
+def import_questions_command(directory, job_id):
+    """Load <Skill_Name>_<band>.json question files into the MCQ table with COPY."""
+    skills = {normalize_skill(name): skill_id for skill_id, name in db.session.query(Skill.skill_id, Skill.name)}
+    total = 0
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        skill_part, _, band = os.path.basename(path)[:-5].rpartition("_")
+        skill_id = skills.get(normalize_skill(skill_part.replace("_", " ")))
+        if skill_id is None or band not in ("good", "better", "perfect"):
+            click.echo(f"Skipping {path}: unknown skill or band")
+            continue
+        with open(path) as f:
+            result = parse_mcqs(json.dumps(json.load(f)))
+        index = dedup.get_index(job_id, skill_id, band)
+        rows = [
+            mcq_row(parsed, job_id, skill_id, band)
+            for parsed in result.questions if not index.admit(parsed["question"])
+        ]
+        inserted = copy_mcqs(rows)
+        total += inserted
+        click.echo(f"{os.path.basename(path)}: {inserted} imported, {len(result.questions) - inserted} duplicate, {len(result.failures)} unparseable")
+    pool = db.session.query(func.count(MCQ.mcq_id)).filter(MCQ.job_id.is_(None) if job_id is None else MCQ.job_id == job_id).scalar()
+    click.echo(f"Imported {total} questions; {pool} now in {'the shared pool' if job_id is None else f'job {job_id}'}")
+
+
+def init_app(app):
+    app.cli.add_command(import_questions_command)
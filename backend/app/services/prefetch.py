@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from app.services import generation_executor
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_SLOTS = 10000
+PREFETCH_DEADLINE = 60  # seconds a queued prefetch stays worth starting
+
+_enabled = False
+_slots = OrderedDict()  # attempt_id -> _Slot
+_lock = threading.Lock()
+
+
+class _Slot:
+    __slots__ = ("skill", "band", "future")
+
+    def __init__(self, skill, band, future):
+        self.skill = skill
+        self.band = band
+        self.future = future  # generation_executor.GenerationTask
+
+
+def init_app(app):
+    global _enabled
+    if app.config.get('QUESTION_PREFETCH_ENABLED', True) and not _enabled:
+        _enabled = True
+        metrics.register_gauge("question_prefetch_hit_rate", hit_rate)
+
+
+def schedule(attempt_id, skill, band, job_id, job_description="", used_questions=None):
+    """Queue generation of the attempt's likely next (skill, band) question on the shared executor.
+
+    The result is adopted into the job's bank even if the attempt never claims it.
+    """
+    from app.services.question_batches import generate_realtime_question
+
+    if not _enabled:
+        return
+    with _lock:
+        slot = _slots.get(attempt_id)
+        if slot is not None:
+            if (slot.skill, slot.band) == (skill, band):
+                return
+            slot.future.cancel()
+        try:
+            future = generation_executor.submit(
+                generate_realtime_question, skill, band, job_id, job_description, used_questions or [],
+                deadline=time.monotonic() + PREFETCH_DEADLINE, adopt_into=job_id
+            )
+        except generation_executor.QueueFull:
+            # Live requests take priority; skip speculative work when saturated
+            _slots.pop(attempt_id, None)
+            metrics.incr("question_prefetch_skipped")
+            return
+        _slots[attempt_id] = _Slot(skill, band, future)
+        _slots.move_to_end(attempt_id)
+        while len(_slots) > MAX_SLOTS:
+            _, stale = _slots.popitem(last=False)
+            stale.future.cancel()
+    metrics.incr("question_prefetch_scheduled")
+
+
+def take(attempt_id, skill, band):
+    """Claim the attempt's prefetch slot for (skill, band).
+
+    Returns the future (done or still running) when the slot matches,
+    otherwise None. Outcomes are counted for the hit-rate metric.
+    """
+    if not _enabled:
+        return None
+    with _lock:
+        slot = _slots.pop(attempt_id, None)
+    if slot is None:
+        metrics.incr("question_prefetch_take", outcome="miss")
+        return None
+    if (slot.skill, slot.band) != (skill, band):
+        slot.future.cancel()
+        metrics.incr("question_prefetch_take", outcome="mismatch")
+        return None
+    if not slot.future.done():
+        metrics.incr("question_prefetch_take", outcome="pending")
+    elif slot.future.cancelled() or slot.future.result() is None:
+        metrics.incr("question_prefetch_take", outcome="failed")
+    else:
+        metrics.incr("question_prefetch_take", outcome="hit")
+    return slot.future
+
+
+def discard(attempt_id):
+    with _lock:
+        slot = _slots.pop(attempt_id, None)
+    if slot is not None:
+        slot.future.cancel()
+
+
+def hit_rate():
+    """Share of next-question requests served straight from a ready prefetch slot."""
+    outcomes = ("hit", "pending", "failed", "mismatch", "miss")
+    counts = {outcome: metrics.counter_value("question_prefetch_take", outcome=outcome) for outcome in outcomes}
+    total = sum(counts.values())
+    return round(counts["hit"] / total, 4) if total else None
@@ -0,0 +1,226 @@
+import logging
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+from flask import current_app
+from app.models.mcq import MCQ
+from app.models.skill import Skill
+from app.models.required_skill import RequiredSkill
+from app.services.question_pool import bank_criterion
+from app.services.item_stats import not_retired
+
+logger = logging.getLogger(__name__)
+
+BAND_ORDER = ["good", "better", "perfect"]
+
+
+class Question(NamedTuple):
+    mcq_id: int
+    question: str
+    options: tuple
+    answer: str
+    correct_answer: str
+    skill: str
+    difficulty_band: str
+
+
+def question_from_fields(mcq, skill_name):
+    """Build a Question from an MCQ row or any object with the same fields."""
+    options = (mcq.option_a, mcq.option_b, mcq.option_c, mcq.option_d)
+    return Question(
+        mcq.mcq_id,
+        mcq.question,
+        options,
+        options["ABCD".index(mcq.correct_answer)],
+        mcq.correct_answer,
+        skill_name,
+        mcq.difficulty_band
+    )
+
+
+class JobQuestionBank:
+    """Shared, read-mostly question bank for one job.
+
+    Attempts keep only a shuffle seed and the asked mcq_ids; question bodies
+    are resolved here so they are held once per process instead of once per
+    attempt state. Pools are tuples replaced on write, so readers never lock.
+    """
+
+    __slots__ = ("job_id", "questions", "ids", "_lock")
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.questions = {}  # mcq_id -> Question
+        self.ids = {band: {} for band in BAND_ORDER}  # band -> skill -> (mcq_id, ...)
+        self._lock = threading.Lock()
+
+    def load(self, skill_names):
+        """Load the job's overlay and its skills' shared-pool MCQs in one pass, grouping ids by band and skill.
+
+        Items retired by item statistics are left out.
+        """
+        pools = {band: {} for band in BAND_ORDER}
+        mcqs = MCQ.query.filter(bank_criterion(self.job_id, skill_names.keys()), not_retired()).order_by(MCQ.mcq_id).all()
+        for mcq in mcqs:
+            if not self._valid(mcq):
+                continue
+            skill_name = skill_names.get(mcq.skill_id) or mcq.skill.name
+            self.questions[mcq.mcq_id] = question_from_fields(mcq, skill_name)
+            pools[mcq.difficulty_band].setdefault(skill_name, []).append(mcq.mcq_id)
+        self.ids = {band: {skill: tuple(ids) for skill, ids in skills.items()} for band, skills in pools.items()}
+        return self
+
+    @staticmethod
+    def _valid(mcq):
+        if mcq.correct_answer not in ['A', 'B', 'C', 'D']:
+            logger.error(f"Invalid correct_answer '{mcq.correct_answer}' for MCQ mcq_id={mcq.mcq_id}")
+            return False
+        if mcq.difficulty_band not in BAND_ORDER:
+            logger.error(f"Invalid difficulty_band '{mcq.difficulty_band}' for MCQ mcq_id={mcq.mcq_id}")
+            return False
+        return True
+
+    def add_mcq(self, mcq, skill_name):
+        """Add an MCQ row (or question dict fields) to the bank and return its Question."""
+        existing = self.questions.get(mcq.mcq_id)
+        if existing is not None:
+            return existing
+        if not self._valid(mcq):
+            return None
+        question = question_from_fields(mcq, skill_name)
+        with self._lock:
+            if mcq.mcq_id not in self.questions:
+                self.questions[mcq.mcq_id] = question
+                band_pool = self.ids[mcq.difficulty_band]
+                band_pool[skill_name] = band_pool.get(skill_name, ()) + (mcq.mcq_id,)
+        return self.questions[mcq.mcq_id]
+
+    def add_generated(self, question_data):
+        """Add a question dict returned by question_batches (MCQ fields plus skill) to the bank."""
+        return self.add_mcq(_Fields(question_data), question_data["skill"])
+
+    def has_questions(self):
+        return bool(self.questions)
+
+    def get_question(self, mcq_id):
+        """Resolve a question body, loading rows added by another worker on a miss.
+
+        Rows loaded this way are not added to the pools pick draws from, so
+        an item retired since the plan was compiled is only resolved (e.g. to
+        grade an answer), never served again.
+        """
+        question = self.questions.get(mcq_id)
+        if question is not None:
+            return question
+        mcq = MCQ.query.get(mcq_id)
+        if not mcq or mcq.job_id not in (self.job_id, None) or not self._valid(mcq):
+            return None
+        return question_from_fields(mcq, mcq.skill.name)
+
+    def depth(self, band, skill, asked_ids):
+        """Number of questions for (band, skill) the attempt has not been asked."""
+        ids = self.ids.get(band, {}).get(skill, ())
+        return len(ids) - sum(1 for mcq_id in ids if mcq_id in asked_ids)
+
+    def pick(self, band, skill, seed, asked_ids):
+        """Return the next unasked question for (band, skill) in the attempt's seeded order.
+
+        The order is a seeded affine permutation of the pool, so walking it
+        costs O(asked) rather than a shuffle of the whole pool per request.
+        """
+        ids = self.ids.get(band, {}).get(skill, ())
+        n = len(ids)
+        if not n:
+            return None
+        rng = random.Random(f"{seed}:{band}:{skill}")
+        offset = rng.randrange(n)
+        stride = rng.randrange(1, n) if n > 1 else 1
+        while math.gcd(stride, n) != 1:
+            stride += 1
+        for k in range(n):
+            mcq_id = ids[(offset + k * stride) % n]
+            if mcq_id not in asked_ids:
+                return self.questions[mcq_id]
+        return None
+
+
+class _Fields:
+    """Attribute view over a question dict so it can be added like an MCQ row."""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data):
+        self._data = data
+
+    def __getattr__(self, name):
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class AssessmentPlan:
+    """Everything next-question needs for a job, compiled once and shared by all attempts."""
+
+    __slots__ = ("job_id", "skills", "priorities", "skill_order", "bank", "compiled_at")
+
+    def __init__(self, job_id, skills, bank):
+        self.job_id = job_id
+        self.skills = skills  # ((name, skill_id, priority), ...)
+        self.priorities = {name: priority for name, _, priority in skills}
+        self.skill_order = tuple(name for name, _, _ in sorted(skills, key=lambda s: -s[2]))
+        self.bank = bank
+        self.compiled_at = time.monotonic()
+
+    @classmethod
+    def compile(cls, job_id):
+        required_skills = RequiredSkill.query.filter_by(job_id=job_id).join(Skill, Skill.skill_id == RequiredSkill.skill_id).all()
+        skills = tuple((rs.skill.name, rs.skill_id, rs.priority) for rs in required_skills)
+        bank = JobQuestionBank(job_id).load({skill_id: name for name, skill_id, _ in skills})
+        return cls(job_id, skills, bank)
+
+
+_plans = OrderedDict()
+_plans_lock = threading.Lock()
+
+
+def get_assessment_plan(job_id):
+    """Return the cached plan for a job, compiling it on a miss or after it goes stale.
+
+    Plans are evicted LRU and expire after ASSESSMENT_PLAN_TTL seconds so
+    invalidations made in other workers are picked up.
+    """
+    ttl = current_app.config.get('ASSESSMENT_PLAN_TTL', 300)
+    with _plans_lock:
+        plan = _plans.get(job_id)
+        if plan is not None and time.monotonic() - plan.compiled_at < ttl:
+            _plans.move_to_end(job_id)
+            return plan
+
+    plan = AssessmentPlan.compile(job_id)
+    if not plan.bank.has_questions():
+        # Generation may still be running; do not pin an empty plan
+        return plan
+    with _plans_lock:
+        _plans[job_id] = plan
+        _plans.move_to_end(job_id)
+        while len(_plans) > current_app.config.get('ASSESSMENT_PLAN_CACHE_SIZE', 256):
+            _plans.popitem(last=False)
+    return plan
+
+
+def invalidate_assessment_plan(job_id):
+    """Drop a job's compiled plan after its questions, skills or status change."""
+    with _plans_lock:
+        _plans.pop(job_id, None)
+
+
+def invalidate_skill_plans(skill_ids):
+    """Drop every cached plan that requires one of skill_ids, after shared-pool questions for them are added."""
+    skill_ids = set(skill_ids)
+    with _plans_lock:
+        for job_id in [job_id for job_id, plan in _plans.items() if any(skill_id in skill_ids for _, skill_id, _ in plan.skills)]:
+            _plans.pop(job_id, None)
@@ -1,62 +1,60 @@
-import os
-import json
-import re
-import threading
-import functools
+import logging
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeout
 from flask import current_app
-import google.generativeai as genai
-from google.api_core.exceptions import TooManyRequests
+from sqlalchemy import func
 from app import db
-from app.models.skill import Skill
 from app.models.mcq import MCQ
+from app.services.question_bank import invalidate_assessment_plan, invalidate_skill_plans
+from app.services.mcq_parser import MCQ_SCHEMA, StreamParser, parse_mcqs
+from app.services import dedup, degradation, exam_simulator, question_pool, generation_executor, llm, llm_usage, mcq_writer, singleflight, skill_registry
+from app.services.llm import TooManyRequests
+from app.services.skill_taxonomy import get_subskills
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
 
-# Cross-platform timeout implementation
 class TimeoutError(Exception):
     pass
 
-def timeout_with_context(seconds):
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            app = current_app._get_current_object()
-            result = [None]
-            exception = [None]
-            
-            def target():
-                with app.app_context():
-                    try:
-                        result[0] = func(*args, **kwargs)
-                    except Exception as e:
-                        exception[0] = e
-            
-            thread = threading.Thread(target=target)
-            thread.daemon = True
-            thread.start()
-            thread.join(seconds)
-            
-            if thread.is_alive():
-                raise TimeoutError(f'Function call timed out after {seconds} seconds')
-            
-            if exception[0]:
-                raise exception[0]
-            
-            return result[0]
-        return wrapper
-    return decorator
-
-# Configure Gemini AI API
-api_key = os.getenv("GOOGLE_API_KEY")
-if not api_key:
-    raise ValueError("GOOGLE_API_KEY environment variable not set")
-genai.configure(api_key=api_key)
-generation_config = {
-    "temperature": 0.2,
-    "max_output_tokens": 2048
-}
-model_gemini = genai.GenerativeModel(
-    model_name="gemini-1.5-flash", generation_config=generation_config
-)
+REALTIME_TIMEOUT = 5  # seconds a request waits for a real-time question
+REALTIME_BURST_TIMEOUT = 10  # a burst may outlive its first waiters; the rest is buffered
+
+BANDS = ["good", "better", "perfect"]
+QUESTIONS_PER_BAND = 20
+STREAM_FLUSH_SIZE = 5  # streamed questions are committed in groups this size
+
+# Structured generation asks for a JSON array matching MCQ_SCHEMA; the text
+# prompts and parser remain for LLM_STRUCTURED_OUTPUT=False and as a fallback
+STRUCTURED_CONFIG = llm.json_generation_config(MCQ_SCHEMA)
+
+def structured_output():
+    return current_app.config.get('LLM_STRUCTURED_OUTPUT', True)
+
+def streaming_batches():
+    return current_app.config.get('LLM_STREAM_BATCHES', True)
+
+def send_prompt(prompt, timeout=None, kind="mcq", site="batch_generation", job_id=None, cache=True, refresh=False,
+                generation_config=llm.DEFAULT_GENERATION_CONFIG):
+    """Send a prompt to the LLM backend once the scheduler admits it (see llm_scheduler).
+
+    site sets the call's priority class and, with job_id, its telemetry (see
+    llm_usage) and fair-share tenant. A cached response (see llm_cache) is
+    returned without waiting; cache=False skips the cache and refresh=True
+    replaces the cached response.
+    """
+    return llm.generate(
+        prompt, kind=kind, timeout=timeout, generation_config=generation_config,
+        site=site, job_id=job_id, cache=cache, refresh=refresh
+    )
+
+def stream_prompt(prompt, timeout=None, kind="mcq", site="batch_generation", job_id=None, cache=True, refresh=False,
+                  generation_config=llm.DEFAULT_GENERATION_CONFIG):
+    """Like send_prompt, but yield the response in chunks as the backend produces them."""
+    yield from llm.stream(
+        prompt, kind=kind, timeout=timeout, generation_config=generation_config,
+        site=site, job_id=job_id, cache=cache, refresh=refresh
+    )
 
 def divide_experience_range(jd_range):
     start, end = map(float, jd_range.split("-"))
@@ -72,22 +70,21 @@ def expand_skills_with_gemini(skill):
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            chat_session = model_gemini.start_chat(history=[{"role": "user", "parts": [prompt]}])
-            response = chat_session.send_message(prompt)
+            response = send_prompt(prompt, kind="subtopics", site="subskill_expansion")
             if response and isinstance(response.text, str):
                 subtopics = [line.strip("- ").strip() for line in response.text.split("\n") if line.strip()][:5]
+                llm_usage.record_attempts("subskill_expansion", attempt + 1)
                 return subtopics
         except TooManyRequests:
             if attempt < max_retries - 1:
-                wait_time = 2 ** attempt * 10
-                print(f"⛔️ Gemini quota exceeded while expanding skill: {skill}. Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
+                logger.warning(f"Gemini quota exceeded while expanding skill: {skill}. Retrying once the scheduler allows...")
             else:
-                print(f"⛔️ Gemini quota exceeded after {max_retries} retries for skill: {skill}")
+                logger.error(f"Gemini quota exceeded after {max_retries} retries for skill: {skill}")
+                llm_usage.record_attempts("subskill_expansion", max_retries)
                 return []
     return []
 
-def generate_questions_prompt(skill, subskills, difficulty_band, job_description="", previous_questions=None):
+def generate_questions_prompt(skill, subskills, difficulty_band, job_description="", previous_questions=None, count=QUESTIONS_PER_BAND, structured=False):
     difficulty_descriptor = {
         "good": "easy and theory-based, suitable for beginners. Can include data structures and algorithms questions.",
         "better": "moderate difficulty, mixing theory and practical concepts, can be DSA-based or practical.",
@@ -105,25 +102,33 @@ def generate_questions_prompt(skill, subskills, difficulty_band, job_description
     
     prompt = f"""
     {description_context}
-    Generate exactly 20 unique and diverse multiple-choice questions (MCQs) on the skill '{skill}' and its subskills: {", ".join(subskills)}.
+    Generate exactly {count} unique and diverse multiple-choice questions (MCQs) on the skill '{skill}' and its subskills: {", ".join(subskills)}.
     The questions should be {difficulty_descriptor}. Include 5-7 code snippet questions where applicable, and the rest should be theory-based to ensure variety.
     Guidelines:
-    1. Each question must be unique in wording and concept, with no repetition or paraphrasing across the 20 questions.
+    1. Each question must be unique in wording and concept, with no repetition or paraphrasing across the {count} questions.
     2. Cover a broad range of topics from the subskills provided to ensure diversity.
     3. Avoid similar ideas, synonyms, or rephrased questions within the batch.
     {avoid_section}
-    4. Each MCQ must have exactly four options labeled (A), (B), (C), (D).
+    {_json_format_rules(count) if structured else _TEXT_FORMAT_RULES}
+    """
+    return prompt.strip()
+
+_TEXT_FORMAT_RULES = """4. Each MCQ must have exactly four options labeled (A), (B), (C), (D).
     5. The correct answer must be one of (A), (B), (C), (D) and formatted as: "Correct Answer: (B)"
     6. Format each question with the question text on one line (code snippets should use spaces instead of newlines), followed by options and correct answer on separate lines.
     7. Example format:
     "What is an AMI in AWS? (A) Virtual machine image (B) Storage volume (C) Network interface (D) Security group Correct Answer: (A)"
     "What will this code print? driver.findElement(By.xpath(\"//input[@type='submit']\")).click(); (A) Submits a form (B) Clicks a button (C) Enters text (D) Clears a field Correct Answer: (B)"
     8. Return ONLY the formatted MCQs as a newline-separated string, with each question separated by a blank line, e.g.:
-    "Question 1... (A) Option A (B) Option B (C) Option C (D) Option D Correct Answer: (B)\n\nQuestion 2... (A) Option A..."
-    """
-    return prompt.strip()
+    "Question 1... (A) Option A (B) Option B (C) Option C (D) Option D Correct Answer: (B)\n\nQuestion 2... (A) Option A..." """
+
+def _json_format_rules(count, first=4, avoid_section=""):
+    return f"""{avoid_section}
+    {first}. Each MCQ must have exactly four distinct, non-empty options.
+    {first + 1}. Put any code snippet inside the question text on one line, using spaces instead of newlines.
+    {first + 2}. Return ONLY a JSON array of {count} objects, each with "question" (the question text), "options" (the four option texts, without (A)-(D) labels) and "correct_answer" (the letter "A", "B", "C" or "D" of the correct option)."""
 
-def generate_single_question_prompt(skill, subskills, difficulty_band, job_description="", previous_questions=None):
+def generate_single_question_prompt(skill, subskills, difficulty_band, job_description="", previous_questions=None, structured=False):
     difficulty_descriptor = {
         "good": "easy and theory-based, suitable for beginners. Can include data structures and algorithms questions.",
         "better": "moderate difficulty, mixing theory and practical concepts, can be DSA-based or practical.",
@@ -139,6 +144,14 @@ def generate_single_question_prompt(skill, subskills, difficulty_band, job_descr
             avoid_section += "\n".join(f"({chr(65+i)}) {opt}" for i, opt in enumerate(q['options']))
             avoid_section += f"\nCorrect Answer: ({q['correct_answer']})\n\n"
     
+    text_rules = f"""3. The MCQ must have exactly four options labeled (A), (B), (C), (D).
+    4. The correct answer must be one of (A), (B), (C), (D) and formatted as: "Correct Answer: (B)"
+    {avoid_section}
+    5. Format the question with the question text on one line (code snippets should use spaces instead of newlines), followed by options and correct answer on separate lines.
+    6. Example format:
+    "What will this code print? driver.findElement(By.xpath(\"//input[@type='submit']\")).click(); (A) Submits a form (B) Clicks a button (C) Enters text (D) Clears a field Correct Answer: (B)"
+    Return ONLY the formatted MCQ as a string. No extra text, no code block markers."""
+    
     prompt = f"""
     {description_context}
     Generate a single unique multiple-choice question (MCQ) on the skill '{skill}' and its subskills: {", ".join(subskills)}.
@@ -146,211 +159,210 @@ def generate_single_question_prompt(skill, subskills, difficulty_band, job_descr
     Guidelines:
     1. The question must be unique and concise, distinct from any previous questions.
     2. Cover a topic from the skill or subskills provided.
-    3. The MCQ must have exactly four options labeled (A), (B), (C), (D).
-    4. The correct answer must be one of (A), (B), (C), (D) and formatted as: "Correct Answer: (B)"
-    {avoid_section}
-    5. Format the question with the question text on one line (code snippets should use spaces instead of newlines), followed by options and correct answer on separate lines.
-    6. Example format:
-    "What will this code print? driver.findElement(By.xpath(\"//input[@type='submit']\")).click(); (A) Submits a form (B) Clicks a button (C) Enters text (D) Clears a field Correct Answer: (B)"
-    Return ONLY the formatted MCQ as a string. No extra text, no code block markers.
+    {_json_format_rules(1, first=3, avoid_section=avoid_section) if structured else text_rules}
     """
     return prompt.strip()
 
-def clean_entry(entry):
-    """Clean a text entry by replacing newlines with spaces and removing extra whitespace."""
-    entry = entry.strip().replace('\n', ' ').replace('\\n', ' ')
-    entry = re.sub(r'([a-z])\1+', r'\1', entry)
-    return ' '.join(entry.split())
+def parse_generated(raw_text, skill_name, difficulty_band, structured=False):
+    """Parse a Gemini response with mcq_parser, counting accepted blocks and reject reasons.
 
-def parse_question_block(block):
-    """Parse a single question block into a structured format, handling single-line or multi-line input."""
-    # Normalize input: replace multiple spaces with single space, handle newlines
-    block = re.sub(r'\s+', ' ', block.strip())
-    
-    # Try splitting by newlines first (multi-line format)
-    lines = [line.strip() for line in block.split("\n") if line.strip()]
-    if len(lines) >= 5:
-        option_start = next((i for i, line in enumerate(lines) if re.match(r'^\(A\)\s*', line)), len(lines))
-        if option_start < len(lines) and option_start > 0:
-            question = clean_entry(' '.join(lines[:option_start]))
-            option_lines = lines[option_start:option_start+4]
-            if len(option_lines) == 4:
-                options = [clean_entry(re.sub(r'^\([A-D]\)\s*', '', opt).strip()) for opt in option_lines]
-                correct_line = lines[option_start+4] if option_start+4 < len(lines) else ""
-                match = re.search(r'Correct Answer:\s*\(([A-D])\)\s*$', correct_line)
-                if match and match.group(1) in ['A', 'B', 'C', 'D']:
-                    return {
-                        "question": question,
-                        "option_a": options[0],
-                        "option_b": options[1],
-                        "option_c": options[2],
-                        "option_d": options[3],
-                        "correct_answer": match.group(1),
-                        "options": options
-                    }
-    
-    # Fallback: handle single-line format (e.g., logs show question + options + answer in one line)
-    # Example: "What is an AMI in AWS? (A) Virtual machine image (B) Storage volume (C) Network interface (D) Security group Correct Answer: (A)"
-    match = re.match(r'^(.*?)\s*\(A\)\s*(.*?)\s*\(B\)\s*(.*?)\s*\(C\)\s*(.*?)\s*\(D\)\s*(.*?)\s*Correct Answer:\s*\(([A-D])\)\s*$', block)
-    if match:
-        question = clean_entry(match.group(1))
-        options = [clean_entry(match.group(i)) for i in range(2, 6)]
-        correct_answer = match.group(6)
-        if correct_answer in ['A', 'B', 'C', 'D']:
-            return {
-                "question": question,
-                "option_a": options[0],
-                "option_b": options[1],
-                "option_c": options[2],
-                "option_d": options[3],
-                "correct_answer": correct_answer,
-                "options": options
-            }
-    
-    print(f"Invalid question format: {block}")
-    return None
+    Outcomes are labelled with the backend and the requested output mode, and
+    a structured request answered in the text format counts as a fallback.
+    """
+    result = parse_mcqs(raw_text)
+    _count_parsed(len(result.questions), result.failures, result.format, skill_name, difficulty_band, structured)
+    return result.questions
 
-def parse_response(raw_text):
-    """Parse the raw response from Gemini into a list of questions."""
-    # Log raw response for debugging
-    print(f"📜 Raw Gemini response: {raw_text[:500]}... (truncated)")
-    
-    # Clean response: remove code block markers, normalize newlines
-    raw_text = raw_text.strip()
-    raw_text = re.sub(r'^```(json|python)?\s*\n', '', raw_text, flags=re.MULTILINE)
-    raw_text = re.sub(r'\n```$', '', raw_text, flags=re.MULTILINE)
-    raw_text = re.sub(r'\n\s*\n+', '\n\n', raw_text)  # Normalize multiple newlines to double newline
-    raw_text = raw_text.strip()
-    
-    # Try JSON parsing first
-    if raw_text.startswith("[") and raw_text.endswith("]"):
-        try:
-            questions = json.loads(raw_text)
-            return [q for q in questions if q]
-        except json.JSONDecodeError:
-            print(f"⚠️ Failed to parse JSON response: {raw_text[:100]}...")
-    
-    # Split by double newlines for question blocks
-    questions = []
-    current_question = []
-    for line in raw_text.split("\n"):
-        line = line.strip()
-        if not line:
-            if current_question:
-                questions.append("\n".join(current_question))
-                current_question = []
-            continue
-        current_question.append(line)
-        if re.match(r'Correct Answer:\s*\([A-D]\)\s*$', line):
-            questions.append("\n".join(current_question))
-            current_question = []
-    
-    if current_question:
-        questions.append("\n".join(current_question))
-    
-    # Fallback: if splitting fails, try treating as single-line questions
-    if not questions or all(len(q.split("\n")) == 1 for q in questions):
-        questions = []
-        for line in raw_text.split("\n\n"):
-            line = line.strip()
-            if line:
-                questions.append(line)
-    
-    return [q for q in questions if q]
+def _count_parsed(accepted, failures, response_format, skill_name, difficulty_band, structured):
+    backend = llm.get_backend().name
+    mode = "structured" if structured else "text"
+    metrics.incr("mcq_parse", accepted, outcome="accepted", backend=backend, mode=mode)
+    for failure in failures:
+        metrics.incr("mcq_parse", outcome=failure.reason, backend=backend, mode=mode)
+    if structured and response_format != "json":
+        metrics.incr("mcq_parse_text_fallback", backend=backend)
+    llm_usage.record_parse(backend, mode, accepted, len(failures))
+    if failures:
+        reasons = ", ".join(sorted({failure.reason for failure in failures}))
+        logger.warning(f"Rejected {len(failures)} malformed questions for {skill_name} ({difficulty_band}): {reasons}")
 
-@timeout_with_context(5)
-def generate_single_question_with_timeout(skill_name, difficulty_band, job_id, job_description="", used_questions=None):
-    """Generate a single question with timeout."""
-    skill = Skill.query.filter_by(name=skill_name).first()
-    if not skill:
-        print(f"⚠️ Skill {skill_name} not found in database.")
-        return None
+def iter_generated(chunks, skill_name, difficulty_band, structured=False, job_id=None):
+    """Yield (question, cached) for each question as soon as its block of the response completes.
+
+    chunks is a whole response in a list or the chunks of stream_prompt.
+    Parse outcomes are counted like parse_generated when the response ends or
+    the caller stops reading; a complete response with no usable question is
+    dropped from the LLM cache.
+    """
+    parser = StreamParser()
+    accepted = 0
+    failures = []
+    chunk = None
+    complete = False
+    try:
+        for chunk in chunks:
+            result = parser.feed(chunk.text or "")
+            failures.extend(result.failures)
+            for parsed in result.questions:
+                accepted += 1
+                yield parsed, chunk.cached
+        result = parser.close()
+        failures.extend(result.failures)
+        complete = True
+        for parsed in result.questions:
+            accepted += 1
+            yield parsed, chunk.cached
+    finally:
+        if chunk is not None:
+            _count_parsed(accepted, failures, parser.format, skill_name, difficulty_band, structured)
+        if complete and not accepted:
+            llm_usage.record_outcome("batch_generation", "parse_fail", job_id)
+            llm.forget(chunk)
+
+def _question_data(mcq_id, parsed, skill_name, difficulty_band):
+    return {
+        "mcq_id": mcq_id,
+        "question": parsed["question"],
+        "option_a": parsed["option_a"],
+        "option_b": parsed["option_b"],
+        "option_c": parsed["option_c"],
+        "option_d": parsed["option_d"],
+        "correct_answer": parsed["correct_answer"],
+        "skill": skill_name,
+        "difficulty_band": difficulty_band,
+        "options": parsed["options"]
+    }
+
+def generate_realtime_questions(skill_name, difficulty_band, job_id, job_description="", used_questions=None, count=1, should_stop=None):
+    """Generate up to count questions with one Gemini call and save them to the MCQ table.
+
+    Returns a list of question dicts (empty on failure). should_stop is
+    checked before every Gemini call so a cancelled task stops spending
+    quota; a call already in flight still saves its questions.
+    """
+    skill_id = skill_registry.skill_id(skill_name)
+    if skill_id is None:
+        logger.warning(f"Skill {skill_name} not found in database.")
+        return []
     
-    skill_id = skill.skill_id
-    subskills = expand_skills_with_gemini(skill_name)
+    # Never spend a second Gemini round-trip inside the real-time budget
+    subskills = get_subskills(skill_name, fetch=False) or [skill_name]
     
     previous_questions = [
         q for q in (used_questions or [])
         if q.get('skill') == skill_name and q.get('difficulty_band') == difficulty_band
     ]
+    writer = mcq_writer.UnitWriter(job_id, skill_id, difficulty_band)
+    structured = structured_output()
+    generation_config = STRUCTURED_CONFIG if structured else llm.DEFAULT_GENERATION_CONFIG
     
     max_retries = 3
     for attempt in range(max_retries):
+        if should_stop and should_stop():
+            return []
         try:
-            prompt = generate_single_question_prompt(skill_name, subskills, difficulty_band, job_description, previous_questions)
-            chat = model_gemini.start_chat(history=[{"role": "user", "parts": [prompt]}])
-            response = chat.send_message(prompt)
+            if count == 1:
+                prompt = generate_single_question_prompt(skill_name, subskills, difficulty_band, job_description, previous_questions, structured=structured)
+                timeout = REALTIME_TIMEOUT
+            else:
+                prompt = generate_questions_prompt(skill_name, subskills, difficulty_band, job_description, previous_questions, count=count, structured=structured)
+                timeout = REALTIME_BURST_TIMEOUT
+            response = send_prompt(
+                prompt, timeout=timeout, site="realtime_generation", job_id=job_id, cache=False, generation_config=generation_config
+            )
             
             if response and isinstance(response.text, str):
-                questions = parse_response(response.text)
+                questions = parse_generated(response.text, skill_name, difficulty_band, structured)
                 if not questions:
-                    print(f"⚠️ No valid question generated for {skill_name} ({difficulty_band})")
+                    logger.warning(f"No valid question generated for {skill_name} ({difficulty_band})")
+                    llm_usage.record_outcome("realtime_generation", "parse_fail", job_id)
                     continue
                 
-                parsed = parse_question_block(questions[0])
-                if not parsed:
-                    print(f"⚠️ Invalid question format for {skill_name} ({difficulty_band}): {questions[0]}")
+                for parsed in questions[:count]:
+                    duplicate = dedup.screen(job_id, skill_id, difficulty_band, parsed["question"])
+                    if duplicate:
+                        logger.debug(f"Discarded {duplicate} duplicate question for {skill_name} ({difficulty_band})")
+                        continue
+                    writer.add(parsed)
+                # Rows another worker saved first are skipped by the insert
+                saved = writer.flush()
+                if not saved:
                     continue
                 
-                mcq = MCQ(
-                    job_id=job_id,
-                    skill_id=skill_id,
-                    question=parsed["question"],
-                    option_a=parsed["option_a"],
-                    option_b=parsed["option_b"],
-                    option_c=parsed["option_c"],
-                    option_d=parsed["option_d"],
-                    correct_answer=parsed["correct_answer"],
-                    difficulty_band=difficulty_band
-                )
-                db.session.add(mcq)
-                db.session.commit()
-                
-                print(f"✅ Saved real-time question for {skill_name} ({difficulty_band}) to MCQ table")
-                return {
-                    "mcq_id": mcq.mcq_id,
-                    "question": parsed["question"],
-                    "option_a": parsed["option_a"],
-                    "option_b": parsed["option_b"],
-                    "option_c": parsed["option_c"],
-                    "option_d": parsed["option_d"],
-                    "correct_answer": parsed["correct_answer"],
-                    "skill": skill_name,
-                    "difficulty_band": difficulty_band,
-                    "options": parsed["options"]
-                }
+                logger.info(f"Saved {len(saved)} real-time question(s) for {skill_name} ({difficulty_band}) to MCQ table")
+                llm_usage.record_attempts("realtime_generation", attempt + 1)
+                return [_question_data(mcq_id, parsed, skill_name, difficulty_band) for mcq_id, parsed in saved]
         except TooManyRequests:
             if attempt < max_retries - 1:
-                wait_time = 2 ** attempt * 10
-                print(f"⛔️ Gemini quota exceeded for {skill_name} ({difficulty_band}). Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
+                logger.warning(f"Gemini quota exceeded for {skill_name} ({difficulty_band}). Retrying once the scheduler allows...")
             else:
-                print(f"⛔️ Gemini quota exceeded after {max_retries} retries for {skill_name} ({difficulty_band}).")
-                return None
-    return None
+                logger.error(f"Gemini quota exceeded after {max_retries} retries for {skill_name} ({difficulty_band}).")
+                break
+    llm_usage.record_attempts("realtime_generation", max_retries)
+    return []
+
+def generate_realtime_question(skill_name, difficulty_band, job_id, job_description="", used_questions=None, should_stop=None):
+    """Generate a single question with Gemini and save it to the MCQ table."""
+    questions = generate_realtime_questions(skill_name, difficulty_band, job_id, job_description, used_questions, should_stop=should_stop)
+    return questions[0] if questions else None
+
+def generate_single_question_with_timeout(skill_name, difficulty_band, job_id, job_description="", used_questions=None):
+    """Serve a real-time question, waiting at most REALTIME_TIMEOUT seconds.
+
+    Concurrent requests for the same (job, skill, band) share one in-flight
+    generation of REALTIME_BURST_SIZE questions, and the extras are buffered
+    for the next requests; questions in used_questions are never handed out.
+    On timeout the generation keeps its worker and its questions are adopted
+    into the job's bank for later requests. Each wait is reported to the
+    degradation breaker; while it is open, RealtimeUnavailable is raised
+    instead of waiting.
+    """
+    key = (job_id, skill_name, difficulty_band)
+    exclude = {q["mcq_id"] for q in (used_questions or []) if "mcq_id" in q}
+    question = singleflight.take(key, exclude)
+    if question:
+        return question
+    if not degradation.allow_realtime():
+        raise degradation.RealtimeUnavailable(f"Real-time generation is degraded for {skill_name} ({difficulty_band})")
+    
+    started = time.monotonic()
+    try:
+        task = singleflight.join(
+            key, generate_realtime_questions, skill_name, difficulty_band, job_id, job_description, used_questions,
+            count=current_app.config.get('REALTIME_BURST_SIZE', 5),
+            deadline=time.monotonic() + REALTIME_TIMEOUT, adopt_into=job_id
+        )
+    except generation_executor.QueueFull as e:
+        degradation.record_realtime(0.0, False)
+        raise TimeoutError(str(e))
+    try:
+        task.result(timeout=REALTIME_TIMEOUT)
+    except FutureTimeout:
+        task.abandon()
+        degradation.record_realtime(REALTIME_TIMEOUT, False)
+        raise TimeoutError(f'Function call timed out after {REALTIME_TIMEOUT} seconds')
+    question = singleflight.take(key, exclude)
+    degradation.record_realtime(time.monotonic() - started, question is not None)
+    return question
 
 def get_prestored_question(skill_name, difficulty_band, job_id, used_questions=None):
-    """Retrieve a pre-stored question."""
+    """Retrieve a random unused pre-stored question with single-row index lookups."""
     try:
-        skill = Skill.query.filter_by(name=skill_name).first()
-        if not skill:
-            print(f"⚠️ Skill {skill_name} not found in database.")
+        skill_id = skill_registry.skill_id(skill_name)
+        if skill_id is None:
+            logger.warning(f"Skill {skill_name} not found in database.")
             return None
         
-        used_mcq_ids = [q['mcq_id'] for q in (used_questions or []) if 'mcq_id' in q]
-        query = MCQ.query.filter_by(
-            job_id=job_id,
-            skill_id=skill.skill_id,
-            difficulty_band=difficulty_band
-        ).filter(~MCQ.mcq_id.in_(used_mcq_ids))
-        
-        available_mcqs = query.all()
-        if not available_mcqs:
-            print(f"⚠️ No unused pre-stored questions found for {skill_name} ({difficulty_band})")
+        used_mcq_ids = {q['mcq_id'] for q in (used_questions or []) if 'mcq_id' in q}
+        # Prefer the job's own JD-specific questions over the shared pool
+        mcq = question_pool.pick_stored_mcq(job_id, skill_id, difficulty_band, used_mcq_ids)
+        if not mcq and job_id is not None and question_pool.pool_enabled():
+            mcq = question_pool.pick_stored_mcq(None, skill_id, difficulty_band, used_mcq_ids)
+        if not mcq:
+            logger.warning(f"No unused pre-stored questions found for {skill_name} ({difficulty_band})")
             return None
         
-        mcq = available_mcqs[0]  # Select first available question
-        print(f"📦 Using pre-stored question for {skill_name} ({difficulty_band}) - ID: {mcq.mcq_id}")
+        logger.info(f"Using pre-stored question for {skill_name} ({difficulty_band}) - ID: {mcq.mcq_id}")
         return {
             "mcq_id": mcq.mcq_id,
             "question": mcq.question,
@@ -364,7 +376,7 @@ def get_prestored_question(skill_name, difficulty_band, job_id, used_questions=N
             "options": [mcq.option_a, mcq.option_b, mcq.option_c, mcq.option_d]
         }
     except Exception as e:
-        print(f"⚠️ Error fetching pre-stored question: {e}")
+        logger.error(f"Error fetching pre-stored question: {e}")
         return None
 
 def generate_single_question(skill_name, difficulty_band, job_id, job_description="", used_questions=None):
@@ -379,106 +391,240 @@ def generate_single_question(skill_name, difficulty_band, job_id, job_descriptio
             if result:
                 return result
         except TimeoutError:
-            print(f"⏰ Real-time generation timed out for {skill_name} ({difficulty_band}). Falling back to pre-stored questions.")
+            logger.warning(f"Real-time generation timed out for {skill_name} ({difficulty_band}). Falling back to pre-stored questions.")
+            llm_usage.record_outcome("realtime_generation", "timeout", job_id)
+            break
+        except degradation.RealtimeUnavailable:
+            logger.warning(f"Real-time generation degraded for {skill_name} ({difficulty_band}). Serving pre-stored questions.")
             break
         except TooManyRequests:
-            print(f"⛔️ Gemini quota exceeded after retries for {skill_name} ({difficulty_band}). Falling back to pre-stored questions.")
+            logger.warning(f"Gemini quota exceeded after retries for {skill_name} ({difficulty_band}). Falling back to pre-stored questions.")
             break
         except Exception as e:
-            print(f"⚠️ Error in real-time generation for {skill_name} ({difficulty_band}): {e}")
-            print("🔄 Falling back to pre-stored questions.")
+            logger.error(f"Error in real-time generation for {skill_name} ({difficulty_band}): {e}. Falling back to pre-stored questions.")
             break
     
+    llm_usage.record_outcome("realtime_generation", "fallback_db", job_id)
     return get_prestored_question(skill_name, difficulty_band, job_id, used_questions)
 
-def prepare_question_batches(skills_with_priorities, jd_experience_range, job_id, job_description=""):
-    """Generate and store 20 unique questions per skill per difficulty band."""
-    band_ranges = divide_experience_range(jd_experience_range)
-    question_bank = {"good": {}, "better": {}, "perfect": {}}
-    total_questions_saved = 0
+PROGRESS_LEVELS = {"running": logging.DEBUG, "done": logging.INFO, "saturated": logging.INFO, "partial": logging.WARNING, "failed": logging.ERROR}
+
+def log_progress(skill_name, band, saved, target, status, attempts=0, errors=0, scope="job"):
+    """Default progress callback for prepare_question_batches."""
+    pool = " shared pool" if scope == "pool" else ""
+    logger.log(PROGRESS_LEVELS.get(status, logging.INFO), f"[{band.upper()}] {skill_name}{pool}: {saved}/{target} questions ({status})")
+
+def generate_band_questions(skill_name, skill_id, subskills, band, job_id, job_description="", target=QUESTIONS_PER_BAND, progress=log_progress, existing=0, scope="job"):
+    """Generate and commit questions for one (skill, band) work unit until it holds target.
+
+    existing is the number of rows already saved for the unit; job_id is None
+    (scope "pool") when topping up the shared pool.
+    Candidates are screened by the pool's dedup index before insert, and the
+    unit stops early once most recent candidates are duplicates. Each
+    response's survivors are written in one bulk INSERT and committed, so a
+    failure later in the unit keeps what was already saved. With
+    LLM_STREAM_BATCHES responses are streamed and questions are committed in
+    groups of STREAM_FLUSH_SIZE as they arrive, so the band is servable before
+    the response ends and a stream that breaks off still keeps its questions.
+    """
+    saved_questions = []
+    attempts = 0
+    errors = 0
+    duplicates = 0
+    saturated = False
+    max_attempts = 5
+    started = time.monotonic()
+    target -= existing
+    index = dedup.get_index(job_id, skill_id, band)
+    writer = mcq_writer.UnitWriter(job_id, skill_id, band)
+    structured = structured_output()
+    streaming = streaming_batches()
+    generation_config = STRUCTURED_CONFIG if structured else llm.DEFAULT_GENERATION_CONFIG
     
+    def save():
+        nonlocal errors
+        try:
+            batch = writer.flush()
+        except Exception as e:
+            errors += 1
+            logger.error(f"Error saving questions for {skill_name} in {band} band: {e}")
+            return
+        if not batch:
+            return
+        for mcq_id, parsed in batch:
+            saved_questions.append({
+                "mcq_id": mcq_id,
+                "question": parsed["question"],
+                "options": parsed["options"],
+                "correct_answer": parsed["correct_answer"],
+                "skill": skill_name,
+                "difficulty_band": band
+            })
+        progress(skill_name, band, existing + len(saved_questions), existing + target, "running", attempts, errors, scope=scope)
+    
+    while len(saved_questions) < target and attempts < max_attempts and not saturated:
+        attempts += 1
+        try:
+            # Ask only for what is still missing, one response's worth at a time
+            count = min(QUESTIONS_PER_BAND, target - len(saved_questions))
+            prompt = generate_questions_prompt(skill_name, subskills, band, job_description, saved_questions, count=count, structured=structured)
+            # A cached batch is only worth trying once; a retry of the same prompt needs new questions
+            if streaming:
+                chunks = stream_prompt(prompt, job_id=job_id, refresh=attempts > 1, generation_config=generation_config)
+            else:
+                chunks = [send_prompt(prompt, job_id=job_id, refresh=attempts > 1, generation_config=generation_config)]
+            
+            generated = 0
+            try:
+                for parsed, cached in iter_generated(chunks, skill_name, band, structured, job_id):
+                    generated += 1
+                    if len(writer) >= target - len(saved_questions):  # Limit to remaining needed questions
+                        break
+                    if cached and index.find(parsed["question"]):
+                        continue  # a cached batch repeating saved questions says nothing about saturation
+                    if dedup.screen(job_id, skill_id, band, parsed["question"]):
+                        duplicates += 1
+                        continue
+                    writer.add(parsed)
+                    if streaming and len(writer) >= STREAM_FLUSH_SIZE:
+                        save()
+            finally:
+                # Questions that arrived before a failure are still saved
+                save()
+            logger.info(f"[{band.upper()}] {skill_name}: {generated} questions generated")
+            saturated = index.saturated
+        
+        except TooManyRequests:
+            # llm already paused the shared scheduler; the next admission waits it out
+            errors += 1
+            logger.warning(f"Gemini quota exceeded for {skill_name} ({band}). Retrying once the scheduler allows...")
+        except Exception as e:
+            errors += 1
+            logger.error(f"Error generating batch for {skill_name} in {band} band: {e}")
+    
+    if duplicates:
+        logger.info(f"Discarded {duplicates} duplicate questions for {skill_name} ({band})")
+    if len(saved_questions) < target:
+        logger.warning(f"Only {len(saved_questions)} unique questions generated for {skill_name} ({band}) after {attempts} attempts")
+    if len(saved_questions) >= target:
+        status = "done"
+    elif saturated:
+        status = "saturated"
+    else:
+        status = "partial" if existing + len(saved_questions) else "failed"
+    progress(skill_name, band, existing + len(saved_questions), existing + target, status, attempts, errors, scope=scope)
+    metrics.observe("question_batch_unit_seconds", time.monotonic() - started, status=status)
+    llm_usage.record_attempts("batch_generation", attempts)
+    return saved_questions
+
+def _run_in_context(app, func, *args, **kwargs):
+    with app.app_context():
+        return func(*args, **kwargs)
+
+def _generate_unit(app, scope, skill_name, skill_id, subskills, band, job_id, job_description, target, existing, progress):
+    with app.app_context():
+        if scope == "job":
+            return generate_band_questions(
+                skill_name, skill_id, subskills, band, job_id, job_description,
+                target=target, progress=progress, existing=existing
+            )
+        if not question_pool.claim_top_up(skill_id, band):
+            logger.info(f"Shared pool for {skill_name} ({band}) is already being topped up. Skipping...")
+            return []
+        try:
+            return generate_band_questions(
+                skill_name, skill_id, subskills, band, None, "",
+                target=target, progress=progress, existing=existing, scope="pool"
+            )
+        finally:
+            question_pool.release_top_up(skill_id, band)
+
+def prepare_question_batches(skills_with_priorities, jd_experience_range, job_id, job_description="", progress=log_progress, resume=False):
+    """Generate and store unique questions per skill per difficulty band.
+
+    Without the shared pool every job gets its own questions per band, as
+    many as exam_simulator expects a high-percentile attempt to draw from
+    the band (QUESTION_BANK_SIZING=fixed restores 20 per band). With it, the (skill, band) pool is only topped up to
+    QUESTION_POOL_TARGET_DEPTH generic questions, and the job gets
+    QUESTION_POOL_OVERLAY_PER_BAND JD-specific ones if it has a description.
+
+    Units run concurrently on a bounded pool and share the LLM scheduler's
+    batch class, so wall time tracks the slowest unit rather than the sum. Each
+    unit commits its own rows and reports through progress. With resume,
+    job units only top up what an earlier run already saved.
+    """
+    app = current_app._get_current_object()
+    question_bank = {band: {} for band in BANDS}
+    started = time.monotonic()
+    
+    skills = []
+    skill_ids = skill_registry.skill_ids([skill_data["name"] for skill_data in skills_with_priorities])
     for skill_data in skills_with_priorities:
         skill_name = skill_data["name"]
-        print(f"\n📌 Processing Skill: {skill_name} (Priority: {skill_data['priority']})")
-        skill = Skill.query.filter_by(name=skill_name).first()
-        if not skill:
-            print(f"⚠️ Skill {skill_name} not found in database. Skipping...")
+        logger.info(f"Processing Skill: {skill_name} (Priority: {skill_data['priority']})")
+        if skill_name not in skill_ids:
+            logger.warning(f"Skill {skill_name} not found in database. Skipping...")
             continue
-        skill_id = skill.skill_id
-        subskills = expand_skills_with_gemini(skill_name)
+        skills.append((skill_name, skill_ids[skill_name]))
+    
+    use_pool = question_pool.pool_enabled()
+    pool_target = current_app.config.get('QUESTION_POOL_TARGET_DEPTH', 60) if use_pool else 0
+    job_target = QUESTIONS_PER_BAND
+    job_targets = {}
+    if use_pool:
+        job_target = current_app.config.get('QUESTION_POOL_OVERLAY_PER_BAND', 5) if (job_description or "").strip() else 0
+    elif current_app.config.get('QUESTION_BANK_SIZING', 'simulated') == 'simulated':
+        priorities = {skill_data["name"]: skill_data["priority"] for skill_data in skills_with_priorities}
+        job_targets = exam_simulator.job_band_targets(job_id, priorities, jd_experience_range)
+    
+    job_existing = {}
+    if resume:
+        counts = db.session.query(MCQ.skill_id, MCQ.difficulty_band, func.count(MCQ.mcq_id)).filter(
+            MCQ.job_id == job_id
+        ).group_by(MCQ.skill_id, MCQ.difficulty_band).all()
+        job_existing = {(skill_id, band): count for skill_id, band, count in counts}
+    pool_existing = question_pool.pool_counts([skill_id for _, skill_id in skills]) if use_pool and skills else {}
+    
+    units = []
+    for skill_name, skill_id in skills:
+        for band in BANDS:
+            for scope, target, existing in (
+                ("pool", pool_target, pool_existing.get((skill_id, band), 0)),
+                ("job", job_targets.get(skill_name, {}).get(band, job_target), job_existing.get((skill_id, band), 0))
+            ):
+                if not target:
+                    continue
+                if existing >= target:
+                    progress(skill_name, band, existing, target, "done", scope=scope)
+                    continue
+                units.append((scope, skill_name, skill_id, band, target, existing))
+        for band in BANDS:
+            question_bank[band][skill_name] = []
+    
+    max_workers = current_app.config.get('QUESTION_BATCH_WORKERS', 4)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="question-batch") as pool:
+        skill_names = list(dict.fromkeys(unit[1] for unit in units))
+        subskill_futures = {name: pool.submit(_run_in_context, app, get_subskills, name) for name in skill_names}
+        unit_futures = {}
+        for scope, skill_name, skill_id, band, target, existing in units:
+            future = pool.submit(
+                _generate_unit, app, scope, skill_name, skill_id, subskill_futures[skill_name].result(), band,
+                job_id, job_description, target, existing, progress
+            )
+            unit_futures[future] = (skill_name, band)
         
-        for band in ["good", "better", "perfect"]:
-            key = f"{skill_name}"
-            if key not in question_bank[band]:
-                question_bank[band][key] = []
-            
-            saved_questions = []
-            attempts = 0
-            max_attempts = 5
-            while len(saved_questions) < 20 and attempts < max_attempts:
-                try:
-                    prompt = generate_questions_prompt(skill_name, subskills, band, job_description, saved_questions)
-                    chat = model_gemini.start_chat(history=[{"role": "user", "parts": [prompt]}])
-                    response = chat.send_message(prompt)
-                    
-                    if response and isinstance(response.text, str):
-                        questions = parse_response(response.text)
-                        print(f"✅ [{band.upper()}] {skill_name}: {len(questions)} questions generated")
-                        
-                        for q in questions[:20 - len(saved_questions)]:  # Limit to remaining needed questions
-                            parsed = parse_question_block(q)
-                            if not parsed:
-                                print(f"⚠️ Invalid question format for {skill_name} in {band} band: {q}")
-                                continue
-                            
-                            try:
-                                mcq = MCQ(
-                                    job_id=job_id,
-                                    skill_id=skill_id,
-                                    question=parsed["question"],
-                                    option_a=parsed["option_a"],
-                                    option_b=parsed["option_b"],
-                                    option_c=parsed["option_c"],
-                                    option_d=parsed["option_d"],
-                                    correct_answer=parsed["correct_answer"],
-                                    difficulty_band=band
-                                )
-                                db.session.add(mcq)
-                                db.session.flush()
-                                saved_questions.append({
-                                    "mcq_id": mcq.mcq_id,
-                                    "question": parsed["question"],
-                                    "options": parsed["options"],
-                                    "correct_answer": parsed["correct_answer"],
-                                    "skill": skill_name,
-                                    "difficulty_band": band
-                                })
-                                total_questions_saved += 1
-                                print(f"Added MCQ: {parsed['question']} (Band: {band}, Correct Answer: {parsed['correct_answer']})")
-                            except Exception as e:
-                                print(f"⚠️ Error adding MCQ to session for {skill_name} in {band} band: {e}")
-                                print(f"MCQ data: {parsed}")
-                
-                except TooManyRequests:
-                    print(f"⛔️ Gemini quota exceeded for {skill_name} ({band}). Retrying in 10 seconds...")
-                    time.sleep(10)
-                except Exception as e:
-                    print(f"⚠️ Error generating batch for {skill_name} in {band} band: {e}")
-                
-                attempts += 1
-                time.sleep(1.5)
-            
-            if len(saved_questions) < 20:
-                print(f"⚠️ Only {len(saved_questions)} unique questions generated for {skill_name} ({band}) after {max_attempts} attempts")
-            
-            question_bank[band][key] = saved_questions
+        for future in as_completed(unit_futures):
+            skill_name, band = unit_futures[future]
+            try:
+                question_bank[band][skill_name].extend(future.result())
+            except Exception as e:
+                logger.error(f"Error generating batch for {skill_name} in {band} band: {e}")
     
-    try:
-        db.session.commit()
-        print(f"✅ {total_questions_saved} questions saved to the database.")
-    except Exception as e:
-        db.session.rollback()
-        print(f"⚠️ Error saving questions to database: {e}")
+    total_questions_saved = sum(len(questions) for skills_in_band in question_bank.values() for questions in skills_in_band.values())
+    logger.info(f"{total_questions_saved} new questions saved to the database in {time.monotonic() - started:.1f}s.")
+    invalidate_assessment_plan(job_id)
+    if use_pool:
+        invalidate_skill_plans({unit[2] for unit in units if unit[0] == "pool"})
     
-    print("\n✅ Question generation completed!")
-    return question_bank
\ No newline at end of file
+    logger.info("Question generation completed!")
+    return question_bank
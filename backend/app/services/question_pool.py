@@ -0,0 +1,76 @@
+import logging
+import random
+import threading
+from flask import current_app
+from sqlalchemy import Integer, all_, and_, func, literal, or_
+from sqlalchemy.dialects.postgresql import ARRAY
+from app import db
+from app.models.mcq import MCQ
+from app.services.item_stats import not_retired
+
+logger = logging.getLogger(__name__)
+
+# Shared MCQs have job_id NULL and are keyed by (skill_id, difficulty_band).
+# Job-scoped rows are the per-job overlay: JD-specific questions from batch
+# generation with a job description, plus every real-time question.
+
+_topping_up = set()  # (skill_id, band) pools being generated in this process
+_topping_up_lock = threading.Lock()
+
+
+def pool_enabled():
+    return current_app.config.get('QUESTION_POOL_ENABLED', True)
+
+
+def bank_criterion(job_id, skill_ids):
+    """Rows a job's question bank draws from: its overlay plus the shared pool for its skills."""
+    if not pool_enabled() or not skill_ids:
+        return MCQ.job_id == job_id
+    return or_(MCQ.job_id == job_id, and_(MCQ.job_id.is_(None), MCQ.skill_id.in_(list(skill_ids))))
+
+
+def pool_counts(skill_ids):
+    """Return {(skill_id, band): questions in the shared pool}."""
+    rows = db.session.query(MCQ.skill_id, MCQ.difficulty_band, func.count(MCQ.mcq_id)).filter(
+        MCQ.job_id.is_(None), MCQ.skill_id.in_(list(skill_ids))
+    ).group_by(MCQ.skill_id, MCQ.difficulty_band).all()
+    return {(skill_id, band): count for skill_id, band, count in rows}
+
+
+def claim_top_up(skill_id, band):
+    """Reserve a pool for topping up in this process; False if another unit already is."""
+    with _topping_up_lock:
+        if (skill_id, band) in _topping_up:
+            return False
+        _topping_up.add((skill_id, band))
+        return True
+
+
+def release_top_up(skill_id, band):
+    with _topping_up_lock:
+        _topping_up.discard((skill_id, band))
+
+
+def pick_stored_mcq(job_id, skill_id, difficulty_band, used_ids=(), rng=random):
+    """Fetch one MCQ of a (job, skill, band) pool that is not in used_ids, or None.
+
+    job_id None means the shared pool. The scan starts at a random mcq_id and
+    wraps around once, so each call reads a single row off
+    ix_mcqs_job_skill_band_id and different candidates get different
+    questions. used_ids is bound as one array parameter. Items retired by
+    item statistics are skipped.
+    """
+    criteria = [
+        MCQ.job_id.is_(None) if job_id is None else MCQ.job_id == job_id,
+        MCQ.skill_id == skill_id,
+        MCQ.difficulty_band == difficulty_band
+    ]
+    low, high = db.session.query(func.min(MCQ.mcq_id), func.max(MCQ.mcq_id)).filter(*criteria).one()
+    if low is None:
+        return None
+    if used_ids:
+        criteria.append(MCQ.mcq_id != all_(literal(list(used_ids), ARRAY(Integer))))
+    criteria.append(not_retired())
+    pivot = rng.randint(low, high)
+    query = MCQ.query.filter(*criteria).order_by(MCQ.mcq_id)
+    return query.filter(MCQ.mcq_id >= pivot).first() or query.filter(MCQ.mcq_id < pivot).first()
@@ -0,0 +1,199 @@
+import logging
+import math
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+from flask import current_app
+from sqlalchemy import func, text
+from app import db
+from app.models.assessment_registration import AssessmentRegistration
+from app.models.job import JobDescription
+from app.models.mcq import MCQ
+from app.models.question_generation_job import QuestionGenerationJob
+from app.models.required_skill import RequiredSkill
+from app.services import question_pool
+from app.services.question_bank import BAND_ORDER, invalidate_assessment_plan, invalidate_skill_plans
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Background top-up of question banks ahead of demand. Every tick one worker
+# (per-cluster advisory lock) walks active jobs whose window opens within the
+# horizon, soonest first, and compares each (skill, band) bank depth (job
+# overlay plus shared pool) with a watermark sized from the job's question
+# count, its registrations and the time left before it opens. Units below the
+# low watermark are generated up to the high one, within a per-tick budget.
+
+IST = timezone(timedelta(hours=5, minutes=30))  # schedule_start/end are stored as naive IST
+
+_started = False
+_deficit = 0
+
+
+class Watermark(NamedTuple):
+    low: int
+    high: int
+
+
+class Unit(NamedTuple):
+    starts_in: float  # hours until the job opens, negative once it is open
+    job_id: int
+    skill_id: int
+    skill_name: str
+    band: str
+    depth: int
+    watermark: Watermark
+
+
+def enabled():
+    return current_app.config.get('REPLENISHER_ENABLED', True)
+
+
+def init_app(app):
+    global _started
+    metrics.register_gauge("question_replenisher_deficit", lambda: _deficit)
+    if not app.config.get('REPLENISHER_ENABLED', True) or _started:
+        return
+    threading.Thread(target=_run_forever, args=(app,), name="question-replenisher", daemon=True).start()
+    _started = True
+
+
+def watermark(per_skill, registered, starts_in, horizon):
+    """Target bank depth for one (skill, band) of a job.
+
+    A single candidate can draw the skill's whole share of num_questions from
+    one band, so that is the floor. More registrants share the bank, so the
+    full target grows with log2 of the registration count to keep per-question
+    exposure down; it is phased in as the window approaches and reached once
+    the job is open.
+    """
+    full = per_skill * math.ceil(math.log2(2 + registered))
+    urgency = 1.0 if starts_in <= 0 else max(0.0, 1 - starts_in / horizon)
+    high = min(current_app.config.get('REPLENISHER_MAX_DEPTH', 100), math.ceil(per_skill + (full - per_skill) * urgency))
+    return Watermark(low=max(per_skill, math.ceil(high * current_app.config.get('REPLENISHER_LOW_RATIO', 0.5))), high=high)
+
+
+def bank_depths(job_id, skill_ids):
+    """Return {(skill_id, band): questions} a job's bank can draw from."""
+    rows = db.session.query(MCQ.skill_id, MCQ.difficulty_band, func.count(MCQ.mcq_id)).filter(
+        question_pool.bank_criterion(job_id, skill_ids), MCQ.skill_id.in_(list(skill_ids))
+    ).group_by(MCQ.skill_id, MCQ.difficulty_band).all()
+    return {(skill_id, band): count for skill_id, band, count in rows}
+
+
+def find_deficits(now=None):
+    """Return units below their low watermark, soonest-opening job first, then emptiest bank."""
+    now = now or datetime.now(IST).replace(tzinfo=None)
+    horizon = current_app.config.get('REPLENISHER_HORIZON_HOURS', 72)
+    jobs = JobDescription.query.filter(
+        JobDescription.status == 'active',
+        JobDescription.schedule_end > now,
+        JobDescription.schedule_start < now + timedelta(hours=horizon)
+    ).order_by(JobDescription.schedule_start).all()
+    if not jobs:
+        return []
+
+    job_ids = [job.job_id for job in jobs]
+    registered = dict(db.session.query(AssessmentRegistration.job_id, func.count()).filter(
+        AssessmentRegistration.job_id.in_(job_ids)
+    ).group_by(AssessmentRegistration.job_id).all())
+    # Jobs whose initial generation is still queued or running are left to it
+    generating = {job_id for (job_id,) in db.session.query(QuestionGenerationJob.job_id).filter(
+        QuestionGenerationJob.job_id.in_(job_ids), QuestionGenerationJob.status.in_(('queued', 'running'))
+    )}
+    required = {}
+    for requirement in RequiredSkill.query.filter(RequiredSkill.job_id.in_(job_ids)).all():
+        required.setdefault(requirement.job_id, []).append(requirement)
+
+    units = []
+    for job in jobs:
+        skills = required.get(job.job_id)
+        if not skills or job.job_id in generating:
+            continue
+        starts_in = (job.schedule_start - now).total_seconds() / 3600
+        priority_sum = sum(requirement.priority for requirement in skills) or 1
+        depths = bank_depths(job.job_id, [requirement.skill_id for requirement in skills])
+        for requirement in skills:
+            per_skill = max(1, round((requirement.priority / priority_sum) * job.num_questions))
+            mark = watermark(per_skill, registered.get(job.job_id, 0), starts_in, horizon)
+            for band in BAND_ORDER:
+                depth = depths.get((requirement.skill_id, band), 0)
+                if depth < mark.low:
+                    units.append(Unit(starts_in, job.job_id, requirement.skill_id, requirement.skill.name, band, depth, mark))
+    units.sort(key=lambda unit: (unit.starts_in, unit.depth / unit.watermark.high))
+    return units
+
+
+def top_up(unit):
+    """Generate one unit up to its high watermark; returns how many questions were saved.
+
+    With the shared pool enabled the questions go to the (skill, band) pool so
+    every job with the skill benefits; otherwise into the job's own bank.
+    """
+    from app.services.question_batches import generate_band_questions
+    from app.services.skill_taxonomy import get_subskills
+
+    job_id = None if question_pool.pool_enabled() else unit.job_id
+    if job_id is None and not question_pool.claim_top_up(unit.skill_id, unit.band):
+        return 0
+    try:
+        saved = generate_band_questions(
+            unit.skill_name, unit.skill_id, get_subskills(unit.skill_name), unit.band, job_id,
+            target=unit.watermark.high, existing=unit.depth, progress=_log_progress,
+            scope="pool" if job_id is None else "job"
+        )
+    finally:
+        if job_id is None:
+            question_pool.release_top_up(unit.skill_id, unit.band)
+    if job_id is None:
+        # Pool questions are visible to every job requiring the skill
+        invalidate_skill_plans([unit.skill_id])
+    else:
+        invalidate_assessment_plan(unit.job_id)
+    metrics.incr("question_replenisher_generated", len(saved))
+    return len(saved)
+
+
+def _log_progress(skill_name, band, saved, target, status, attempts=0, errors=0, scope="job"):
+    if status != "running":
+        logger.info(f"Replenished {skill_name} ({band}, {scope}): {saved}/{target} questions ({status})")
+
+
+def tick():
+    """Run one replenishment pass if no other worker is; returns the units topped up."""
+    global _deficit
+    connection = db.engine.connect()
+    try:
+        if not connection.execute(text("SELECT pg_try_advisory_lock(hashtext('question_replenisher'))")).scalar():
+            return 0
+        try:
+            units = find_deficits()
+            _deficit = len(units)
+            budget = current_app.config.get('REPLENISHER_UNITS_PER_TICK', 6)
+            topped = set()
+            for unit in units:
+                if len(topped) >= budget:
+                    break
+                # With the shared pool one top-up serves every job needing that (skill, band)
+                key = (unit.skill_id, unit.band) if question_pool.pool_enabled() else (unit.job_id, unit.skill_id, unit.band)
+                if key in topped:
+                    continue
+                topped.add(key)
+                top_up(unit)
+            return len(topped)
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(hashtext('question_replenisher'))"))
+    finally:
+        connection.close()
+
+
+def _run_forever(app):
+    stop = threading.Event()
+    interval = app.config.get('REPLENISHER_INTERVAL', 60)
+    while not stop.wait(interval):
+        with app.app_context():
+            try:
+                tick()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Question replenisher error: {str(e)}")
@@ -0,0 +1,83 @@
+import logging
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import text
+from app import db
+from app.models.item_stats import ItemStat
+from app.models.llm_cache import LLMCacheEntry
+from app.models.llm_usage import LLMUsage
+from app.models.question_generation_job import QuestionGenerationJob
+from app.models.skill_subtopic import SkillSubtopic
+from app.services.dedup import backfill_question_hashes
+
+logger = logging.getLogger(__name__)
+
+# Schema changes the services rely on beyond the base dump, applied once per
+# deploy by `flask upgrade-schema` before Gunicorn starts rather than by
+# every worker on boot. Every step is idempotent, and the upgrade holds an
+# advisory lock so two deploys running it at once take turns.
+
+TABLES = (QuestionGenerationJob, SkillSubtopic, LLMUsage, LLMCacheEntry, ItemStat)
+
+# (description, statements) run in order after the tables exist. The
+# question_hash backfill runs between adding the column and its unique index.
+STEPS = (
+    ("mcqs.question_hash", (
+        "ALTER TABLE mcqs ADD COLUMN IF NOT EXISTS question_hash VARCHAR(40)",
+    )),
+    ("backfill question_hash", None),
+    ("uq_mcqs_job_skill_band_hash", (
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_mcqs_job_skill_band_hash "
+        "ON mcqs (job_id, skill_id, difficulty_band, question_hash)",
+    )),
+    # Shared-pool MCQs have no job
+    ("shared question pool", (
+        "ALTER TABLE mcqs ALTER COLUMN job_id DROP NOT NULL",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_mcqs_pool_skill_band_hash "
+        "ON mcqs (skill_id, difficulty_band, question_hash) WHERE job_id IS NULL",
+    )),
+    # Range scans by mcq_id inside one (job, skill, band), see pick_stored_mcq
+    ("ix_mcqs_job_skill_band_id", (
+        "CREATE INDEX IF NOT EXISTS ix_mcqs_job_skill_band_id "
+        "ON mcqs (job_id, skill_id, difficulty_band, mcq_id)",
+    )),
+    ("llm_usage.throttles", (
+        "ALTER TABLE llm_usage ADD COLUMN IF NOT EXISTS throttles INTEGER NOT NULL DEFAULT 0",
+    )),
+)
+
+
+def init_app(app):
+    app.cli.add_command(upgrade_schema_command)
+
+
+def upgrade(echo=logger.info):
+    """Create the service tables and apply every schema step; safe to run repeatedly."""
+    connection = db.engine.connect()
+    try:
+        connection.execute(text("SELECT pg_advisory_lock(hashtext('schema_upgrade'))"))
+        for model in TABLES:
+            model.__table__.create(db.engine, checkfirst=True)
+            echo(f"Table {model.__tablename__} ready")
+        for description, statements in STEPS:
+            try:
+                if statements is None:
+                    backfill_question_hashes()
+                else:
+                    for statement in statements:
+                        db.session.execute(text(statement))
+                    db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            echo(f"Applied {description}")
+    finally:
+        connection.execute(text("SELECT pg_advisory_unlock(hashtext('schema_upgrade'))"))
+        connection.close()
+
+
+@click.command('upgrade-schema')
+@with_appcontext
+def upgrade_schema_command():
+    """Create service tables, columns and indexes missing from the database."""
+    upgrade(echo=click.echo)
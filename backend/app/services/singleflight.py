@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from app.services import generation_executor
+from app.utils import metrics
+
+# Request coalescing for real-time generation. Concurrent requests for the
+# same (job_id, skill, band) join one in-flight generation, which asks the LLM
+# for a small burst of questions. The burst is buffered and handed out one
+# question per request, so LLM calls follow question demand rather than the
+# number of candidates asking at the same moment.
+
+MAX_KEYS = 4096
+BUFFER_DEPTH = 20  # questions kept per key; older ones are still in the job's bank
+
+_buffer_ttl = 300
+_flights = {}  # key -> GenerationTask
+_buffers = OrderedDict()  # key -> deque of (expires_at monotonic, question dict)
+_lock = threading.Lock()
+
+
+def init_app(app):
+    global _buffer_ttl
+    _buffer_ttl = app.config.get('REALTIME_BUFFER_TTL', 300)
+    metrics.register_gauge("realtime_buffered_questions", buffered)
+
+
+def take(key, exclude=()):
+    """Hand out a buffered question for key whose mcq_id is not in exclude, or None."""
+    now = time.monotonic()
+    with _lock:
+        queue = _buffers.get(key)
+        if not queue:
+            return None
+        while queue and queue[0][0] < now:
+            queue.popleft()
+        for i, (_, question) in enumerate(queue):
+            if question["mcq_id"] not in exclude:
+                del queue[i]
+                metrics.incr("realtime_singleflight", outcome="buffered")
+                return question
+    return None
+
+
+def join(key, fn, *args, deadline=None, adopt_into=None, **kwargs):
+    """Return the in-flight task for key, starting fn on the generation executor if there is none.
+
+    fn must return a list of question dicts; they are buffered for key before
+    the task completes, so take() after the task's result() sees them.
+    Raises generation_executor.QueueFull when a new flight cannot be queued.
+    """
+    with _lock:
+        task = _flights.get(key)
+        if task is not None:
+            metrics.incr("realtime_singleflight", outcome="joined")
+            return task
+        task = generation_executor.submit(_fly, key, fn, args, kwargs, deadline=deadline, adopt_into=adopt_into)
+        _flights[key] = task
+    # Flights that never run (cancelled or past their deadline) still have to land
+    task.future.add_done_callback(lambda _: _land(key, task))
+    metrics.incr("realtime_singleflight", outcome="started")
+    return task
+
+
+def _fly(key, fn, args, kwargs, should_stop=None):
+    questions = []
+    try:
+        questions = fn(*args, should_stop=should_stop, **kwargs) or []
+        return questions
+    finally:
+        expires_at = time.monotonic() + _buffer_ttl
+        with _lock:
+            if questions:
+                queue = _buffers.get(key)
+                if queue is None:
+                    queue = _buffers[key] = deque(maxlen=BUFFER_DEPTH)
+                queue.extend((expires_at, question) for question in questions)
+                _buffers.move_to_end(key)
+                while len(_buffers) > MAX_KEYS:
+                    _buffers.popitem(last=False)
+            _flights.pop(key, None)
+
+
+def _land(key, task):
+    with _lock:
+        if _flights.get(key) is task:
+            del _flights[key]
+
+
+def buffered():
+    with _lock:
+        return sum(len(queue) for queue in _buffers.values())
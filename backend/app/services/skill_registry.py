@@ -0,0 +1,122 @@
+import logging
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event, func
+from sqlalchemy.dialects.postgresql import insert
+from app import db
+from app.models.skill import Skill
+from app.services.skill_taxonomy import normalize_skill
+
+logger = logging.getLogger(__name__)
+
+# Process-wide name <-> id map for the skills table. The whole table is
+# loaded on first use and reloaded after SKILL_REGISTRY_TTL seconds so skills
+# added by other workers show up; names are matched case- and
+# whitespace-insensitively. Misses fall through to a single batched query.
+
+_ids = {}  # normalized name -> skill_id
+_names = {}  # skill_id -> name as stored
+_loaded_at = None
+_lock = threading.Lock()
+
+
+def _remember(skill_id, name):
+    with _lock:
+        _ids[normalize_skill(name)] = skill_id
+        _names[skill_id] = name
+
+
+def invalidate():
+    """Forget everything; the next lookup reloads the table."""
+    global _loaded_at
+    with _lock:
+        _ids.clear()
+        _names.clear()
+        _loaded_at = None
+
+
+def _ensure_loaded():
+    global _loaded_at
+    ttl = current_app.config.get('SKILL_REGISTRY_TTL', 600)
+    if _loaded_at is not None and time.monotonic() - _loaded_at < ttl:
+        return
+    rows = db.session.query(Skill.skill_id, Skill.name).all()
+    with _lock:
+        _ids.clear()
+        _names.clear()
+        for skill_id, name in rows:
+            _ids[normalize_skill(name)] = skill_id
+            _names[skill_id] = name
+        _loaded_at = time.monotonic()
+
+
+def _query(keys):
+    for skill_id, name in db.session.query(Skill.skill_id, Skill.name).filter(
+        func.lower(func.trim(Skill.name)).in_(list(keys))
+    ):
+        _remember(skill_id, name)
+
+
+def _cached(names):
+    found = {}
+    for name in names:
+        skill_id = _ids.get(normalize_skill(name))
+        if skill_id is not None:
+            found[name] = skill_id
+    return found
+
+
+def skill_ids(names):
+    """Return {name: skill_id} for the names that exist, in one query at most."""
+    _ensure_loaded()
+    found = _cached(names)
+    missing = {normalize_skill(name) for name in names if name not in found}
+    if missing:
+        _query(missing)
+        found = _cached(names)
+    return found
+
+
+def skill_id(name):
+    return skill_ids([name]).get(name)
+
+
+def skill_name(skill_id):
+    _ensure_loaded()
+    name = _names.get(skill_id)
+    if name is None:
+        skill = db.session.get(Skill, skill_id)
+        if skill is None:
+            return None
+        _remember(skill.skill_id, skill.name)
+        name = skill.name
+    return name
+
+
+def get_or_create(names, category='technical'):
+    """Return {name: skill_id} for names, inserting missing skills in one statement.
+
+    Runs in the caller's transaction; new ids are cached right away and the
+    whole registry is dropped if that transaction rolls back.
+    """
+    names = [name.strip() for name in names if name and name.strip()]
+    found = skill_ids(names)
+    # One new row per normalized name, spelled as first given
+    new = {}
+    for name in names:
+        if name not in found:
+            new.setdefault(normalize_skill(name), name)
+    if new:
+        inserted = db.session.execute(
+            insert(Skill.__table__).values([{"name": name, "category": category} for name in new.values()])
+            .on_conflict_do_nothing().returning(Skill.__table__.c.skill_id, Skill.__table__.c.name)
+        ).all()
+        for skill_id, name in inserted:
+            _remember(skill_id, name)
+        event.listen(db.session(), "after_rollback", lambda session: invalidate(), once=True)
+        if len(inserted) < len(new):
+            # Lost a race with another writer; their rows are visible once committed
+            _query(set(new) - {normalize_skill(name) for _, name in inserted})
+        found = _cached(names)
+    return found
@@ -0,0 +1,154 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.dialects.postgresql import insert
+from app import db
+from app.models.skill_subtopic import SkillSubtopic
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_lru = OrderedDict()  # skill_key -> (subtopics, expires_at epoch)
+_lock = threading.Lock()
+_refreshing = set()
+
+
+def normalize_skill(skill_name):
+    return " ".join(skill_name.lower().split())
+
+
+def init_app(app):
+    """Register the warm-subskills command."""
+    app.cli.add_command(warm_subskills_command)
+
+
+def _remember(skill_key, subtopics, expires_at):
+    with _lock:
+        _lru[skill_key] = (subtopics, expires_at)
+        _lru.move_to_end(skill_key)
+        while len(_lru) > current_app.config.get('SUBSKILL_CACHE_SIZE', 1024):
+            _lru.popitem(last=False)
+
+
+def _store(skill_name, subtopics):
+    """Upsert an expansion into skill_subtopics and the LRU; empty expansions are not kept."""
+    if not subtopics:
+        return
+    skill_key = normalize_skill(skill_name)
+    ttl = timedelta(days=current_app.config.get('SUBSKILL_CACHE_TTL_DAYS', 30))
+    now = datetime.utcnow()
+    values = {'skill_key': skill_key, 'skill_name': skill_name, 'subtopics': subtopics, 'updated_at': now, 'expires_at': now + ttl}
+    statement = insert(SkillSubtopic.__table__).values(**values)
+    db.session.execute(statement.on_conflict_do_update(index_elements=['skill_key'], set_=values))
+    db.session.commit()
+    _remember(skill_key, subtopics, time.time() + ttl.total_seconds())
+
+
+def _expand_and_store(skill_name):
+    from app.services.question_batches import expand_skills_with_gemini
+
+    subtopics = expand_skills_with_gemini(skill_name)
+    try:
+        _store(skill_name, subtopics)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to store subtopics for {skill_name}: {str(e)}")
+    return subtopics
+
+
+def _refresh_in_background(skill_name):
+    skill_key = normalize_skill(skill_name)
+    with _lock:
+        if skill_key in _refreshing:
+            return
+        _refreshing.add(skill_key)
+    app = current_app._get_current_object()
+
+    def refresh():
+        try:
+            with app.app_context():
+                _expand_and_store(skill_name)
+        finally:
+            with _lock:
+                _refreshing.discard(skill_key)
+
+    threading.Thread(target=refresh, name="subskill-refresh", daemon=True).start()
+
+
+def get_subskills(skill_name, fetch=True):
+    """Return the subtopics for a skill from the LRU, then the table, then Gemini.
+
+    Expired entries are served while a background refresh runs. With
+    fetch=False a miss returns [] and is filled in the background, so
+    latency-sensitive callers never wait on the expansion call.
+    """
+    skill_key = normalize_skill(skill_name)
+    with _lock:
+        cached = _lru.get(skill_key)
+        if cached is not None:
+            _lru.move_to_end(skill_key)
+    if cached is not None:
+        subtopics, expires_at = cached
+        if expires_at < time.time():
+            _refresh_in_background(skill_name)
+        metrics.incr("subskill_cache", outcome="memory")
+        return subtopics
+
+    row = SkillSubtopic.query.get(skill_key)
+    if row is not None:
+        _remember(skill_key, row.subtopics, time.time() + (row.expires_at - datetime.utcnow()).total_seconds())
+        if row.expires_at < datetime.utcnow():
+            _refresh_in_background(skill_name)
+        metrics.incr("subskill_cache", outcome="table")
+        return row.subtopics
+
+    metrics.incr("subskill_cache", outcome="miss")
+    if not fetch:
+        _refresh_in_background(skill_name)
+        return []
+    return _expand_and_store(skill_name)
+
+
+def warm_subskills(skill_names, force=False):
+    """Expand every skill that is missing or expired (or all of them with force); returns the count expanded."""
+    now = datetime.utcnow()
+    fresh = set()
+    if not force:
+        keys = [normalize_skill(name) for name in skill_names]
+        fresh = {row.skill_key for row in SkillSubtopic.query.filter(SkillSubtopic.skill_key.in_(keys), SkillSubtopic.expires_at > now)}
+    expanded = 0
+    for skill_name in skill_names:
+        if normalize_skill(skill_name) in fresh:
+            continue
+        if _expand_and_store(skill_name):
+            expanded += 1
+            print(f"✅ Cached subtopics for {skill_name}")
+        else:
+            print(f"⚠️ No subtopics generated for {skill_name}")
+    return expanded
+
+
+@click.command('warm-subskills')
+@with_appcontext
+@click.option('--force', is_flag=True, help='Re-expand skills even if their cached subtopics are still fresh.')
+@click.option('--all-skills', is_flag=True, help='Warm every skill, not only those required by active jobs.')
+def warm_subskills_command(force, all_skills):
+    """Pre-compute subtopic expansions for skills referenced by active jobs."""
+    from app.models.job import JobDescription
+    from app.models.required_skill import RequiredSkill
+    from app.models.skill import Skill
+
+    query = db.session.query(Skill.name).distinct()
+    if not all_skills:
+        query = query.join(RequiredSkill, RequiredSkill.skill_id == Skill.skill_id).join(
+            JobDescription, JobDescription.job_id == RequiredSkill.job_id
+        ).filter(JobDescription.status == 'active', JobDescription.schedule_end >= datetime.utcnow())
+    skill_names = sorted(name for (name,) in query.all())
+    print(f"📌 Warming subtopics for {len(skill_names)} skills")
+    expanded = warm_subskills(skill_names, force=force)
+    print(f"✅ Expanded {expanded} skills; {len(skill_names) - expanded} were fresh or failed")
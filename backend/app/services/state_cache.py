@@ -0,0 +1,291 @@
+import atexit
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from app import db
+from app.models.assessment_state import AssessmentState
+
+logger = logging.getLogger(__name__)
+
+STATE_TTL = timedelta(hours=24)
+TOMBSTONE_TTL = 3600  # seconds a discarded attempt is kept from being written back
+
+
+class LocalStateCache:
+    """In-process LRU of attempt states with a dirty set for write-behind flushing.
+
+    States are kept serialized so callers can mutate what they get back
+    without racing the flusher. Only safe when every request for an attempt
+    lands on the same worker (single worker or sticky sessions); otherwise
+    use the redis backend.
+    """
+
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # attempt_id -> [state_json, expires_at]
+        self._dirty = set()
+        self._discarded = OrderedDict()  # attempt_id -> discarded_at, bounded like the entries
+        self._lock = threading.Lock()
+
+    def get(self, attempt_id):
+        with self._lock:
+            entry = self._entries.get(attempt_id)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                self._entries.pop(attempt_id, None)
+                self._dirty.discard(attempt_id)
+                return None
+            self._entries.move_to_end(attempt_id)
+            raw = entry[0]
+        return json.loads(raw)
+
+    def put(self, attempt_id, state, dirty=True):
+        """Store a state and return any dirty (attempt_id, state) pairs evicted to make room."""
+        evicted = []
+        raw = json.dumps(state)
+        with self._lock:
+            self._entries[attempt_id] = [raw, time.time() + STATE_TTL.total_seconds()]
+            self._entries.move_to_end(attempt_id)
+            if dirty:
+                self._dirty.add(attempt_id)
+            else:
+                self._dirty.discard(attempt_id)
+            while len(self._entries) > self.max_entries:
+                old_id, (old_raw, _) = self._entries.popitem(last=False)
+                if old_id in self._dirty:
+                    self._dirty.discard(old_id)
+                    evicted.append((old_id, json.loads(old_raw)))
+        return evicted
+
+    def discard(self, attempt_id):
+        """Drop an attempt and remember it so a flush already in flight does not write it back."""
+        with self._lock:
+            self._dirty.discard(attempt_id)
+            self._entries.pop(attempt_id, None)
+            self._discarded[attempt_id] = time.time()
+            self._discarded.move_to_end(attempt_id)
+            while len(self._discarded) > self.max_entries:
+                self._discarded.popitem(last=False)
+
+    def discarded(self, attempt_ids):
+        with self._lock:
+            return {attempt_id for attempt_id in attempt_ids if attempt_id in self._discarded}
+
+    def take_dirty(self):
+        with self._lock:
+            dirty = [(attempt_id, self._entries[attempt_id][0]) for attempt_id in self._dirty if attempt_id in self._entries]
+            self._dirty.clear()
+        return [(attempt_id, json.loads(raw)) for attempt_id, raw in dirty]
+
+    def mark_dirty(self, attempt_id):
+        with self._lock:
+            if attempt_id in self._entries:
+                self._dirty.add(attempt_id)
+
+
+class RedisStateCache:
+    """Shared attempt-state cache backed by Redis so every worker sees the same state."""
+
+    KEY_PREFIX = "assessment_state:"
+    DIRTY_KEY = "assessment_state:dirty"
+    DISCARDED_PREFIX = "assessment_state:discarded:"
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("ASSESSMENT_STATE_CACHE=redis requires the 'redis' package")
+        if not url:
+            raise ValueError("ASSESSMENT_STATE_CACHE=redis requires REDIS_URL to be set")
+        self._redis = redis.Redis.from_url(url)
+
+    def _key(self, attempt_id):
+        return f"{self.KEY_PREFIX}{attempt_id}"
+
+    def get(self, attempt_id):
+        raw = self._redis.get(self._key(attempt_id))
+        return json.loads(raw) if raw else None
+
+    def put(self, attempt_id, state, dirty=True):
+        pipe = self._redis.pipeline()
+        pipe.set(self._key(attempt_id), json.dumps(state), ex=int(STATE_TTL.total_seconds()))
+        if dirty:
+            pipe.sadd(self.DIRTY_KEY, attempt_id)
+        else:
+            pipe.srem(self.DIRTY_KEY, attempt_id)
+        pipe.execute()
+        return []
+
+    def discard(self, attempt_id):
+        """Drop an attempt and remember it so a flush already in flight on any worker does not write it back."""
+        pipe = self._redis.pipeline()
+        pipe.set(f"{self.DISCARDED_PREFIX}{attempt_id}", 1, ex=TOMBSTONE_TTL)
+        pipe.delete(self._key(attempt_id))
+        pipe.srem(self.DIRTY_KEY, attempt_id)
+        pipe.execute()
+
+    def discarded(self, attempt_ids):
+        attempt_ids = list(attempt_ids)
+        if not attempt_ids:
+            return set()
+        flags = self._redis.mget([f"{self.DISCARDED_PREFIX}{attempt_id}" for attempt_id in attempt_ids])
+        return {attempt_id for attempt_id, flag in zip(attempt_ids, flags) if flag}
+
+    def take_dirty(self):
+        dirty = []
+        for raw_id in self._redis.spop(self.DIRTY_KEY, 500) or []:
+            attempt_id = int(raw_id)
+            state = self.get(attempt_id)
+            if state is not None:
+                dirty.append((attempt_id, state))
+        return dirty
+
+    def mark_dirty(self, attempt_id):
+        self._redis.sadd(self.DIRTY_KEY, attempt_id)
+
+
+_cache = None
+_flusher_started = False
+
+
+def init_app(app):
+    """Configure the attempt-state cache and start the periodic write-behind flusher."""
+    global _cache, _flusher_started
+    backend = app.config.get('ASSESSMENT_STATE_CACHE', 'none')
+    if backend == 'redis':
+        _cache = RedisStateCache(app.config.get('REDIS_URL'))
+    elif backend == 'local':
+        _cache = LocalStateCache(app.config.get('ASSESSMENT_STATE_CACHE_SIZE', 5000))
+    else:
+        _cache = None
+    if _cache is None or _flusher_started:
+        return
+
+    interval = app.config.get('ASSESSMENT_STATE_FLUSH_INTERVAL', 5)
+
+    def flush_loop():
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    flush_dirty_states()
+            except Exception as e:
+                logger.error(f"Periodic assessment state flush failed: {str(e)}")
+
+    def flush_on_exit():
+        with app.app_context():
+            flush_dirty_states()
+
+    threading.Thread(target=flush_loop, name="assessment-state-flusher", daemon=True).start()
+    atexit.register(flush_on_exit)
+    _flusher_started = True
+
+
+def _write_states(items):
+    """Upsert (attempt_id, state) pairs into assessment_states in a single commit.
+
+    Attempts discarded meanwhile are skipped, and any that were discarded
+    while the commit was in flight have their row deleted again.
+    """
+    if not items:
+        return
+    if _cache is not None:
+        discarded = _cache.discarded(attempt_id for attempt_id, _ in items)
+        items = [(attempt_id, state) for attempt_id, state in items if attempt_id not in discarded]
+        if not items:
+            return
+    try:
+        for attempt_id, state in items:
+            assessment_state = AssessmentState.query.get(attempt_id)
+            if assessment_state:
+                assessment_state.state = state
+            else:
+                db.session.add(AssessmentState(
+                    attempt_id=attempt_id,
+                    state=state,
+                    skill_count=len(state.get('performance_log', {})),
+                    expiry_date=datetime.utcnow() + STATE_TTL
+                ))
+        db.session.commit()
+        if _cache is not None:
+            # discard_state tombstones before deleting, so a discard this check
+            # misses runs its delete after our commit
+            discarded = _cache.discarded(attempt_id for attempt_id, _ in items)
+            if discarded:
+                AssessmentState.query.filter(AssessmentState.attempt_id.in_(discarded)).delete(synchronize_session=False)
+                db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def get_state(attempt_id):
+    """Return the cached state for an attempt, loading it from the database on a miss."""
+    if _cache is not None:
+        state = _cache.get(attempt_id)
+        if state is not None:
+            return state
+
+    assessment_state = AssessmentState.query.get(attempt_id)
+    if not assessment_state:
+        return None
+    if assessment_state.expiry_date and assessment_state.expiry_date < datetime.utcnow():
+        logger.warning(f"Assessment state expired for attempt_id={attempt_id}")
+        db.session.delete(assessment_state)
+        db.session.commit()
+        return None
+
+    state = assessment_state.state
+    if _cache is not None:
+        _write_states(_cache.put(attempt_id, state, dirty=False))
+    return state
+
+
+def put_state(attempt_id, state, durable=False):
+    """Store a state; it is written to the database now if durable, otherwise on the next flush."""
+    if _cache is None or durable:
+        _write_states([(attempt_id, state)])
+        if _cache is not None:
+            _write_states(_cache.put(attempt_id, state, dirty=False))
+        return
+    _write_states(_cache.put(attempt_id, state))
+
+
+def flush_state(attempt_id):
+    """Write an attempt's cached state to the database immediately."""
+    if _cache is None:
+        return
+    state = _cache.get(attempt_id)
+    if state is not None:
+        put_state(attempt_id, state, durable=True)
+
+
+def discard_state(attempt_id):
+    """Drop an attempt's state from the cache and the database once the attempt is finalized."""
+    if _cache is not None:
+        _cache.discard(attempt_id)
+    assessment_state = AssessmentState.query.get(attempt_id)
+    if assessment_state:
+        db.session.delete(assessment_state)
+        db.session.commit()
+
+
+def flush_dirty_states():
+    """Persist every dirty cached state; entries are re-marked dirty if the write fails."""
+    if _cache is None:
+        return 0
+    dirty = _cache.take_dirty()
+    if not dirty:
+        return 0
+    try:
+        _write_states(dirty)
+    except Exception:
+        for attempt_id, _ in dirty:
+            _cache.mark_dirty(attempt_id)
+        raise
+    logger.debug(f"Flushed {len(dirty)} assessment states")
+    return len(dirty)
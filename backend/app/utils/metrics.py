@@ -0,0 +1,93 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+# In-process metrics registry; each Gunicorn worker reports its own numbers.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_histograms = {}
+_gauges = {}
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q):
+        """Approximate quantile from bucket upper bounds."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {str(bound): count for bound, count in zip(self.buckets + ("+Inf",), self.counts)}
+        }
+
+
+def incr(name, value=1, **labels):
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def observe(name, value, buckets=DEFAULT_BUCKETS, **labels):
+    with _lock:
+        key = _key(name, labels)
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+
+def register_gauge(name, fn):
+    """Register a callable evaluated on every snapshot (e.g. a ratio or queue depth)."""
+    _gauges[name] = fn
+
+
+def counter_value(name, **labels):
+    return _counters.get(_key(name, labels), 0)
+
+
+def _label_str(labels):
+    return ",".join(f"{k}={v}" for k, v in labels) or "_"
+
+
+def snapshot():
+    """Return all metrics as a JSON-serializable dict."""
+    result = {"counters": {}, "histograms": {}, "gauges": {}}
+    with _lock:
+        for (name, labels), value in _counters.items():
+            result["counters"].setdefault(name, {})[_label_str(labels)] = value
+        for (name, labels), histogram in _histograms.items():
+            result["histograms"].setdefault(name, {})[_label_str(labels)] = histogram.to_dict()
+    for name, fn in list(_gauges.items()):
+        try:
+            result["gauges"][name] = fn()
+        except Exception:
+            result["gauges"][name] = None
+    return result
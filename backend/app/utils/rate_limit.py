@@ -0,0 +1,141 @@
+import random
+import threading
+import time
+from collections import deque
+
+
+class TokenBucket:
+    """Thread-safe token bucket with AIMD rate adaptation for an upstream quota.
+
+    try_acquire() takes a token without blocking and reports how long until
+    one may be available; FairScheduler decides who waits for it. backoff() is
+    called when the upstream answers 429: it halves the refill rate and pauses
+    every caller for a growing, jittered delay. success() recovers the rate
+    additively and shrinks the pause, so throughput settles just under the
+    real quota.
+    """
+
+    def __init__(self, rate, capacity, min_rate=None, max_backoff=60.0):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = float(min_rate) if min_rate else self.max_rate / 16
+        self.capacity = max(1, int(capacity))
+        self.max_backoff = max_backoff
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._penalty = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def backoff(self):
+        """Record a rate-limit response; returns the pause applied to all callers."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._penalty = min(self.max_backoff, self._penalty * 2 if self._penalty else 2.0)
+            pause = self._penalty * random.uniform(0.5, 1.0)
+            self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+            self._tokens = 0.0
+            return pause
+
+    def success(self):
+        """Record a successful call, recovering toward the configured rate."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+            self._penalty = self._penalty / 2 if self._penalty > 1 else 0.0
+
+    def try_acquire(self, reserve=0):
+        """Take a token only if reserve more would remain; returns 0 on success, else seconds until one may."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self._blocked_until and self._tokens >= 1 + reserve:
+                self._tokens -= 1
+                return 0.0
+            return max(self._blocked_until - now, (1 + reserve - self._tokens) / self.rate, 0.001)
+
+
+class FairScheduler:
+    """Admission control in front of a TokenBucket shared by several priority classes.
+
+    Callers wait in per-class, per-tenant queues. The next caller admitted is
+    the oldest waiter of the least-served tenant in the highest class that has
+    waiters, and only while the bucket holds more than that class's reserve, so
+    lower classes leave a few tokens for higher ones and soak up the rest. A
+    waiter rises one class for every `aging` seconds it waits, so low classes
+    are delayed under sustained load but never starved.
+    """
+
+    def __init__(self, bucket, classes, reserves=None, aging=30.0):
+        self.bucket = bucket
+        self.classes = tuple(classes)  # highest priority first
+        self.reserves = {cls: min(int((reserves or {}).get(cls, 0)), bucket.capacity - 1) for cls in self.classes}
+        self.aging = aging
+        self._cond = threading.Condition()
+        self._waiting = {cls: {} for cls in self.classes}  # cls -> tenant -> deque of (enqueued_at, ticket)
+        self._served = {}  # (cls, tenant) -> admissions, offset so new tenants start level with the class
+        self._floor = dict.fromkeys(self.classes, 0)
+
+    def _head(self, now):
+        best = None
+        for rank, cls in enumerate(self.classes):
+            tenants = self._waiting[cls]
+            if not tenants:
+                continue
+            tenant = min(tenants, key=lambda t: (self._served[(cls, t)], tenants[t][0][0]))
+            enqueued_at, ticket = tenants[tenant][0]
+            effective = max(0, rank - int((now - enqueued_at) / self.aging)) if self.aging else rank
+            # Ties go to the naturally higher class, then the longer wait
+            key = (effective, rank, enqueued_at)
+            if best is None or key < best[0]:
+                best = (key, ticket)
+        return best
+
+    def acquire(self, cls, tenant, timeout=None):
+        """Wait for admission; returns the seconds waited, or None if timeout passed first."""
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        entry = (started, object())
+        with self._cond:
+            queue = self._waiting[cls].setdefault(tenant, deque())
+            queue.append(entry)
+            self._served[(cls, tenant)] = max(self._served.get((cls, tenant), 0), self._floor[cls])
+            try:
+                while True:
+                    now = time.monotonic()
+                    (effective, _, _), ticket = self._head(now)
+                    wait = None
+                    if ticket is entry[1]:
+                        wait = self.bucket.try_acquire(self.reserves[self.classes[effective]])
+                        if not wait:
+                            self._floor[cls] = max(self._floor[cls], self._served[(cls, tenant)])
+                            self._served[(cls, tenant)] += 1
+                            return now - started
+                    elif self.aging and self.classes.index(cls) > int((now - started) / self.aging):
+                        # Others leaving the queue notify; our own aging is checked when it happens
+                        wait = self.aging - (now - started) % self.aging
+                    if deadline is not None:
+                        if now >= deadline:
+                            return None
+                        wait = deadline - now if wait is None else min(wait, deadline - now)
+                    self._cond.wait(wait)
+            finally:
+                queue.remove(entry)
+                if not queue:
+                    del self._waiting[cls][tenant]
+                if len(self._served) > 4096:
+                    self._served = {key: count for key, count in self._served.items() if key[1] in self._waiting[key[0]]}
+                self._cond.notify_all()
+
+    def queued(self):
+        """Number of waiters per class."""
+        with self._cond:
+            return {cls: sum(len(queue) for queue in tenants.values()) for cls, tenants in self._waiting.items()}
+
+    def tenants(self):
+        """Number of tenants with waiters per class."""
+        with self._cond:
+            return {cls: len(tenants) for cls, tenants in self._waiting.items()}
@@ -0,0 +1,117 @@
+"""Question-generation and MCQ insert benchmark against the configured database.
+
+Run from backend/ with the usual .env (the LLM backend defaults to the
+offline stub, so no Gemini key or network is needed):
+
+    python benchmarks/bench_generation.py [--units 6] [--target 20] [--rows 2000] [--latency 0]
+
+Everything is written under a scratch skill that is deleted afterwards.
+Reports:
+  * generation: (skill, band) units through generate_band_questions, as
+    questions/sec end to end (LLM call, parse, dedup, bulk insert)
+  * inserts: rows/sec for per-row ORM add + flush (the old path), the bulk
+    INSERT ... RETURNING writer, and COPY through a staging table
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("GEMINI_REQUESTS_PER_MINUTE", "600000")
+os.environ.setdefault("GEMINI_BURST", "1000")
+os.environ["GENERATION_JOB_RUNNER"] = "False"
+os.environ["REPLENISHER_ENABLED"] = "False"
+
+from app import create_app, db  # noqa: E402
+from app.models.mcq import MCQ  # noqa: E402
+from app.models.skill import Skill  # noqa: E402
+from app.services import mcq_writer  # noqa: E402
+from app.services.question_batches import BANDS, generate_band_questions  # noqa: E402
+
+
+def synthetic_rows(count, tag):
+    for i in range(count):
+        yield {
+            "question": f"Benchmark question {tag} {i}: which option is number {i % 4}?",
+            "option_a": f"Zero {i}", "option_b": f"One {i}", "option_c": f"Two {i}", "option_d": f"Three {i}",
+            "correct_answer": "ABCD"[i % 4]
+        }
+
+
+def clear(skill_id):
+    db.session.query(MCQ).filter(MCQ.skill_id == skill_id).delete()
+    db.session.commit()
+
+
+def bench_generation(skill, units, target):
+    subskills = [f"{skill.name} topic {i}" for i in range(3)]
+    quiet = lambda *args, **kwargs: None
+    started = time.perf_counter()
+    saved = 0
+    for unit in range(units):
+        band = BANDS[unit % len(BANDS)]
+        saved += len(generate_band_questions(skill.name, skill.skill_id, subskills, band, None, target=target, progress=quiet))
+    elapsed = time.perf_counter() - started
+    print(f"generation: {saved} questions over {units} units in {elapsed:.2f}s ({saved / elapsed:,.0f} questions/sec)")
+    clear(skill.skill_id)
+
+
+def bench_inserts(skill, rows, batch_size):
+    def orm_per_row(parsed_rows):
+        for parsed in parsed_rows:
+            db.session.add(MCQ(**mcq_writer.mcq_row(parsed, None, skill.skill_id, "good")))
+            db.session.flush()
+        db.session.commit()
+
+    def bulk_insert(parsed_rows):
+        for start in range(0, len(parsed_rows), batch_size):
+            mcq_writer.insert_mcqs([
+                mcq_writer.mcq_row(parsed, None, skill.skill_id, "good") for parsed in parsed_rows[start:start + batch_size]
+            ])
+            db.session.commit()
+
+    def copy(parsed_rows):
+        mcq_writer.copy_mcqs([mcq_writer.mcq_row(parsed, None, skill.skill_id, "good") for parsed in parsed_rows])
+
+    for name, strategy in (("orm add+flush", orm_per_row), (f"insert..returning x{batch_size}", bulk_insert), ("copy", copy)):
+        parsed_rows = list(synthetic_rows(rows, name))
+        started = time.perf_counter()
+        strategy(parsed_rows)
+        elapsed = time.perf_counter() - started
+        print(f"{name:>26}: {rows} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/sec)")
+        clear(skill.skill_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--units", type=int, default=6, help="(skill, band) generation units to run")
+    parser.add_argument("--target", type=int, default=20, help="questions per unit")
+    parser.add_argument("--rows", type=int, default=2000, help="rows per insert strategy")
+    parser.add_argument("--batch-size", type=int, default=20, help="rows per bulk INSERT (one Gemini response)")
+    parser.add_argument("--latency", type=float, default=None, help="stub LLM latency in seconds")
+    args = parser.parse_args()
+    if args.latency is not None:
+        os.environ["LLM_STUB_LATENCY"] = str(args.latency)
+
+    app = create_app()
+    with app.app_context():
+        skill = Skill(name=f"bench-{uuid.uuid4().hex[:8]}", category="benchmark")
+        db.session.add(skill)
+        db.session.commit()
+        try:
+            print(f"LLM backend: {app.config['LLM_BACKEND']}")
+            bench_generation(skill, args.units, args.target)
+            bench_inserts(skill, args.rows, args.batch_size)
+        finally:
+            db.session.rollback()
+            clear(skill.skill_id)
+            db.session.delete(skill)
+            db.session.commit()
+
+
+if __name__ == "__main__":
+    main()
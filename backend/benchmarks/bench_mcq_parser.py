@@ -0,0 +1,103 @@
+"""Regression check and micro-benchmark for app.services.mcq_parser.
+
+Run from backend/:
+
+    python benchmarks/bench_mcq_parser.py [--seconds 2]
+
+Every corpus case is checked against its expected accept/reject counts
+(exit status 1 on any mismatch). The corpus, plus the stored question
+batches in ../question_batches, is then parsed in a loop to report
+blocks/sec and the overall accept/reject rate per failure reason.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app", "services"))
+
+from mcq_parser import parse_mcqs  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_corpus():
+    with open(os.path.join(HERE, "mcq_corpus.json")) as f:
+        return json.load(f)
+
+
+def load_stored_batches():
+    """Stored batches are JSON objects; re-render them in the prompt's single-line format."""
+    raws = []
+    for path in sorted(glob.glob(os.path.join(HERE, "..", "..", "question_batches", "*.json"))):
+        with open(path) as f:
+            questions = json.load(f)
+        lines = []
+        for q in questions:
+            options = q.get("options") or []
+            if len(options) != 4 or q.get("answer") not in options:
+                continue
+            rendered = " ".join(f"({letter}) {option}" for letter, option in zip("ABCD", options))
+            lines.append(f"{q['question']} {rendered} Correct Answer: ({'ABCD'[options.index(q['answer'])]})")
+        raws.append("\n\n".join(lines))
+    return raws
+
+
+def check_corpus(corpus):
+    failures = 0
+    for case in corpus:
+        result = parse_mcqs(case["raw"])
+        problems = []
+        if len(result.questions) != case["expect_questions"]:
+            problems.append(f"questions {len(result.questions)} != {case['expect_questions']}")
+        if len(result.failures) != case["expect_failures"]:
+            problems.append(f"failures {len(result.failures)} != {case['expect_failures']}")
+        expected_first = case.get("expect_first_question")
+        if expected_first and (not result.questions or result.questions[0]["question"] != expected_first):
+            problems.append(f"first question {result.questions[0]['question'] if result.questions else None!r}")
+        status = "FAIL" if problems else "ok"
+        print(f"{status:4} {case['name']}" + (f": {'; '.join(problems)}" if problems else ""))
+        failures += bool(problems)
+    return failures
+
+
+def benchmark(raws, seconds):
+    blocks = 0
+    reasons = Counter()
+    accepted = 0
+    iterations = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        for raw in raws:
+            result = parse_mcqs(raw)
+            accepted += len(result.questions)
+            blocks += len(result.questions) + len(result.failures)
+            reasons.update(failure.reason for failure in result.failures)
+        iterations += 1
+    elapsed = time.perf_counter() - started
+    rejected = blocks - accepted
+    print(f"\n{iterations} passes over {len(raws)} responses in {elapsed:.2f}s")
+    print(f"{blocks / elapsed:,.0f} blocks/sec")
+    print(f"accept rate {accepted / blocks:.2%}, reject rate {rejected / blocks:.2%}" if blocks else "no blocks parsed")
+    for reason, count in reasons.most_common():
+        print(f"  {reason}: {count // iterations} per pass")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0, help="how long to run the throughput loop")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    mismatches = check_corpus(corpus)
+    benchmark([case["raw"] for case in corpus] + load_stored_batches(), args.seconds)
+    if mismatches:
+        print(f"\n{mismatches} corpus case(s) regressed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
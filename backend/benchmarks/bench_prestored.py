@@ -0,0 +1,97 @@
+"""Pre-stored question selection benchmark against the configured database.
+
+Run from backend/ with the usual .env:
+
+    python benchmarks/bench_prestored.py [--pool 12000] [--calls 200]
+
+COPYs --pool synthetic MCQs into the shared pool of a scratch skill (one
+band), then compares the old materializing selection (every unused row
+loaded, NOT IN list, first row taken) with get_prestored_question for
+several used-id list lengths. Reports ms per call and how many distinct
+questions the calls returned. The scratch skill and its rows are deleted
+afterwards.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+os.environ["GENERATION_JOB_RUNNER"] = "False"
+os.environ["REPLENISHER_ENABLED"] = "False"
+
+from app import create_app, db  # noqa: E402
+from app.models.mcq import MCQ  # noqa: E402
+from app.models.skill import Skill  # noqa: E402
+from app.services import mcq_writer, question_pool  # noqa: E402
+from app.services.question_batches import get_prestored_question  # noqa: E402
+
+BAND = "better"
+
+
+def load_pool(skill_id, size):
+    rows = [
+        mcq_writer.mcq_row({
+            "question": f"Prestored benchmark question {i}: which option is number {i % 4}?",
+            "option_a": f"Zero {i}", "option_b": f"One {i}", "option_c": f"Two {i}", "option_d": f"Three {i}",
+            "correct_answer": "ABCD"[i % 4]
+        }, None, skill_id, BAND)
+        for i in range(size)
+    ]
+    started = time.perf_counter()
+    mcq_writer.copy_mcqs(rows)
+    db.session.execute(db.text("ANALYZE mcqs"))
+    db.session.commit()
+    print(f"loaded {size} pool questions in {time.perf_counter() - started:.2f}s")
+
+
+def materializing(skill, used_ids):
+    """The selection get_prestored_question used before the index path."""
+    rows = MCQ.query.filter(
+        question_pool.bank_criterion(None, [skill.skill_id]),
+        MCQ.skill_id == skill.skill_id,
+        MCQ.difficulty_band == BAND
+    ).filter(~MCQ.mcq_id.in_(used_ids)).order_by(MCQ.mcq_id).all()
+    return rows[0].mcq_id if rows else None
+
+
+def indexed(skill, used_ids):
+    question = get_prestored_question(skill.name, BAND, None, [{"mcq_id": mcq_id} for mcq_id in used_ids])
+    return question["mcq_id"] if question else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pool", type=int, default=12000, help="MCQs in the benchmarked (skill, band) pool")
+    parser.add_argument("--calls", type=int, default=200, help="selections per strategy and used-list length")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        skill = Skill(name=f"bench-{uuid.uuid4().hex[:8]}", category="benchmark")
+        db.session.add(skill)
+        db.session.commit()
+        try:
+            load_pool(skill.skill_id, args.pool)
+            ids = [mcq_id for (mcq_id,) in db.session.query(MCQ.mcq_id).filter(MCQ.skill_id == skill.skill_id)]
+            for used in (0, 20, 200):
+                used_ids = random.sample(ids, used)
+                for name, select in (("materializing", materializing), ("indexed", indexed)):
+                    # The old path is slow enough that a tenth of the calls is representative
+                    calls = args.calls if name == "indexed" else max(1, args.calls // 10)
+                    started = time.perf_counter()
+                    picked = [select(skill, used_ids) for _ in range(calls)]
+                    elapsed = time.perf_counter() - started
+                    print(f"{name:>14} used={used:<4} {elapsed / calls * 1000:8.2f} ms/call, {len(set(picked))}/{calls} distinct")
+        finally:
+            db.session.rollback()
+            db.session.query(MCQ).filter(MCQ.skill_id == skill.skill_id).delete()
+            db.session.delete(skill)
+            db.session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Run from backend/ with `python -m pytest tests`; make the app package importable either way
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,41 @@
+import json
+import os
+import pytest
+from app.services.mcq_parser import StreamParser, parse_mcqs
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "mcq_corpus.json")
+
+with open(CORPUS_PATH) as f:
+    CORPUS = json.load(f)
+
+
+def stream(raw, size):
+    parser = StreamParser()
+    questions, failures = [], []
+    for start in range(0, len(raw), size):
+        result = parser.feed(raw[start:start + size])
+        questions += result.questions
+        failures += result.failures
+    result = parser.close()
+    return questions + result.questions, failures + result.failures
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_corpus_case(case):
+    result = parse_mcqs(case["raw"])
+    assert len(result.questions) == case["expect_questions"]
+    assert len(result.failures) == case["expect_failures"]
+    if case.get("expect_first_question"):
+        assert result.questions[0]["question"] == case["expect_first_question"]
+    for question in result.questions:
+        assert question["correct_answer"] in "ABCD"
+        assert len(set(question["options"])) == 4
+
+
+@pytest.mark.parametrize("size", [1, 7, 64, 100000])
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_stream_parser_matches_parse_mcqs(case, size):
+    result = parse_mcqs(case["raw"])
+    questions, failures = stream(case["raw"], size)
+    assert questions == result.questions
+    assert [failure.reason for failure in failures] == [failure.reason for failure in result.failures]
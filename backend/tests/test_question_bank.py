@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+import pytest
+from app.services.question_bank import JobQuestionBank
+
+
+def make_bank(count, band="good", skill="Python", first_id=100):
+    bank = JobQuestionBank(job_id=1)
+    for mcq_id in range(first_id, first_id + count):
+        bank.add_mcq(SimpleNamespace(
+            mcq_id=mcq_id, question=f"Question {mcq_id}?", option_a="a", option_b="b", option_c="c", option_d="d",
+            correct_answer="A", difficulty_band=band
+        ), skill)
+    return bank
+
+
+def walk(bank, seed, asked=None, band="good", skill="Python"):
+    asked = set(asked or ())
+    order = []
+    while True:
+        question = bank.pick(band, skill, seed, asked)
+        if question is None:
+            return order
+        order.append(question.mcq_id)
+        asked.add(question.mcq_id)
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 7, 12, 30, 97])
+@pytest.mark.parametrize("seed", [0, 1, 42, "attempt-17"])
+def test_pick_serves_each_question_exactly_once(count, seed):
+    bank = make_bank(count)
+    order = walk(bank, seed)
+    assert sorted(order) == list(range(100, 100 + count))
+
+
+def test_pick_skips_already_asked_and_tracks_depth():
+    bank = make_bank(12)
+    asked = {100, 105, 111}
+    assert bank.depth("good", "Python", asked) == 9
+    order = walk(bank, 7, asked)
+    assert sorted(order) == sorted(set(range(100, 112)) - asked)
+
+
+def test_pick_order_depends_on_seed():
+    bank = make_bank(30)
+    assert len({tuple(walk(bank, seed)) for seed in range(5)}) > 1
+    assert walk(bank, 3) == walk(bank, 3)
+
+
+def test_pick_empty_pool():
+    bank = make_bank(5)
+    assert bank.pick("perfect", "Python", 0, set()) is None
+    assert bank.pick("good", "SQL", 0, set()) is None
@@ -0,0 +1,41 @@
+from app.utils.rate_limit import FairScheduler, TokenBucket
+
+
+def test_bucket_spends_burst_then_reports_wait():
+    bucket = TokenBucket(rate=1.0, capacity=2)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert 0 < bucket.try_acquire() <= 1.0
+
+
+def test_bucket_keeps_reserve():
+    bucket = TokenBucket(rate=0.001, capacity=3)
+    assert bucket.try_acquire(reserve=2) == 0
+    assert bucket.try_acquire(reserve=2) > 0
+    assert bucket.try_acquire() == 0
+
+
+def test_backoff_halves_rate_and_success_recovers():
+    bucket = TokenBucket(rate=10.0, capacity=5)
+    pause = bucket.backoff()
+    assert bucket.rate == 5.0
+    assert pause > 0
+    assert bucket.try_acquire() >= pause * 0.99  # every caller waits out the pause
+    for _ in range(20):
+        bucket.success()
+    assert bucket.rate == 10.0
+
+
+def test_backoff_never_drops_below_min_rate():
+    bucket = TokenBucket(rate=16.0, capacity=1, min_rate=2.0)
+    for _ in range(10):
+        bucket.backoff()
+    assert bucket.rate == 2.0
+
+
+def test_scheduler_lower_classes_leave_reserve():
+    scheduler = FairScheduler(TokenBucket(rate=0.001, capacity=3), ("live", "batch"), reserves={"batch": 2})
+    assert scheduler.acquire("batch", "recruiter:1", timeout=0) is not None
+    assert scheduler.acquire("batch", "recruiter:1", timeout=0) is None
+    assert scheduler.acquire("live", "recruiter:1", timeout=0) is not None
+    assert scheduler.queued() == {"live": 0, "batch": 0}
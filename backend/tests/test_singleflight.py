@@ -0,0 +1,55 @@
+import pytest
+from app.services import singleflight
+
+KEY = (1, "Python", "good")
+
+
+@pytest.fixture(autouse=True)
+def empty_buffers():
+    singleflight._buffers.clear()
+    singleflight._flights.clear()
+    yield
+    singleflight._buffers.clear()
+    singleflight._flights.clear()
+
+
+def land(key, mcq_ids):
+    """Buffer a finished flight's questions the way a generation task does."""
+    return singleflight._fly(key, lambda should_stop=None: [{"mcq_id": mcq_id} for mcq_id in mcq_ids], (), {})
+
+
+def test_take_skips_excluded_questions_and_keeps_them_buffered():
+    land(KEY, [1, 2, 3])
+    assert singleflight.take(KEY, exclude={1})["mcq_id"] == 2
+    assert singleflight.take(KEY, exclude={1})["mcq_id"] == 3
+    assert singleflight.take(KEY, exclude={1}) is None
+    assert singleflight.buffered() == 1
+    assert singleflight.take(KEY)["mcq_id"] == 1
+    assert singleflight.take(KEY) is None
+
+
+def test_take_hands_each_question_out_once():
+    land(KEY, range(10))
+    taken = [singleflight.take(KEY)["mcq_id"] for _ in range(10)]
+    assert sorted(taken) == list(range(10))
+    assert singleflight.take(KEY) is None
+
+
+def test_take_is_per_key():
+    land(KEY, [1])
+    assert singleflight.take((2, "Python", "good")) is None
+    assert singleflight.take(KEY)["mcq_id"] == 1
+
+
+def test_expired_questions_are_dropped(monkeypatch):
+    monkeypatch.setattr(singleflight, "_buffer_ttl", -1)
+    land(KEY, [1, 2])
+    assert singleflight.take(KEY) is None
+    assert singleflight.buffered() == 0
+
+
+def test_finished_flight_is_cleared():
+    singleflight._flights[KEY] = object()
+    land(KEY, [])
+    assert KEY not in singleflight._flights
+    assert singleflight.take(KEY) is None
@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+import pytest
+from app.services import state_cache
+
+
+class FakeSession:
+    """Just enough of db.session over a dict of committed rows.
+
+    Hooks in on_commit run when the next commit starts, in their own
+    "session", so they can interleave with a write that is in flight.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.pending = []
+        self.on_commit = []
+
+    def add(self, row):
+        self.pending.append(("add", row))
+
+    def delete(self, row):
+        self.pending.append(("delete", row))
+
+    def commit(self):
+        pending, self.pending = self.pending, []
+        hooks, self.on_commit = self.on_commit, []
+        for hook in hooks:
+            hook()
+        for action, row in pending:
+            if action == "add":
+                self.rows[row.attempt_id] = row
+            else:
+                self.rows.pop(row.attempt_id, None)
+
+    def rollback(self):
+        self.pending = []
+
+
+class FakeColumn:
+    def in_(self, values):
+        return set(values)
+
+
+class FakeQuery:
+    def __init__(self, session, ids=None):
+        self.session = session
+        self.ids = ids
+
+    def get(self, attempt_id):
+        return self.session.rows.get(attempt_id)
+
+    def filter(self, ids):
+        return FakeQuery(self.session, ids)
+
+    def delete(self, synchronize_session=None):
+        for attempt_id in self.ids:
+            self.session.rows.pop(attempt_id, None)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = FakeSession()
+
+    class FakeState:
+        attempt_id = FakeColumn()
+        query = FakeQuery(session)
+
+        def __init__(self, attempt_id, state, skill_count, expiry_date):
+            self.attempt_id = attempt_id
+            self.state = state
+            self.expiry_date = expiry_date
+
+    monkeypatch.setattr(state_cache, "db", SimpleNamespace(session=session))
+    monkeypatch.setattr(state_cache, "AssessmentState", FakeState)
+    monkeypatch.setattr(state_cache, "_cache", state_cache.LocalStateCache(max_entries=10))
+    return session
+
+
+def state(question_count=1):
+    return {"question_count": question_count, "performance_log": {"Python": {}}}
+
+
+def test_put_is_written_on_flush(session):
+    state_cache.put_state(1, state())
+    assert 1 not in session.rows
+    assert state_cache.flush_dirty_states() == 1
+    assert session.rows[1].state == state()
+
+
+def test_discard_after_take_dirty_is_not_written_back(session):
+    state_cache.put_state(1, state())
+    dirty = state_cache._cache.take_dirty()
+    state_cache.discard_state(1)
+    state_cache._write_states(dirty)
+    assert 1 not in session.rows
+    assert state_cache.get_state(1) is None
+
+
+def test_discard_while_flush_commits_deletes_the_row(session):
+    state_cache.put_state(1, state())
+    state_cache.put_state(2, state(2))
+    # The attempt is finalized after the flusher's tombstone check, before its commit lands
+    session.on_commit.append(lambda: state_cache.discard_state(1))
+    state_cache.flush_dirty_states()
+    assert 1 not in session.rows
+    assert session.rows[2].state == state(2)
+    assert state_cache.get_state(1) is None
+
+
+def test_discard_removes_flushed_row(session):
+    state_cache.put_state(1, state())
+    state_cache.flush_dirty_states()
+    state_cache.discard_state(1)
+    assert 1 not in session.rows
+    assert state_cache.flush_dirty_states() == 0
+
+
+def test_durable_put_writes_through(session):
+    state_cache.put_state(1, state(3), durable=True)
+    assert session.rows[1].state == state(3)
+    assert state_cache.flush_dirty_states() == 0
+
+
+def test_local_cache_tombstones_are_bounded():
+    cache = state_cache.LocalStateCache(max_entries=3)
+    for attempt_id in range(5):
+        cache.discard(attempt_id)
+    assert cache.discarded(range(5)) == {2, 3, 4}